@@ -1,53 +1,251 @@
+import asyncio
 import os
-from groq import Groq
+import random
+import time
+
 from dotenv import load_dotenv
 
+from core.config import settings
+from core.metrics import metrics
+from services.llm_cache import LLMCache
+
 load_dotenv()
 
+# Compact version of the coaching rules: sent once per call, the data comes from CoachContext
+SYSTEM_PROMPT = (
+    "You are SmartSave AI, an empathetic and analytical personal finance coach guiding the user "
+    "towards financial peace of mind, never robotic or judgmental.\n"
+    "Serenity Score: 0-49 financial stress (strict budgeting), 50-79 stable (optimize), "
+    "80-100 excellent (aggressive saving/investing).\n"
+    "Rules: reply in the exact language of the user's last message; ground every piece of advice "
+    "in their data (merchants, categories, score), never generic; at most 3-4 short paragraphs "
+    "ending with one practical action for today; Markdown, bold amounts and merchant names, "
+    "bullets for steps; supportive tone, a trusted friend rather than an accountant."
+)
+FALLBACK_MESSAGE = "Désolé, j'ai eu un petit souci technique. Peux-tu reformuler ?"
+
+
+class CoachStreamError(Exception):
+    """Raised by stream_financial_advice when the answer breaks off after its first tokens"""
+
+
+def retryable_errors():
+    """Transient failures worth another attempt (network, timeouts, 429, 5xx)"""
+    import groq
+    return (groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError)
+
+
 class AICoach:
     def __init__(self):
-        # Récupère la clé depuis ton fichier .env
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        # Answers keyed by the prompt inputs (see LLMCache.make_key), filled when a cache_key is given
+        self.cache = LLMCache(max_entries=settings.LLM_CACHE_ENTRIES, ttl=settings.LLM_CACHE_TTL)
+        # Clients created on first use: the groq SDK is only imported by workers that call the coach,
+        # and the async one binds to the running event loop
+        self._client = None
+        self._async_client = None
+        self._semaphore = None
 
-    def get_financial_advice(self, chat_input, score, transactions):
+    @staticmethod
+    def _timeout():
+        import httpx
+        return httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT)
+
+    @property
+    def client(self):
+        if self._client is None:
+            from groq import Groq
+            # Récupère la clé depuis ton fichier .env
+            self._client = Groq(
+                api_key=os.getenv("GROQ_API_KEY"),
+                base_url=settings.GROQ_BASE_URL,
+                timeout=self._timeout(),
+                max_retries=settings.LLM_MAX_RETRIES,
+            )
+        return self._client
+
+    @property
+    def async_client(self):
+        """AsyncGroq on one pooled httpx client shared by every request (keep-alive, bounded connections)"""
+        if self._async_client is None:
+            import httpx
+            from groq import AsyncGroq
+            http_client = httpx.AsyncClient(
+                timeout=self._timeout(),
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_POOL_SIZE,
+                    max_keepalive_connections=settings.LLM_POOL_SIZE,
+                ),
+            )
+            self._async_client = AsyncGroq(
+                api_key=os.getenv("GROQ_API_KEY"),
+                base_url=settings.GROQ_BASE_URL,
+                http_client=http_client,
+                max_retries=0,  # retries are ours: jittered and outside the concurrency slot
+            )
+        return self._async_client
+
+    @property
+    def semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        return self._semaphore
+
+    def build_messages(self, chat_input, score, transactions):
+        """
+        One system message: the coach rules, the caller's own system instructions (if chat_input
+        starts with some) and the user data. `transactions` is the CoachContext digest (or any
+        short summary); score=None when the digest already carries it.
+        """
         # 1. On définit les instructions de base (System Prompt)
-        system_instructions = f"""
-            You are SmartSave AI, an expert, empathetic, and highly analytical personal financial coach. Your goal is to guide the user towards financial peace of mind without sounding robotic or judgmental.
-
-            ### USER CONTEXT:
-            - Serenity Score: {score}/100. 
-            (Context: 0-49 = Financial stress, needs strict budgeting. 50-79 = Stable, needs optimization. 80-100 = Excellent, focus on aggressive saving/investing).
-            - Recent Transactions: {transactions}
-
-            ### STRICT CORE RULES:
-            1. LANGUAGE MATCHING: You MUST respond entirely in the exact same language as the user's current message (e.g., if they ask in French, reply in French; if in Arabic, reply in Arabic).
-            2. DATA-DRIVEN COACHING: Never give generic advice (like "save more money"). You MUST ground your advice by explicitly referencing items from their 'Recent Transactions' or their current 'Serenity Score'.
-            3. ACTIONABLE & CONCISE: Keep your response short (maximum 3 to 4 brief paragraphs). Always end with one clear, practical action step they can take today.
-            4. FORMATTING: Use Markdown. Bold key financial terms, numbers, or merchant names to make the text easily scannable on a mobile screen. Use bullet points if listing multiple steps.
-            5. EMPATHY & TONE: Always maintain an empathetic, supportive tone. Avoid any language that could be perceived as judgmental or robotic. You are a trusted friend guiding them towards financial wellness, not a strict accountant.
-            6. NO GENERIC ADVICE: Avoid any advice that could apply to anyone. Your guidance MUST be personalized based on their specific 'Serenity Score' and 'Recent Transactions'. For example, if they have a low score and many dining out transactions, you might say: "I see you've been dining out frequently, which can add up. With a Serenity Score of {score}, focusing on cooking at home could help reduce expenses and improve your financial peace of mind."
-               """
-
-
-        messages = [{"role": "system", "content": system_instructions}]
-
-        # 3. GESTION DE LA MÉMOIRE : 
-        # Si chat_input est une liste (historique), on l'ajoute directement
-        if isinstance(chat_input, list):
-            messages.extend(chat_input)
-        else:
-            # Sinon, on crée un message utilisateur unique
-            messages.append({"role": "user", "content": str(chat_input)})
+        system_parts = [SYSTEM_PROMPT]
+
+        # 2. Les instructions système de la route sont fusionnées, pas envoyées en double
+        history = chat_input if isinstance(chat_input, list) else [{"role": "user", "content": str(chat_input)}]
+        task = [m["content"].strip() for m in history if m.get("role") == "system"]
+        if task:
+            system_parts.append("### TASK\n" + "\n".join(task))
+
+        data = [f"Serenity Score: {score}/100"] if score is not None else []
+        if transactions:
+            data.append(str(transactions))
+        if data:
+            system_parts.append("### USER DATA\n" + "\n".join(data))
+
+        messages = [{"role": "system", "content": "\n\n".join(system_parts)}]
+
+        # 3. GESTION DE LA MÉMOIRE : l'historique (sans les messages système) suit
+        messages.extend(m for m in history if m.get("role") != "system")
+        return messages
+
+    def get_financial_advice(self, chat_input, score, transactions):
+        with metrics.stage("coach_prompt"):
+            messages = self.build_messages(chat_input, score, transactions)
 
         try:
             # 4. Envoi à l'API Groq
-            completion = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=500
-            )
+            with metrics.stage("coach_llm"):
+                completion = self.client.chat.completions.create(
+                    model=settings.LLM_MODEL,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=500
+                )
             return completion.choices[0].message.content
         except Exception as e:
             print(f"❌ Erreur API Groq : {e}")
-            return "Désolé, j'ai eu un petit souci technique. Peux-tu reformuler ?"
\ No newline at end of file
+            return FALLBACK_MESSAGE
+
+    async def get_financial_advice_async(self, chat_input, score, transactions, cache_key=None):
+        """
+        Same as get_financial_advice without blocking the event loop.
+        At most LLM_MAX_CONCURRENCY calls are in flight process-wide. Transient errors are retried
+        LLM_MAX_RETRIES times with full-jitter exponential backoff (or the server's Retry-After).
+        With a cache_key the answer is stored in self.cache (callers look it up first, see routes).
+        """
+        with metrics.stage("coach_prompt"):
+            messages = self.build_messages(chat_input, score, transactions)
+        with metrics.stage("coach_llm"):
+            advice = await self._complete(messages)
+        if cache_key is not None and advice != FALLBACK_MESSAGE:
+            self.cache.put(cache_key, advice)
+        return advice
+
+    async def _complete(self, messages):
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            try:
+                async with self.semaphore:
+                    completion = await self.async_client.chat.completions.create(
+                        model=settings.LLM_MODEL,
+                        messages=messages,
+                        temperature=0.7,
+                        max_tokens=500
+                    )
+                return completion.choices[0].message.content
+            except retryable_errors() as e:
+                if attempt == settings.LLM_MAX_RETRIES:
+                    print(f"❌ Erreur API Groq (après {attempt + 1} tentatives) : {e}")
+                    return FALLBACK_MESSAGE
+                await asyncio.sleep(self.retry_delay(attempt, e))
+            except Exception as e:
+                print(f"❌ Erreur API Groq : {e}")
+                return FALLBACK_MESSAGE
+
+    async def stream_financial_advice(self, chat_input, score, transactions, cache_key=None):
+        """
+        Async generator over the completion text as the tokens arrive (Groq stream=True).
+        Retries only happen before the first token. Yields FALLBACK_MESSAGE if nothing could be
+        produced; a failure mid-answer raises CoachStreamError once the tokens already sent are out.
+        With a cache_key a complete answer is stored in self.cache.
+        """
+        parts = []
+        completed = False
+        with metrics.stage("coach_prompt"):
+            messages = self.build_messages(chat_input, score, transactions)
+        # coach_llm: until the stream ends (or the client leaves), coach_first_token: until the first token
+        started_at = time.perf_counter()
+        with metrics.stage("coach_llm"):
+            async for token in self._stream(messages):
+                if token is None:
+                    completed = True
+                    continue
+                if not parts:
+                    metrics.observe_stage("coach_first_token", time.perf_counter() - started_at)
+                parts.append(token)
+                yield token
+        if cache_key is not None and completed and parts and "".join(parts) != FALLBACK_MESSAGE:
+            self.cache.put(cache_key, "".join(parts))
+
+    async def _stream(self, messages):
+        """Yields the tokens, then None if the completion ran to the end"""
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            produced = False
+            try:
+                async with self.semaphore:
+                    stream = await self.async_client.chat.completions.create(
+                        model=settings.LLM_MODEL,
+                        messages=messages,
+                        temperature=0.7,
+                        max_tokens=500,
+                        stream=True
+                    )
+                    # async with: the HTTP response is released even if the client disconnects mid-answer
+                    async with stream:
+                        async for chunk in stream:
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                produced = True
+                                yield delta
+                yield None
+                return
+            except retryable_errors() as e:
+                if produced:
+                    print(f"❌ Erreur API Groq (stream interrompu) : {e}")
+                    raise CoachStreamError(str(e)) from e
+                if attempt == settings.LLM_MAX_RETRIES:
+                    print(f"❌ Erreur API Groq (après {attempt + 1} tentatives) : {e}")
+                    yield FALLBACK_MESSAGE
+                    return
+                await asyncio.sleep(self.retry_delay(attempt, e))
+            except Exception as e:
+                print(f"❌ Erreur API Groq : {e}")
+                if produced:
+                    raise CoachStreamError(str(e)) from e
+                yield FALLBACK_MESSAGE
+                return
+
+    @staticmethod
+    def retry_delay(attempt, error=None):
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), settings.LLM_TIMEOUT)
+            except ValueError:
+                pass
+        # Full jitter: callers that failed together don't retry together
+        return random.uniform(0, settings.LLM_RETRY_BASE_DELAY * (2 ** attempt))
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
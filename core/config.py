@@ -1,3 +1,108 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def env_bool(name, default):
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
 class Settings:
-    ENV = "Development"
-settings = Settings()
\ No newline at end of file
+    ENV = os.getenv("ENV", "Development")
+
+    # Web server: uvicorn worker processes (python main.py; --reload in Development only).
+    # Every worker has its own connection pools, size them for WEB_CONCURRENCY x (pool + overflow)
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+    # Database connection pools (one per engine, sync and async). Not applied to in-memory SQLite
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    # Seconds a request waits for a free connection before failing
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Connections older than this are replaced (below server/proxy idle timeouts); -1 disables
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Tests each connection on checkout, drops the ones the server closed
+    DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+    # PostgreSQL statement_timeout per connection, 0 = none
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    # Read replica (READ_DATABASE_URL, see database.py): re-probed every READ_REPLICA_CHECK_INTERVAL
+    # seconds, set aside above READ_REPLICA_MAX_LAG seconds of replay lag (PostgreSQL, 0 = no limit).
+    # After a write the caller reads from the primary for READ_YOUR_WRITES_SECONDS (0 = off)
+    READ_REPLICA_CHECK_INTERVAL = float(os.getenv("READ_REPLICA_CHECK_INTERVAL", "5"))
+    READ_REPLICA_MAX_LAG = float(os.getenv("READ_REPLICA_MAX_LAG", "10"))
+    READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+    # Request profiler (optional pyinstrument, core/profiling.py): an admin profiles one request with
+    # X-Profile: 1 or ?profile=1; a PROFILE_SAMPLE_RATE share of all requests is profiled and kept when
+    # slower than PROFILE_SLOW_MS. Reports (PROFILE_FORMATS: html, speedscope) go to PROFILE_DIR
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_FORMATS = [f.strip() for f in os.getenv("PROFILE_FORMATS", "html,speedscope").split(",") if f.strip()]
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "1000"))
+    PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+    PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+    # X-Admin-Token expected by the /admin endpoints; empty = admin endpoints disabled
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    # Key signing the chat session cookie (HMAC). Empty = a random key per process: sessions end
+    # with the process and aren't shared between WEB_CONCURRENCY workers
+    SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+
+    # Background PDF reports (cached on disk, keyed by transaction-set fingerprint)
+    REPORT_DIR = os.getenv("REPORT_DIR", "reports")
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+    REPORT_CACHE_MAX_FILES = int(os.getenv("REPORT_CACHE_MAX_FILES", "20"))
+
+    # Receipt OCR process pool: beyond OCR_QUEUE_SIZE queued/running scans new ones get a 503
+    OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+    OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", "16"))
+    OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "60"))
+    OCR_RETRY_AFTER = int(os.getenv("OCR_RETRY_AFTER", "5"))
+    # Receipt parser: "text" (line-based) or "layout" (word boxes + column alignment, single pass)
+    OCR_PARSER = os.getenv("OCR_PARSER", "text")
+    # Longest side (px) fed to Tesseract: ~300 DPI for a receipt, 12MP phone photos are ~4000px
+    OCR_MAX_IMAGE_SIDE = int(os.getenv("OCR_MAX_IMAGE_SIDE", "2000"))
+
+    # Batch scanning (/scan-receipts): limits on images per request and on uncompressed upload size
+    OCR_BATCH_MAX_FILES = int(os.getenv("OCR_BATCH_MAX_FILES", "50"))
+    OCR_BATCH_MAX_BYTES = int(os.getenv("OCR_BATCH_MAX_BYTES", str(100 * 1024 * 1024)))
+
+    # OCR result cache (memory LRU + optional disk tier when OCR_CACHE_DIR is set)
+    OCR_CACHE_ENTRIES = int(os.getenv("OCR_CACHE_ENTRIES", "256"))
+    OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+    OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "")
+    OCR_CACHE_MAX_DISTANCE = int(os.getenv("OCR_CACHE_MAX_DISTANCE", "8"))
+    OCR_CACHE_MAX_THUMB_DIFF = float(os.getenv("OCR_CACHE_MAX_THUMB_DIFF", "0.5"))
+
+    # AI Coach (Groq). GROQ_BASE_URL points the client at another endpoint, e.g. tests/fake_llm_server.py
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+    LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+    # Max LLM calls in flight for the whole process, extra callers wait their turn
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+    # Per-caller admission control: LLM calls one caller can have running before getting a 429
+    LLM_MAX_IN_FLIGHT_PER_USER = int(os.getenv("LLM_MAX_IN_FLIGHT_PER_USER", "2"))
+    LLM_RETRY_AFTER = int(os.getenv("LLM_RETRY_AFTER", "5"))
+    # Transactions rendered with /home, the rest is loaded page by page from /transactions
+    TX_PAGE_SIZE = int(os.getenv("TX_PAGE_SIZE", "20"))
+    # Serenity score cache (services/score_cache.py): totals re-read from the rollup after this many
+    # seconds even without local writes, to pick up other processes' writes
+    SCORE_CACHE_TTL = float(os.getenv("SCORE_CACHE_TTL", "300"))
+    # Token budget of the financial digest sent with every coach prompt (services/coach_context.py)
+    COACH_CONTEXT_TOKENS = int(os.getenv("COACH_CONTEXT_TOKENS", "250"))
+    # Coach conversations (services/conversation_store.py): recent exchanges kept per session,
+    # their byte cap, the rolling summary of older turns and the sessions held in memory
+    CHAT_MAX_TURNS = int(os.getenv("CHAT_MAX_TURNS", "3"))
+    CHAT_MAX_BYTES = int(os.getenv("CHAT_MAX_BYTES", "6000"))
+    CHAT_SUMMARY_CHARS = int(os.getenv("CHAT_SUMMARY_CHARS", "800"))
+    CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+    # Coach answer cache (/generate-report, /calculate-plan), cleared on every transaction write
+    LLM_CACHE_ENTRIES = int(os.getenv("LLM_CACHE_ENTRIES", "128"))
+    LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+    # /analyze-spending: Gemini explanations reused while the same anomalies stay flagged
+    ANOMALY_CACHE_TTL = float(os.getenv("ANOMALY_CACHE_TTL", str(7 * 24 * 3600)))
+
+settings = Settings()
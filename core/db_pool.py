@@ -0,0 +1,140 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from core.config import settings
+
+
+class PoolStats:
+    """Checkout counters of one connection pool (what the pool itself doesn't keep)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0          # checkouts that didn't get a connection right away
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0       # gave up after DB_POOL_TIMEOUT
+        self.peak_checked_out = 0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            if seconds >= 0.001:
+                self.waits += 1
+                self.wait_total += seconds
+                self.wait_max = max(self.wait_max, seconds)
+
+    def record_checkout(self, checked_out):
+        with self._lock:
+            self.checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_avg_ms": round(self.wait_total / self.waits * 1000, 2) if self.waits else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 2),
+                "timeouts": self.timeouts,
+                "peak_checked_out": self.peak_checked_out,
+            }
+
+
+class _TimedPool:
+    """Mixin timing _do_get: the blocking part of a checkout (queue wait, or opening an overflow connection)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def _in_memory_sqlite(url):
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(url, is_async=False):
+    """
+    create_engine / create_async_engine keyword arguments from settings (DB_POOL_*, DB_STATEMENT_TIMEOUT_MS).
+    In-memory SQLite keeps SQLAlchemy's single-connection pool: a second connection would be another database.
+    """
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if _in_memory_sqlite(url):
+        return options
+
+    options.update(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    # Server-side cap on every statement (PostgreSQL): a runaway query frees its connection
+    timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS
+    if timeout_ms > 0 and make_url(url).get_backend_name() == "postgresql":
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout_ms)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    return options
+
+
+def track_checkouts(engine):
+    """Counts checkouts and the peak of connections in use (after the pool handed one out)"""
+    engine = getattr(engine, "sync_engine", engine)
+    if not isinstance(engine.pool, _TimedPool):
+        return
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        # engine.pool at call time: dispose() swaps in a new pool (sharing the same stats)
+        engine.pool.stats.record_checkout(engine.pool.checkedout())
+
+
+def pool_status(engine):
+    """Live state of an engine's pool plus the checkout counters"""
+    pool = getattr(engine, "sync_engine", engine).pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            # Connections opened beyond pool_size (negative while the pool isn't full yet)
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+            capacity=pool.size() + max(pool._max_overflow, 0),
+        )
+    if isinstance(pool, _TimedPool):
+        status.update(pool.stats.snapshot())
+    return status
@@ -0,0 +1,184 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+# Seconds. Prometheus' defaults plus 30s/60s for the LLM calls and OCR
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_OPERATIONS = {"select", "insert", "update", "delete", "with"}
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last one: above the largest bucket (+Inf only)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        # bisect_left: a value equal to a bound belongs to that bucket (le = less or equal)
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+def _labels(**labels):
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return ",".join(f'{name}="{value}"' for name, value in escaped)
+
+
+class Metrics:
+    """
+    Process-wide request, stage and query timings, rendered in the Prometheus text format (/metrics).
+
+    - smartsave_http_requests_total{method,route,status} and smartsave_http_request_duration_seconds{method,route}
+      from MetricsMiddleware (route = the path template, so /delete-goal/{goal_id} is one series)
+    - smartsave_stage_duration_seconds{stage}: explicit timers (metrics.stage) inside the services
+    - smartsave_db_query_duration_seconds{engine,operation}: every statement (instrument_queries)
+    Counters are per process: with several uvicorn workers each one exposes its own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}   # (method, route, status) -> count
+        self._latency = {}    # (method, route) -> Histogram
+        self._stages = {}     # stage -> Histogram
+        self._queries = {}    # (engine, operation) -> Histogram
+        self.in_flight = 0
+
+    def _observe(self, series, key, seconds):
+        with self._lock:
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_request(self, method, route, status, seconds):
+        with self._lock:
+            key = (method, route, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+        self._observe(self._latency, (method, route), seconds)
+
+    def observe_stage(self, stage, seconds):
+        self._observe(self._stages, stage, seconds)
+
+    def observe_query(self, engine, operation, seconds):
+        self._observe(self._queries, (engine, operation), seconds)
+
+    def record_timings(self, timings):
+        """Stage timings measured elsewhere (OCR worker processes), {stage: seconds}"""
+        for stage, seconds in timings.items():
+            self.observe_stage(stage, seconds)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.perf_counter() - start)
+
+    def render(self):
+        with self._lock:
+            lines = [
+                "# HELP smartsave_http_requests_total HTTP requests by route and status.",
+                "# TYPE smartsave_http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self._requests.items()):
+                lines.append(f"smartsave_http_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}")
+            lines += [
+                "# HELP smartsave_http_requests_in_flight HTTP requests being served.",
+                "# TYPE smartsave_http_requests_in_flight gauge",
+                f"smartsave_http_requests_in_flight {self.in_flight}",
+            ]
+            self._render_histograms(
+                lines, "smartsave_http_request_duration_seconds", "HTTP request latency (until the last body chunk).",
+                {_labels(method=m, route=r): h for (m, r), h in self._latency.items()},
+            )
+            self._render_histograms(
+                lines, "smartsave_stage_duration_seconds", "Time spent in instrumented stages.",
+                {_labels(stage=s): h for s, h in self._stages.items()},
+            )
+            self._render_histograms(
+                lines, "smartsave_db_query_duration_seconds", "Database statement execution time.",
+                {_labels(engine=e, operation=o): h for (e, o), h in self._queries.items()},
+            )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(lines, name, help_text, series):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for labels, histogram in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def timer(timings, name):
+    """Adds the block's duration to timings[name]: stages measured where `metrics` isn't the web process' one"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """Request count, status and latency per route template. Plain ASGI: streamed responses are timed to the end"""
+
+    def __init__(self, app, registry=metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500  # unless a response gets started
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.registry.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.registry.in_flight -= 1
+            # The router stores the matched route in the scope; no match = one series, not one per path
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.registry.observe_request(scope["method"], route, status, time.perf_counter() - start)
+
+
+def instrument_queries(engine, name, registry=metrics):
+    """Times every statement run through `engine` (sync or async), labelled engine=name and its operation"""
+    engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started_at"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started_at = conn.info.pop("query_started_at", None)
+        if started_at is None:
+            return
+        operation = (statement.split(None, 1) or ["other"])[0].lower()
+        registry.observe_query(name, operation if operation in QUERY_OPERATIONS else "other", time.perf_counter() - started_at)
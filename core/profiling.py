@@ -0,0 +1,197 @@
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from core.config import settings
+from core.security import is_admin_token
+
+# <name>.json holds the request metadata, the reports sit next to it
+PROFILE_NAME = re.compile(r"^\d{8}-\d{6}-[0-9a-f]{6}$")
+EXTENSIONS = {"html": ".html", "speedscope": ".speedscope.json"}
+
+
+def profiler_available():
+    """pyinstrument is an optional dependency: checked without importing it"""
+    return importlib.util.find_spec("pyinstrument") is not None
+
+
+class ProfileStore:
+    """Saved request profiles, newest first, at most `max_files` of them"""
+
+    def __init__(self, directory, max_files=50):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_name():
+        return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+    def save(self, name, meta, reports):
+        """reports: {format: rendered text}, written as <name><extension> with <name>.json alongside"""
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for fmt, content in reports.items():
+            filename = name + EXTENSIONS[fmt]
+            with open(os.path.join(self.directory, filename), "w", encoding="utf-8") as f:
+                f.write(content)
+            files.append(filename)
+        with open(os.path.join(self.directory, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump({**meta, "name": name, "files": files}, f)
+        self.prune()
+
+    def list(self):
+        profiles = []
+        for name in self._names():
+            try:
+                with open(os.path.join(self.directory, f"{name}.json"), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def path(self, filename):
+        """Path of a report file, or None if `filename` isn't one (no way out of the directory)"""
+        for extension in EXTENSIONS.values():
+            if filename.endswith(extension) and PROFILE_NAME.match(filename[:-len(extension)]):
+                return os.path.join(self.directory, filename)
+        return None
+
+    def prune(self):
+        with self._lock:
+            for name in self._names()[self.max_files:]:
+                for extension in (".json", *EXTENSIONS.values()):
+                    try:
+                        os.remove(os.path.join(self.directory, name + extension))
+                    except OSError:
+                        pass
+
+    def _names(self):
+        # Names start with the timestamp: reverse order = newest first
+        try:
+            entries = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        names = {entry[:-5] for entry in entries if entry.endswith(".json") and PROFILE_NAME.match(entry[:-5])}
+        return sorted(names, reverse=True)
+
+
+profile_store = ProfileStore(settings.PROFILE_DIR, max_files=settings.PROFILE_MAX_FILES)
+
+
+def _header(scope, name):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _with_header(send, name, value):
+    async def send_with_header(message):
+        if message["type"] == "http.response.start":
+            message["headers"] = list(message.get("headers", [])) + [(name, value)]
+        await send(message)
+    return send_with_header
+
+
+class ProfilerMiddleware:
+    """
+    Per-request sampling profiler (pyinstrument, async mode: only the request's own task is sampled).
+
+    - on demand: an admin sends X-Profile: 1 (or ?profile=1) with X-Admin-Token; the response
+      carries X-Profile-Id and the report is always kept, or X-Profile-Skipped: busy when
+      another profile is running
+    - sampled: a `sample_rate` share of all requests is profiled, kept only when slower than `slow_ms`
+    Reports are rendered off the event loop once the response is sent. One profile at a time per
+    process; requests that aren't profiled only pay for the header/query check.
+    """
+
+    def __init__(self, app, store=profile_store, sample_rate=0.0, slow_ms=1000.0, interval=0.001, formats=("html",)):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.interval = interval
+        self.formats = [fmt for fmt in formats if fmt in EXTENSIONS]
+        self._active = False
+
+    @staticmethod
+    def _flagged(scope):
+        if _header(scope, b"x-profile") in ("1", "true"):
+            return True
+        query = scope.get("query_string", b"")
+        return b"profile=" in query and parse_qs(query.decode("latin-1")).get("profile") in (["1"], ["true"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        trigger = None
+        if self._flagged(scope):
+            if is_admin_token(_header(scope, b"x-admin-token")):
+                if self._active:
+                    # The admin asked for a profile: say why there is none
+                    return await self.app(scope, receive, _with_header(send, b"x-profile-skipped", b"busy"))
+                trigger = "flag"
+        elif self.sample_rate and not self._active and random.random() < self.sample_rate:
+            trigger = "sample"
+        if trigger is None:
+            return await self.app(scope, receive, send)
+        await self._profile(scope, receive, send, trigger)
+
+    async def _profile(self, scope, receive, send, trigger):
+        from pyinstrument import Profiler
+
+        name = self.store.new_name()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trigger == "flag":
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", name.encode())]
+            await send(message)
+
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        self._active = True
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            self._active = False
+            duration_ms = (time.perf_counter() - start) * 1000
+            if trigger == "flag" or duration_ms >= self.slow_ms:
+                meta = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(scope.get("route"), "path", None),
+                    "status": status,
+                    "duration_ms": round(duration_ms, 1),
+                    "trigger": trigger,
+                    "created_at": time.time(),
+                }
+                try:
+                    await asyncio.to_thread(self._save, name, profiler, meta)
+                except Exception as e:
+                    print(f"⚠️ Could not save profile {name}: {e}")
+
+    def _save(self, name, profiler, meta):
+        reports = {}
+        for fmt in self.formats:
+            if fmt == "html":
+                reports[fmt] = profiler.output_html()
+            else:
+                from pyinstrument.renderers import SpeedscopeRenderer
+                reports[fmt] = profiler.output(renderer=SpeedscopeRenderer())
+        self.store.save(name, meta, reports)
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+from sqlalchemy import text
+
+# Set on the responses of successful writes when READ_YOUR_WRITES_SECONDS > 0: its value is the
+# time (epoch seconds) until which the caller's reads stay on the primary
+WRITE_COOKIE = "smartsave_wrote"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# PostgreSQL standby: 0 when everything received is replayed, else the age of the last replayed
+# transaction (NULL on a primary)
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaHealth:
+    """
+    Whether the read replica can serve reads.
+
+    Probed at most every `check_interval` seconds by the request that needs it (SELECT 1, plus the
+    replay lag on PostgreSQL, unhealthy above `max_lag` seconds), and marked down as soon as a read
+    fails on it. While it's down the read routes use the primary; the next probe brings it back.
+    """
+
+    def __init__(self, engine, check_interval=5.0, max_lag=0, probe_timeout=2.0):
+        self.engine = engine
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self.probe_timeout = probe_timeout
+        self.healthy = engine is not None
+        self.checked_at = None
+        self.lag = None
+        self.last_error = None
+        self.fallbacks = 0
+        self._probing = False
+
+    @property
+    def enabled(self):
+        return self.engine is not None
+
+    async def available(self):
+        if self.engine is None:
+            return False
+        due = self.checked_at is None or time.monotonic() - self.checked_at >= self.check_interval
+        # One probe at a time, concurrent requests go with the last known state
+        if due and not self._probing:
+            await self.probe()
+        if not self.healthy:
+            self.fallbacks += 1
+        return self.healthy
+
+    async def probe(self):
+        self._probing = True
+        try:
+            self.lag = await asyncio.wait_for(self._measure_lag(), self.probe_timeout)
+        except Exception as e:
+            self._set_health(False, f"{type(e).__name__}: {e}")
+        else:
+            if self.max_lag and self.lag is not None and self.lag > self.max_lag:
+                self._set_health(False, f"replication lag {self.lag:.1f}s > {self.max_lag}s")
+            else:
+                self._set_health(True, None)
+        finally:
+            self.checked_at = time.monotonic()
+            self._probing = False
+        return self.healthy
+
+    async def _measure_lag(self):
+        async with self.engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                lag = await conn.scalar(LAG_QUERY)
+                return float(lag) if lag is not None else None
+            await conn.execute(text("SELECT 1"))
+            return None
+
+    def mark_down(self, error):
+        """A read failed on the replica: fall back right away, re-probe after check_interval"""
+        self._set_health(False, f"{type(error).__name__}: {error}")
+        self.checked_at = time.monotonic()
+
+    def _set_health(self, healthy, error):
+        if healthy != self.healthy:
+            if healthy:
+                print("✅ Read replica is back, reads use it again")
+            else:
+                print(f"⚠️ Read replica unavailable ({error}), reads fall back to the primary")
+        self.healthy = healthy
+        self.last_error = error
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "last_error": self.last_error,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def recently_wrote(request):
+    """The caller made a write less than READ_YOUR_WRITES_SECONDS ago (see ReadYourWritesMiddleware)"""
+    try:
+        return float(request.cookies.get(WRITE_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """
+    Marks the callers of successful writes (non-GET requests answered < 400) with WRITE_COOKIE for
+    `window` seconds, so get_read_db sends their next reads to the primary instead of a replica
+    that may not have their write yet. Plain ASGI: streamed responses pass through untouched.
+    """
+
+    def __init__(self, app, window):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (
+                    f"{WRITE_COOKIE}={time.time() + self.window:.0f}; Max-Age={self.window:.0f}; "
+                    "Path=/; HttpOnly; SameSite=lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
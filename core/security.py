@@ -0,0 +1,59 @@
+import hashlib
+import hmac
+import secrets
+
+from fastapi import Header, HTTPException
+
+from core.config import settings
+
+# Signs the session cookies when SESSION_SECRET is unset
+_process_session_key = secrets.token_bytes(32)
+
+# Password hashing: passlib and bcrypt are only imported by the first signup or login
+_pwd_context = None
+
+
+def password_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+
+def hash_password(password):
+    return password_context().hash(password)
+
+
+def verify_password(password, hashed_password):
+    return password_context().verify(password, hashed_password)
+
+
+def is_admin_token(token):
+    """True when ADMIN_TOKEN is set and `token` matches it (constant-time)"""
+    # Compared as bytes: compare_digest rejects non-ASCII str, and headers may carry any latin-1 byte
+    return bool(settings.ADMIN_TOKEN) and hmac.compare_digest((token or "").encode(), settings.ADMIN_TOKEN.encode())
+
+
+def require_admin(x_admin_token: str = Header(default="")):
+    """Dependency of the /admin endpoints: X-Admin-Token must match ADMIN_TOKEN (403 when it's unset)"""
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def _session_signature(session_id):
+    key = settings.SESSION_SECRET.encode() if settings.SESSION_SECRET else _process_session_key
+    return hmac.new(key, session_id.encode(), hashlib.sha256).hexdigest()
+
+
+def sign_session(session_id):
+    """Cookie value for a session id issued by the server: the id and its HMAC"""
+    return f"{session_id}.{_session_signature(session_id)}"
+
+
+def verify_session(value):
+    """Session id of a cookie value made by sign_session, None if it is unsigned, malformed or forged"""
+    session_id, _, signature = (value or "").partition(".")
+    if not session_id or not signature:
+        return None
+    return session_id if hmac.compare_digest(signature.encode(), _session_signature(session_id).encode()) else None
@@ -1,15 +1,65 @@
 # database.py
-import os   
+import os
 from dotenv import load_dotenv
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from core.config import settings
+from core.db_pool import engine_options, track_checkouts
+from core.metrics import instrument_queries
+from core.replica import ReplicaHealth, recently_wrote
+
 load_dotenv()
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def to_async_url(url):
+    """Maps a sync DATABASE_URL onto its async driver (asyncpg for PostgreSQL, aiosqlite for SQLite)"""
+    scheme, sep, rest = url.partition("://")
+    driver = scheme.split("+")[0]
+    if driver in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+# Optional read-only replica for the GET pages (see get_read_db); writes always go to DATABASE_URL
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL") or None
+READ_ASYNC_DATABASE_URL = os.getenv("READ_ASYNC_DATABASE_URL") or (to_async_url(READ_DATABASE_URL) if READ_DATABASE_URL else None)
+
+# Sync engine: startup tasks, maintenance scripts and the PDF worker processes
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+track_checkouts(engine)
+instrument_queries(engine, "primary")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine: used by the async route handlers so queries don't block the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+track_checkouts(async_engine)
+instrument_queries(async_engine, "primary")
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Read replica engines: same pool settings, sessions never written through
+read_engine = read_async_engine = ReadSessionLocal = AsyncReadSessionLocal = None
+if READ_DATABASE_URL:
+    read_engine = create_engine(READ_DATABASE_URL, **engine_options(READ_DATABASE_URL))
+    track_checkouts(read_engine)
+    instrument_queries(read_engine, "replica")
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    read_async_engine = create_async_engine(READ_ASYNC_DATABASE_URL, **engine_options(READ_ASYNC_DATABASE_URL, is_async=True))
+    track_checkouts(read_async_engine)
+    instrument_queries(read_async_engine, "replica")
+    AsyncReadSessionLocal = async_sessionmaker(read_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+replica = ReplicaHealth(
+    read_async_engine,
+    check_interval=settings.READ_REPLICA_CHECK_INTERVAL,
+    max_lag=settings.READ_REPLICA_MAX_LAG,
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -17,4 +67,30 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def use_replica(request):
+    """Reads of this request may go to the replica: configured, healthy, and the caller hasn't just written"""
+    return replica.enabled and not recently_wrote(request) and await replica.available()
+
+async def get_read_db(request: Request):
+    """Session for the read-only routes: the replica when use_replica() allows it, else the primary"""
+    if not await use_replica(request):
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    async with AsyncReadSessionLocal() as db:
+        try:
+            yield db
+        except (OperationalError, InterfaceError) as e:
+            # This request fails, the next ones go to the primary until the replica answers a probe again
+            replica.mark_down(e)
+            raise
+
+async def get_read_sessionmaker(request: Request):
+    """Sync session factory for the streamed exports (ReportExporter), chosen like get_read_db"""
+    return ReadSessionLocal if await use_replica(request) else SessionLocal
@@ -1,11 +1,18 @@
-import uvicorn
 import models.models as models_file
-from database import engine, Base
+from sqlalchemy import select
+from database import async_engine, read_async_engine, replica, AsyncSessionLocal, Base
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
-from web.routes import router as web_router
+from web.routes import router as web_router, coach
 from core.config import settings
+from core.replica import ReadYourWritesMiddleware
+from core.metrics import MetricsMiddleware
+from core.profiling import ProfilerMiddleware, profiler_available
+from services.spending_rollup import SpendingRollup
+from services.data_version import TransactionVersion
+from services.pdf_report import pdf_jobs
+from services.ocr_service import ocr_jobs
 
 # 1. Gestion du cycle de vie (Lifespan) - Remplace on_event("startup")
 @asynccontextmanager
@@ -14,12 +21,30 @@ async def lifespan(app: FastAPI):
     
     # CRÉATION DES TABLES DANS POSTGRESQL
     # Cette ligne vérifie tes classes dans models.py et crée les tables dans pgAdmin
-    Base.metadata.create_all(bind=engine)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        # create_all skips indexes of tables that already exist
+        for index in models_file.Transaction.__table__.indexes:
+            await conn.run_sync(index.create, checkfirst=True)
+
+    # Backfill the spending rollup on first start after the upgrade
+    async with AsyncSessionLocal() as db:
+        if await db.scalar(select(models_file.DailySpending.day).limit(1)) is None \
+                and await db.scalar(select(models_file.Transaction.id).limit(1)) is not None:
+            print(f"Spending rollup backfilled: {await db.run_sync(SpendingRollup.rebuild)} rows")
+        # Cache keys of the reports and coach answers (see TransactionVersion)
+        await db.run_sync(TransactionVersion.ensure)
     
     print(f"Environment: {settings.ENV}")
     print("Database: Connected & Tables Created")
     print("AI Coach: Ready")
     yield
+    pdf_jobs.shutdown()
+    ocr_jobs.shutdown()
+    await coach.aclose()
+    await async_engine.dispose()
+    if read_async_engine is not None:
+        await read_async_engine.dispose()
     print("=== SmartSave Engine Shutting Down ===")
 
 def create_app() -> FastAPI:
@@ -39,9 +64,33 @@ def create_app() -> FastAPI:
     # Inclusion des routes
     app.include_router(web_router)
 
+    # With a read replica: a caller's reads stay on the primary for a few seconds after their writes
+    if replica.enabled and settings.READ_YOUR_WRITES_SECONDS > 0:
+        app.add_middleware(ReadYourWritesMiddleware, window=settings.READ_YOUR_WRITES_SECONDS)
+    # Request profiler: only when someone can trigger it (admin token or sampling) and pyinstrument is installed
+    if settings.ADMIN_TOKEN or settings.PROFILE_SAMPLE_RATE > 0:
+        if profiler_available():
+            app.add_middleware(
+                ProfilerMiddleware,
+                sample_rate=settings.PROFILE_SAMPLE_RATE,
+                slow_ms=settings.PROFILE_SLOW_MS,
+                interval=settings.PROFILE_INTERVAL,
+                formats=settings.PROFILE_FORMATS,
+            )
+        else:
+            print("⚠️ pyinstrument is not installed: request profiling is disabled (pip install -r requirements-optional.txt)")
+
+    if not settings.SESSION_SECRET and settings.WEB_CONCURRENCY > 1:
+        print("⚠️ SESSION_SECRET is not set: each worker signs its own chat sessions, set it so they are shared")
+
+    # Added last = outermost: times the whole request, other middlewares included
+    app.add_middleware(MetricsMiddleware)
+
     return app
 
 app = create_app()
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    import uvicorn
+    dev = settings.ENV == "Development"
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=dev, workers=1 if dev else settings.WEB_CONCURRENCY)
\ No newline at end of file
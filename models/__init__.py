@@ -1 +1 @@
-from .models import Transaction, Goal
\ No newline at end of file
+from .models import Transaction, Goal, DailySpending, DataVersion
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Date, Text, Index
 from database import Base
 from datetime import datetime
 
@@ -12,6 +12,26 @@ class Transaction(Base):
     date = Column(DateTime, default=datetime.utcnow)
     is_essential = Column(Boolean, default=True)
 
+    # Keyset pagination of the feed (newest first, see TransactionFeed)
+    __table_args__ = (Index("ix_transactions_date_id", "date", "id"),)
+
+class DailySpending(Base):
+    """Rollup of transactions per day and category, kept in sync by the write routes"""
+    __tablename__ = "daily_spending"
+
+    day = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True)
+    total = Column(Float, default=0.0)
+    tx_count = Column(Integer, default=0)
+
+class DataVersion(Base):
+    """Version of the transaction set, bumped by every transaction write (see TransactionVersion)"""
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    token = Column(String)     # random per database: a recreated database never reuses old versions
+    version = Column(Integer, default=0)
+
 class Goal(Base):
     __tablename__ = "goals"
 
@@ -39,4 +59,22 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
-    monthly_budget = Column(Float, default=0.0)
\ No newline at end of file
+    monthly_budget = Column(Float, default=0.0)
+
+class ChatSession(Base):
+    """One coach conversation (browser session), with the rolling summary of its older turns"""
+    __tablename__ = "chat_sessions"
+
+    id = Column(String, primary_key=True)
+    summary = Column(Text, default="")
+    summary_until = Column(Integer, default=0)  # last ChatMessage.id folded into the summary
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String, index=True)
+    role = Column(String)     # user / assistant
+    content = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
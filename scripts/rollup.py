@@ -0,0 +1,44 @@
+"""
+Maintenance command for the daily/category spending rollup.
+
+    python scripts/rollup.py rebuild   # backfill from the transactions table
+    python scripts/rollup.py check     # report drift against the transactions table (exit code 1 if any)
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Fix imports for project root
+root_path = Path(__file__).parent.parent
+if str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+from database import SessionLocal, Base, engine
+from services.spending_rollup import SpendingRollup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SmartSave spending rollup maintenance")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            rows = SpendingRollup.rebuild(db)
+            print(f"Rollup rebuilt: {rows} (day, category) rows")
+            return 0
+
+        drift = SpendingRollup.check_drift(db)
+        for d in drift:
+            print(f"DRIFT {d['day']} {d['category']}: raw={d['raw_total']} ({d['raw_count']} tx) "
+                  f"rollup={d['rollup_total']} ({d['rollup_count']} tx)")
+        print("Rollup OK" if not drift else f"{len(drift)} drifted rows, run 'rebuild' to fix")
+        return 1 if drift else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
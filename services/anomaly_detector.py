@@ -0,0 +1,185 @@
+import math
+import statistics
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from models.models import Transaction
+
+SEVERITY_ORDER = {"low": 0, "medium": 1, "high": 2}
+
+
+class AnomalyDetector:
+    """
+    Local statistical pre-filter for /analyze-spending: the LLM is only asked when something is flagged.
+
+    Each of the last RECENT transactions is compared to the history before it:
+    - robust z-score (median/MAD of the log amounts) against the same merchant; above
+      SPIKE_RATIO x the merchant's usual price it is reported as a price spike
+    - a merchant never seen before is compared to the upper quartile of its category (robust to
+      earlier anomalies in the history)
+    - fixed-price merchants (subscriptions) are flagged as soon as the price goes up
+    and the month's non-essential spending is compared to the monthly budget.
+    analyze() returns the /analyze-spending JSON shape (has_anomaly, severity, reason, advice).
+    """
+
+    RECENT = 20
+    HISTORY_DAYS = 180
+    HISTORY_MAX_ROWS = 5000
+    MIN_HISTORY = 10          # points needed before a z-score means anything
+    MIN_LOG_MAD = 0.1         # ~10% spread: tiny samples of near-identical prices don't flag small changes
+    Z_MEDIUM = 3.5            # modified z-score thresholds (Iglewicz & Hoaglin)
+    Z_HIGH = 7.0
+    SPIKE_RATIO = 2.0         # x the merchant's median price
+    NEW_MERCHANT_RATIO = 3.0  # x the upper quartile of the category
+    PRICE_CHANGE = 1.1        # for merchants that always charge the same amount
+    NON_ESSENTIAL_SHARE = 0.3  # of the monthly budget (the "wants" of the 50/30/20 rule), 0.5 = high
+
+    # --- DATA ---
+
+    @staticmethod
+    def load(db, today=None):
+        """(recent transactions newest first, history rows, non-essential spending this month)"""
+        today = today or datetime.utcnow().date()
+        since = datetime.combine(today - timedelta(days=AnomalyDetector.HISTORY_DAYS), datetime.min.time())
+        columns = (Transaction.id, Transaction.date, Transaction.merchant, Transaction.category, Transaction.amount)
+
+        recent = db.query(*columns).order_by(Transaction.date.desc()).limit(AnomalyDetector.RECENT).all()
+        history = db.query(*columns).filter(Transaction.date >= since) \
+            .order_by(Transaction.date.desc()).limit(AnomalyDetector.HISTORY_MAX_ROWS).all()
+        month_start = datetime.combine(today.replace(day=1), datetime.min.time())
+        non_essential = db.query(func.sum(Transaction.amount)) \
+            .filter(Transaction.date >= month_start, Transaction.is_essential.is_(False)).scalar()
+        return recent, history, float(non_essential or 0)
+
+    # --- DETECTION ---
+
+    @staticmethod
+    def _baseline(amounts):
+        """(median, median of log amounts, MAD of log amounts): spending amounts are roughly log-normal"""
+        logs = [math.log(a) for a in amounts if a > 0] or [0.0]
+        log_median = statistics.median(logs)
+        return statistics.median(amounts), log_median, statistics.median(abs(x - log_median) for x in logs)
+
+    @staticmethod
+    def detect(recent, history, budget, non_essential_month=0.0):
+        """Findings as dicts (kind, severity, message, transaction id), most severe first"""
+        recent_ids = {t.id for t in recent}
+        groups = defaultdict(list)  # ("merchant", name) / ("category", name) -> amounts before the recent window
+        for t in history:
+            if t.id in recent_ids:
+                continue
+            groups["merchant", (t.merchant or "").lower()].append(t.amount)
+            groups["category", t.category].append(t.amount)
+        baselines = {}
+
+        def baseline(key):
+            if key not in baselines:
+                baselines[key] = AnomalyDetector._baseline(groups[key])
+            return baselines[key]
+
+        findings = []
+        for t in recent:
+            merchant_key = ("merchant", (t.merchant or "").lower())
+            merchant_history = len(groups.get(merchant_key, ()))
+            ratio = None
+
+            # 1. Price against the merchant's usual price
+            if merchant_history >= 2:
+                median, _, log_mad = baseline(merchant_key)
+                ratio = t.amount / median if median > 0 else None
+                if ratio and log_mad == 0:
+                    # Always the same amount (subscription, fixed price): any increase is news
+                    if ratio >= AnomalyDetector.SPIKE_RATIO:
+                        findings.append(AnomalyDetector._finding(
+                            "price_spike", "high", t, f"{t.merchant} charged {t.amount:g}€, {ratio:.1f}x its usual {median:g}€"))
+                    elif ratio >= AnomalyDetector.PRICE_CHANGE:
+                        findings.append(AnomalyDetector._finding(
+                            "price_change", "low", t, f"{t.merchant} went up from {median:g}€ to {t.amount:g}€"))
+                    continue
+
+            # 2. Merchant never seen before: compared to the top of its category (categories mix
+            # merchants with very different tickets, a z-score over them would be too wide)
+            category_amounts = groups.get(("category", t.category), ())
+            if merchant_history == 0 and len(category_amounts) >= AnomalyDetector.MIN_HISTORY:
+                upper_quartile = statistics.quantiles(category_amounts, n=4)[-1]
+                if upper_quartile > 0 and t.amount >= upper_quartile * AnomalyDetector.NEW_MERCHANT_RATIO:
+                    ratio = t.amount / upper_quartile
+                    findings.append(AnomalyDetector._finding(
+                        "unusual_amount", "high" if ratio >= AnomalyDetector.NEW_MERCHANT_RATIO * 2 else "medium", t,
+                        f"New merchant {t.merchant}: {t.amount:g}€ is {ratio:.1f}x a usual big {t.category} expense ({upper_quartile:.0f}€)"))
+                continue
+
+            # 3. Robust z-score against the merchant's own history
+            if merchant_history < AnomalyDetector.MIN_HISTORY:
+                continue
+            key = merchant_key
+            median, log_median, log_mad = baseline(key)
+            if log_mad == 0 or t.amount <= 0:
+                continue
+            z = 0.6745 * (math.log(t.amount) - log_median) / max(log_mad, AnomalyDetector.MIN_LOG_MAD)
+            if z < AnomalyDetector.Z_MEDIUM:
+                continue
+            # No ratio when refunds pull the merchant's median to zero or below
+            high = z >= AnomalyDetector.Z_HIGH or (ratio or 0) >= AnomalyDetector.SPIKE_RATIO * 2
+            if (ratio or 0) >= AnomalyDetector.SPIKE_RATIO:
+                findings.append(AnomalyDetector._finding(
+                    "price_spike", "high" if high else "medium", t,
+                    f"{t.merchant} charged {t.amount:g}€, {ratio:.1f}x its usual {median:g}€"))
+            else:
+                findings.append(AnomalyDetector._finding(
+                    "unusual_amount", "high" if high else "medium", t,
+                    f"{t.merchant} {t.amount:g}€ is far above its usual {median:g}€"))
+
+        # 4. Non-essential overspend against the monthly budget
+        if budget and non_essential_month > budget * AnomalyDetector.NON_ESSENTIAL_SHARE:
+            share = non_essential_month / budget
+            findings.append({
+                "kind": "non_essential_overspend",
+                "severity": "high" if share >= 0.5 else "medium",
+                "message": f"Non-essential spending is {non_essential_month:.0f}€ this month, {share * 100:.0f}% of the {budget:g}€ budget",
+                "transaction_id": None,
+            })
+
+        findings.sort(key=lambda f: SEVERITY_ORDER[f["severity"]], reverse=True)
+        return findings
+
+    @staticmethod
+    def signature(findings):
+        """What was flagged, without the amounts: the same anomalies keep the same explanation"""
+        return sorted((f["kind"], f["severity"], f["transaction_id"] or 0) for f in findings)
+
+    @staticmethod
+    def _finding(kind, severity, t, message):
+        return {"kind": kind, "severity": severity, "message": message, "transaction_id": t.id}
+
+    # --- RESULT ---
+
+    @staticmethod
+    def analyze(recent, history, budget, non_essential_month=0.0):
+        """(findings, local analysis in the /analyze-spending shape)"""
+        findings = AnomalyDetector.detect(recent, history, budget, non_essential_month)
+        return findings, AnomalyDetector.summarize(findings, len(recent))
+
+    @staticmethod
+    def summarize(findings, reviewed):
+        if not findings:
+            return {
+                "has_anomaly": False,
+                "severity": "low",
+                "reason": f"No unusual spending in your last {reviewed} transactions.",
+                "advice": "Everything looks in line with your habits, keep it up!",
+            }
+        advice = {
+            "price_spike": "Check this charge with the merchant and your bank statement.",
+            "price_change": "Review this subscription: is it still worth the new price?",
+            "unusual_amount": "Make sure this expense was planned and adjust this month's budget.",
+            "non_essential_overspend": "Pause non-essential purchases until the end of the month.",
+        }
+        return {
+            "has_anomaly": True,
+            "severity": findings[0]["severity"],
+            "reason": " ".join(f["message"] + "." for f in findings[:3]),
+            "advice": advice[findings[0]["kind"]],
+        }
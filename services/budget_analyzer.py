@@ -1,31 +1,35 @@
 from datetime import datetime
 
+CATEGORY_ICONS = {
+    "Food": "fa-utensils", "Transport": "fa-car", "Housing": "fa-house",
+    "Shopping": "fa-bag-shopping", "Health": "fa-heart-pulse",
+    "Entertainment": "fa-gamepad", "Bills": "fa-file-invoice-dollar",
+    "Fun": "fa-face-smile", "Subs": "fa-tv"
+}
+
 class BudgetAnalyzer:
     @staticmethod
     def get_category_insights(tx_list, total_spent):
-        icons = {
-            "Food": "fa-utensils", "Transport": "fa-car", "Housing": "fa-house",
-            "Shopping": "fa-bag-shopping", "Health": "fa-heart-pulse", 
-            "Entertainment": "fa-gamepad", "Bills": "fa-file-invoice-dollar"
-        }
-        
-        cat_totals = {}
-        for t in tx_list:
-            name = t.category if hasattr(t, 'category') else t['category']
-            amt = float(t.amount if hasattr(t, 'amount') else t['amount'])
-            cat_totals[name] = cat_totals.get(name, 0) + amt
+        """tx_list: a TransactionFrame, or records (dicts / ORM objects) turned into one"""
+        from services.transaction_frame import TransactionFrame
+
+        cat_totals = TransactionFrame.of(tx_list).category_totals()
+        return BudgetAnalyzer.insights_from_totals(cat_totals, total_spent)
 
+    @staticmethod
+    def insights_from_totals(cat_totals, total_spent):
+        """Builds the insight cards from precomputed {category: amount} totals (e.g. a SQL GROUP BY)."""
         insights = []
         for name, amt in sorted(cat_totals.items(), key=lambda x: x[1], reverse=True):
             percentage = int((amt / total_spent * 100)) if total_spent > 0 else 0
             is_high = percentage > 30
-            
+
             insights.append({
                 "name": name,
                 "amount": round(amt, 2),
                 "percentage": percentage,
-                "icon": icons.get(name, "fa-tag"),
+                "icon": CATEGORY_ICONS.get(name, "fa-tag"),
                 "color": "#EF4444" if is_high else "#10B981",
                 "status": "High Spending" if is_high else "On track"
             })
-        return insights
\ No newline at end of file
+        return insights
@@ -0,0 +1,164 @@
+import statistics
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from models.models import DailySpending, Transaction
+from services.serenity_engine import SerenityEngine
+
+
+def estimate_tokens(text):
+    """~4 characters per token for English/French on Llama-style tokenizers, close enough for budgeting"""
+    return (len(text) + 3) // 4
+
+
+class CoachContext:
+    """
+    Compact, token-budgeted digest of the user's finances for the coach prompts.
+
+    Replaces the raw "merchant: amount (category)" lists: one block with the score, the month's
+    category totals against last month, top merchants, the last 7 days trend, outliers and a few
+    recent transactions. Sections are added by priority until `token_budget` is reached.
+    The data isn't per user: one digest is kept and shared by every caller and turn until the
+    transactions or the budget change.
+    """
+
+    TOP_CATEGORIES = 6
+    TOP_MERCHANTS = 4
+    RECENT = 5
+    OUTLIER_WINDOW_DAYS = 60
+    OUTLIER_MAX_ROWS = 500
+
+    def __init__(self, token_budget=250):
+        self.token_budget = token_budget
+        self._cached = None  # (transaction-set version, budget, digest)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    # --- CACHE ---
+
+    def get(self, db, budget, version):
+        """Digest of the current data, rebuilt only when the transaction-set version or the budget changed"""
+        with self._lock:
+            cached = self._cached
+            if cached is not None and cached[0] == version and cached[1] == budget:
+                self.hits += 1
+                return cached[2]
+        digest = self.build(db, budget)
+        with self._lock:
+            self._cached = (version, budget, digest)
+            self.builds += 1
+        return digest
+
+    def invalidate(self):
+        with self._lock:
+            self._cached = None
+
+    # --- DIGEST ---
+
+    def build(self, db, budget, today=None):
+        today = today or datetime.utcnow().date()
+        month_start = today.replace(day=1)
+        prev_month_start = (month_start - timedelta(days=1)).replace(day=1)
+
+        analysis = SerenityEngine.analyze_rollup(db, budget)
+        if analysis["total_spent"] == 0:
+            return f"Serenity {analysis['score']}/100, budget {budget:g}€, no transactions yet."
+
+        this_month = self._category_totals(db, month_start, today + timedelta(days=1))
+        last_month = self._category_totals(db, prev_month_start, month_start)
+        month_total = sum(this_month.values())
+
+        # 1. Always present: score and budget use
+        headline = f"Serenity {analysis['score']}/100 ({analysis['status']}), spent {analysis['total_spent']:.0f}€ in total"
+        if budget:
+            headline += f", {month_total:.0f}€ this month = {month_total / budget * 100:.0f}% of the {budget:g}€ budget"
+        lines = [headline]
+
+        # 2. Category totals this month vs last month
+        if this_month:
+            parts = []
+            for category, amount in sorted(this_month.items(), key=lambda x: x[1], reverse=True)[:self.TOP_CATEGORIES]:
+                previous = last_month.get(category)
+                delta = f" ({(amount - previous) / previous * 100:+.0f}%)" if previous else " (new)"
+                parts.append(f"{category} {amount:.0f}€{delta}")
+            lines.append("Month by category (vs last month): " + ", ".join(parts))
+
+        # 3. Top merchants this month
+        month_start_dt = datetime.combine(month_start, datetime.min.time())
+        merchants = db.query(
+            Transaction.merchant, func.sum(Transaction.amount), func.count(Transaction.id)
+        ).filter(Transaction.date >= month_start_dt).group_by(Transaction.merchant) \
+            .order_by(func.sum(Transaction.amount).desc()).limit(self.TOP_MERCHANTS).all()
+        if merchants:
+            lines.append("Top merchants: " + ", ".join(f"{m} {total:.0f}€ x{count}" for m, total, count in merchants))
+
+        # 4. Short-term trend: last 7 days vs the 7 before
+        week = self._window_total(db, today - timedelta(days=6), today + timedelta(days=1))
+        prev_week = self._window_total(db, today - timedelta(days=13), today - timedelta(days=6))
+        if week or prev_week:
+            trend = f" ({(week - prev_week) / prev_week * 100:+.0f}%)" if prev_week else ""
+            lines.append(f"Last 7 days {week:.0f}€ vs {prev_week:.0f}€ the week before{trend}")
+
+        # 5. Outliers and most recent transactions
+        outliers = self._outliers(db, today)
+        if outliers:
+            lines.append("Unusual: " + "; ".join(outliers))
+        recent = db.query(Transaction.merchant, Transaction.amount, Transaction.category) \
+            .order_by(Transaction.id.desc()).limit(self.RECENT).all()
+        if recent:
+            lines.append("Recent: " + "; ".join(f"{m} {a:g}€ {c or ''}".strip() for m, a, c in recent))
+
+        return self.fit(lines, self.token_budget)
+
+    @staticmethod
+    def fit(lines, token_budget):
+        """Keeps whole lines in priority order, then cuts the last one at an item boundary"""
+        kept, used = [], 0
+        for line in lines:
+            cost = estimate_tokens(line) + 1
+            if used + cost <= token_budget:
+                kept.append(line)
+                used += cost
+                continue
+            head, _, items = line.partition(": ")
+            items = items.split(", " if ", " in items else "; ")
+            while len(items) > 1 and estimate_tokens(f"{head}: {', '.join(items)}") + 1 + used > token_budget:
+                items.pop()
+            shortened = f"{head}: {', '.join(items)}"
+            if items and items[0] and estimate_tokens(shortened) + 1 + used <= token_budget:
+                kept.append(shortened)
+            break
+        return "\n".join(kept)
+
+    @staticmethod
+    def _category_totals(db, start, end):
+        rows = db.query(DailySpending.category, func.sum(DailySpending.total)) \
+            .filter(DailySpending.day >= start, DailySpending.day < end) \
+            .group_by(DailySpending.category).all()
+        return {category: float(total or 0) for category, total in rows if total}
+
+    @staticmethod
+    def _window_total(db, start, end):
+        total = db.query(func.sum(DailySpending.total)) \
+            .filter(DailySpending.day >= start, DailySpending.day < end).scalar()
+        return float(total or 0)
+
+    def _outliers(self, db, today):
+        """Amounts far above the usual ticket (median + 5 MADs, at least 3x the median), biggest first"""
+        since = datetime.combine(today - timedelta(days=self.OUTLIER_WINDOW_DAYS), datetime.min.time())
+        rows = db.query(Transaction.date, Transaction.merchant, Transaction.amount, Transaction.category) \
+            .filter(Transaction.date >= since).order_by(Transaction.id.desc()).limit(self.OUTLIER_MAX_ROWS).all()
+        if len(rows) < 5:
+            return []
+        amounts = [row.amount for row in rows]
+        median = statistics.median(amounts)
+        mad = statistics.median(abs(a - median) for a in amounts) * 1.4826
+        threshold = max(median * 3, median + 5 * mad)
+        flagged = sorted((row for row in rows if row.amount > threshold), key=lambda r: r.amount, reverse=True)[:3]
+        return [
+            f"{row.date:%d/%m} {row.merchant} {row.amount:g}€ ({row.category}, {row.amount / median:.0f}x usual)"
+            for row in flagged
+        ]
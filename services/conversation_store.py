@@ -0,0 +1,149 @@
+import re
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from models.models import ChatMessage, ChatSession
+
+
+class _Conversation:
+    __slots__ = ("messages", "size", "summary", "summary_until")
+
+    def __init__(self, summary="", summary_until=0):
+        self.messages = deque()  # (id, role, content), oldest first
+        self.size = 0            # bytes of content held in `messages`
+        self.summary = summary
+        self.summary_until = summary_until
+
+
+class ConversationStore:
+    """
+    Per-session coach conversations with a bounded memory footprint.
+
+    - every message is written to chat_messages as it is added, so nothing is lost on restart
+    - memory only keeps a ring buffer of the last `max_turns` exchanges per session, capped at
+      `max_bytes` of text; what falls out of it is folded into a rolling summary (one short line
+      per message, at most `summary_chars`) stored on chat_sessions
+    - at most `max_sessions` sessions stay in memory (least recently used first out), the others
+      are reloaded from the database on their next message
+    The prompt built from window() is therefore bounded however long the chat runs.
+    DB work happens outside the lock: under run_sync it may switch to another request.
+    """
+
+    SUMMARY_HEADER = "Earlier in this conversation (condensed, oldest first):"
+    LINE_CHARS = 160
+
+    def __init__(self, max_turns=3, max_bytes=6000, summary_chars=800, max_sessions=1000):
+        self.max_messages = max_turns * 2
+        self.max_bytes = max_bytes
+        self.summary_chars = summary_chars
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session id -> _Conversation
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.folded = 0
+
+    # --- READ ---
+
+    def window(self, db, session_id):
+        """Messages to send with the next user message: the rolling summary (system) then the recent turns"""
+        conversation = self._get(db, session_id)
+        with self._lock:
+            messages = [{"role": role, "content": content} for _, role, content in conversation.messages]
+            summary = conversation.summary
+        if summary:
+            messages.insert(0, {"role": "system", "content": f"{self.SUMMARY_HEADER}\n{summary}"})
+        return messages
+
+    def _get(self, db, session_id):
+        with self._lock:
+            conversation = self._sessions.get(session_id)
+            if conversation is not None:
+                self._sessions.move_to_end(session_id)
+                return conversation
+
+        # 1. Session pas en mémoire : on la recharge depuis la base (résumé + derniers messages)
+        row = db.get(ChatSession, session_id)
+        conversation = _Conversation(row.summary or "", row.summary_until or 0) if row else _Conversation()
+        if row is not None:
+            recent = db.query(ChatMessage.id, ChatMessage.role, ChatMessage.content) \
+                .filter(ChatMessage.session_id == session_id, ChatMessage.id > conversation.summary_until) \
+                .order_by(ChatMessage.id.desc()).limit(self.max_messages).all()
+            for message_id, role, content in reversed(recent):
+                self._push(conversation, message_id, role, content)
+
+        with self._lock:
+            # A concurrent request may have loaded it meanwhile: keep the first one
+            conversation = self._sessions.setdefault(session_id, conversation)
+            self._sessions.move_to_end(session_id)
+            self.loads += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return conversation
+
+    # --- WRITE ---
+
+    def append(self, db, session_id, user_msg, answer):
+        """Stores one exchange (the caller commits); older messages leave the window for the summary"""
+        conversation = self._get(db, session_id)
+        rows = [
+            ChatMessage(session_id=session_id, role="user", content=user_msg),
+            ChatMessage(session_id=session_id, role="assistant", content=answer),
+        ]
+        db.add_all(rows)
+        db.flush()
+
+        with self._lock:
+            for row in rows:
+                self._push(conversation, row.id, row.role, row.content)
+            summary, summary_until = conversation.summary, conversation.summary_until
+
+        session = db.get(ChatSession, session_id)
+        if session is None:
+            db.add(ChatSession(id=session_id, summary=summary, summary_until=summary_until))
+        else:
+            session.summary, session.summary_until = summary, summary_until
+            session.updated_at = datetime.utcnow()
+
+    def _push(self, conversation, message_id, role, content):
+        # A single huge message can't blow the cap on its own
+        content = content[:self.max_bytes]
+        conversation.messages.append((message_id, role, content))
+        conversation.size += len(content.encode())
+        while len(conversation.messages) > self.max_messages \
+                or (conversation.size > self.max_bytes and len(conversation.messages) > 1):
+            old_id, old_role, old_content = conversation.messages.popleft()
+            conversation.size -= len(old_content.encode())
+            conversation.summary = self._fold(conversation.summary, old_role, old_content)
+            conversation.summary_until = old_id
+            self.folded += 1
+
+    def _fold(self, summary, role, content):
+        """Adds one condensed line (first sentence, shortened) and drops the oldest lines past summary_chars"""
+        text = " ".join(content.split())
+        first = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+        if len(first) > self.LINE_CHARS:
+            first = first[:self.LINE_CHARS - 1].rstrip() + "…"
+        lines = summary.split("\n") if summary else []
+        lines.append(f"- {'user' if role == 'user' else 'coach'}: {first}")
+        while len(lines) > 1 and sum(len(line) + 1 for line in lines) > self.summary_chars:
+            lines.pop(0)
+        return "\n".join(lines)[:self.summary_chars]
+
+    def forget(self, session_id=None):
+        """Drops one session (or all) from memory, the database copy stays"""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "messages": sum(len(c.messages) for c in self._sessions.values()),
+                "bytes": sum(c.size + len(c.summary.encode()) for c in self._sessions.values()),
+                "loads": self.loads,
+                "folded": self.folded,
+            }
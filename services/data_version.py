@@ -0,0 +1,41 @@
+import uuid
+
+from sqlalchemy.exc import IntegrityError
+
+from models.models import DataVersion
+
+ROW_ID = 1
+
+
+class TransactionVersion:
+    """
+    Version of the transaction set, for the caches meaning "same data" (PDF reports, coach answers
+    and digests). The write routes bump it inside their own DB transaction, so every worker process
+    sees the change at commit, whatever field was edited and whichever ids get reused.
+    """
+
+    @staticmethod
+    def ensure(db):
+        """Creates the version row of a new database. Commits."""
+        if db.get(DataVersion, ROW_ID) is None:
+            db.add(DataVersion(id=ROW_ID, token=uuid.uuid4().hex, version=0))
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker starting at the same time created it
+                db.rollback()
+
+    @staticmethod
+    def bump(db):
+        """Marks the transactions as changed. Does not commit."""
+        updated = db.query(DataVersion).filter(DataVersion.id == ROW_ID).update(
+            {DataVersion.version: DataVersion.version + 1}, synchronize_session=False
+        )
+        if not updated:
+            db.add(DataVersion(id=ROW_ID, token=uuid.uuid4().hex, version=1))
+
+    @staticmethod
+    def current(db):
+        """Opaque version string: changes with every committed transaction write"""
+        row = db.query(DataVersion.token, DataVersion.version).filter(DataVersion.id == ROW_ID).first()
+        return f"{row.token}:{row.version}" if row else "empty"
@@ -0,0 +1,117 @@
+import threading
+import time
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, BrokenExecutor, Future
+
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit when max_pending jobs are already waiting or running"""
+
+
+class JobQueue:
+    """
+    Small in-process job registry on top of a worker pool.
+    submit() returns a job id right away, get() reports the job status and result.
+    The pool is created on first use so importing the module stays cheap.
+    """
+
+    def __init__(self, name, max_workers=2, max_pending=None, use_processes=True, keep_finished=300):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self.keep_finished = keep_finished  # seconds a finished job stays queryable
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                # spawn: children must not inherit the parent's DB connections / event loop
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _prune(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] and now - job["finished_at"] > self.keep_finished
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def pending_count(self):
+        return sum(1 for job in self._jobs.values() if not job["future"].done())
+
+    def submit(self, fn, *args, job_id=None):
+        """
+        Queues fn(*args). Passing a job_id deduplicates: if that job is still
+        queued or running it is returned as is instead of being started twice.
+        """
+        with self._lock:
+            self._prune()
+            if job_id is not None and job_id in self._jobs and not self._jobs[job_id]["future"].done():
+                return job_id
+            if self.max_pending is not None and self.pending_count() >= self.max_pending:
+                raise QueueFullError(f"{self.name} queue is full ({self.max_pending} pending jobs)")
+
+            job_id = job_id or uuid.uuid4().hex
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except BrokenExecutor:
+                # A worker died (OOM, segfault...): start a fresh pool instead of failing forever
+                self._executor = None
+                future = self._get_executor().submit(fn, *args)
+            job = {"id": job_id, "future": future, "created_at": time.time(), "finished_at": None}
+            self._jobs[job_id] = job
+
+        def _on_done(_):
+            job["finished_at"] = time.time()
+
+        future.add_done_callback(_on_done)
+        return job_id
+
+    def add_completed(self, result):
+        """Registers an already finished job (e.g. a cache hit) so callers get a uniform job API"""
+        future = Future()
+        future.set_result(result)
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = {"id": job_id, "future": future, "created_at": time.time(), "finished_at": time.time()}
+        return job_id
+
+    def future(self, job_id):
+        job = self._jobs.get(job_id)
+        return job["future"] if job else None
+
+    def get(self, job_id):
+        """Status dict for the job, or None if it is unknown or expired"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        future = job["future"]
+        info = {"job_id": job_id, "created_at": job["created_at"]}
+        if not future.done():
+            info["status"] = "running" if future.running() else "queued"
+        elif future.cancelled():
+            info["status"] = "cancelled"
+        elif future.exception() is not None:
+            info["status"] = "error"
+            info["error"] = str(future.exception())
+        else:
+            info["status"] = "done"
+            info["result"] = future.result()
+        return info
+
+    def shutdown(self, wait=False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LLMCache:
+    """
+    In-memory cache of coach answers, keyed by the normalized prompt inputs.
+
+    - key: sha256 over the endpoint name and its inputs (transaction-set version, budget,
+      goal...), normalized so "Vacation " / "vacation" or 1200 / 1200.0 share an entry
+    - entries expire after `ttl` seconds, the least recently used one goes once `max_entries` is reached
+    - invalidate() drops everything; called whenever transactions are added or deleted
+    """
+
+    def __init__(self, max_entries=128, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, answer)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(value):
+        if isinstance(value, str):
+            return " ".join(value.split()).lower()
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return round(float(value), 2)
+        return value
+
+    @staticmethod
+    def make_key(kind, **inputs):
+        normalized = {name: LLMCache._normalize(value) for name, value in inputs.items()}
+        raw = json.dumps([kind, normalized], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, answer = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return answer
+
+    def put(self, key, answer):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
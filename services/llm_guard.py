@@ -0,0 +1,110 @@
+import asyncio
+
+
+class LLMBusyError(Exception):
+    """Raised when a caller already has LLM_MAX_IN_FLIGHT_PER_USER LLM calls running"""
+
+    def __init__(self, retry_after):
+        super().__init__("Too many AI requests in progress, please retry shortly")
+        self.retry_after = retry_after
+
+
+class LLMGuard:
+    """
+    Single-flight + per-user admission control in front of the LLM calls (Groq and Gemini).
+
+    - identical concurrent requests (same key) share one in-flight call and its answer; only the
+      first one (the leader) calls the LLM, the others wait for it and never count against a limit
+    - a caller can lead at most `max_in_flight_per_user` calls at once, beyond that lead() raises
+      LLMBusyError (the routes answer 429 + Retry-After)
+    - a flight that never reports back (client gone before a stream started) is released after
+      `flight_timeout` seconds
+    Runs on the event loop only, no locking needed.
+    """
+
+    def __init__(self, max_in_flight_per_user=2, retry_after=5, flight_timeout=120):
+        self.max_in_flight_per_user = max_in_flight_per_user
+        self.retry_after = retry_after
+        self.flight_timeout = flight_timeout
+        self._flights = {}    # key -> asyncio.Future of the answer
+        self._in_flight = {}  # caller -> leading flights
+        self._owners = {}     # flight future -> (key, caller, watchdog)
+        self.leaders = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def lead(self, key, caller):
+        """Registers the caller as the one calling the LLM for `key`. Hand the answer (or None) to resolve()"""
+        if self._in_flight.get(caller, 0) >= self.max_in_flight_per_user:
+            self.rejected += 1
+            raise LLMBusyError(self.retry_after)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._flights[key] = future
+        self._in_flight[caller] = self._in_flight.get(caller, 0) + 1
+        self.leaders += 1
+        watchdog = loop.call_later(self.flight_timeout, self.resolve, future, None)
+        self._owners[future] = (key, caller, watchdog)
+        return future
+
+    def resolve(self, future, answer):
+        """Wakes the waiting callers and frees the leader's slot right away (not on the next loop turn)"""
+        if not future.done():
+            future.set_result(answer)
+        owner = self._owners.pop(future, None)
+        if owner is None:
+            return
+        key, caller, watchdog = owner
+        watchdog.cancel()
+        if self._flights.get(key) is future:
+            del self._flights[key]
+        self._in_flight[caller] -= 1
+        if not self._in_flight[caller]:
+            del self._in_flight[caller]
+
+    async def join(self, key):
+        """
+        Waits for identical calls already in flight and returns the first answer.
+        None when nothing is in flight (or the leader went away without an answer): lead instead.
+        """
+        while key in self._flights:
+            self.coalesced += 1
+            answer = await asyncio.shield(self._flights[key])
+            if answer is not None:
+                return answer
+        return None
+
+    async def run(self, key, caller, make_call):
+        """await make_call() once for all concurrent callers of `key`"""
+        answer = await self.join(key)
+        if answer is not None:
+            return answer
+
+        future = self.lead(key, caller)
+        try:
+            answer = await make_call()
+        finally:
+            # On error or cancellation the waiting callers get None and retry on their own
+            self.resolve(future, answer)
+        return answer
+
+    async def lead_stream(self, future, tokens):
+        """Forwards a leader's token stream and hands the full text to the waiting callers at the end"""
+        parts, complete = [], False
+        try:
+            async for token in tokens:
+                parts.append(token)
+                yield token
+            complete = True
+        finally:
+            self.resolve(future, "".join(parts) if complete else None)
+
+    def stats(self):
+        return {
+            "in_flight": len(self._flights),
+            "callers": len(self._in_flight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
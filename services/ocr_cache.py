@@ -0,0 +1,177 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class OCRCache:
+    """
+    Content-addressed cache of receipt OCR results.
+
+    - exact hit: sha256 of the uploaded bytes
+    - near-duplicate hit: 256-bit difference hash (dHash) within `max_distance` bits and a
+      similar aspect ratio, confirmed on a 64x64 thumbnail (mean pixel difference below
+      `max_thumb_diff`). dHash alone can't tell apart two receipts printed with the same
+      layout, the thumbnail check can; together they catch the same photo re-encoded or resized
+    - bounded by entry count and by the serialized size of the results (LRU eviction)
+    - optional on-disk tier (one JSON file per image hash, exact hits only) that survives restarts
+    """
+
+    HASH_SIZE = 16
+    THUMB_SIZE = 64
+
+    def __init__(self, max_entries=256, max_bytes=4 * 1024 * 1024, disk_dir=None, disk_max_files=2000,
+                 max_distance=8, max_thumb_diff=0.5):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_files = disk_max_files
+        self.max_distance = max_distance
+        self.max_thumb_diff = max_thumb_diff
+        self._entries = OrderedDict()  # sha256 -> {"result", "phash", "ratio", "thumb", "size"}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = {"exact": 0, "disk": 0, "perceptual": 0}
+        self.misses = 0
+
+    # --- KEYS ---
+
+    @staticmethod
+    def content_key(image_bytes):
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    @staticmethod
+    def perceptual_hash(image_bytes):
+        """(dhash, aspect_ratio, thumbnail bytes) or (None, None, None) if the bytes are not a readable image"""
+        from PIL import Image, ImageOps
+
+        try:
+            img = Image.open(io.BytesIO(image_bytes))
+            size, thumb_size = OCRCache.HASH_SIZE, OCRCache.THUMB_SIZE
+            # JPEG draft mode decodes at 1/2..1/8 scale: hashing a 12MP photo costs a few ms
+            img.draft("L", (thumb_size * 4, thumb_size * 4))
+            ratio = img.width / img.height if img.height else 0
+            img = ImageOps.grayscale(img)
+            thumb = img.resize((thumb_size, thumb_size), Image.BILINEAR).tobytes()
+            pixels = list(img.resize((size + 1, size), Image.BILINEAR).getdata())
+        except Exception:
+            return None, None, None
+
+        value = 0
+        for row in range(size):
+            offset = row * (size + 1)
+            for col in range(size):
+                value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+        return value, ratio, thumb
+
+    def _is_near_duplicate(self, entry, phash, ratio, thumb):
+        if entry["phash"] is None or entry["thumb"] is None or abs(entry["ratio"] - ratio) > 0.03:
+            return False
+        if bin(entry["phash"] ^ phash).count("1") > self.max_distance:
+            return False
+        diff = sum(abs(a - b) for a, b in zip(entry["thumb"], thumb)) / len(thumb)
+        return diff <= self.max_thumb_diff
+
+    # --- LOOKUP ---
+
+    def lookup(self, image_bytes):
+        """
+        Returns (result or None, ident). `ident` identifies the image and is passed back
+        to put() on a miss, so the hashes are computed once per upload.
+        """
+        key = OCRCache.content_key(image_bytes)
+        ident = {"key": key, "phash": None, "ratio": None, "thumb": None}
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits["exact"] += 1
+                return entry["result"], ident
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._store(key, entry["result"])
+            with self._lock:
+                self.hits["disk"] += 1
+            return entry["result"], ident
+
+        # Only decode the image when the cheap exact lookups missed
+        phash, ratio, thumb = OCRCache.perceptual_hash(image_bytes)
+        ident.update(phash=phash, ratio=ratio, thumb=thumb)
+        with self._lock:
+            if phash is not None:
+                for other_key, other in reversed(self._entries.items()):
+                    if self._is_near_duplicate(other, phash, ratio, thumb):
+                        self._entries.move_to_end(other_key)
+                        self.hits["perceptual"] += 1
+                        return other["result"], ident
+            self.misses += 1
+        return None, ident
+
+    def put(self, ident, result):
+        self._store(ident["key"], result, ident["phash"], ident["ratio"], ident["thumb"])
+        self._write_disk(ident["key"], result)
+
+    def _store(self, key, result, phash=None, ratio=None, thumb=None):
+        size = len(json.dumps(result)) + (len(thumb) if thumb else 0)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous["size"]
+            self._entries[key] = {"result": result, "phash": phash, "ratio": ratio, "thumb": thumb, "size": size}
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted["size"]
+
+    # --- DISK TIER ---
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, result):
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp_path = f"{self._disk_path(key)}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"result": result}, f)
+            os.replace(tmp_path, self._disk_path(key))
+            self._prune_disk()
+        except OSError as e:
+            print(f"⚠️ OCR cache disk write failed: {e}")
+
+    def _prune_disk(self):
+        files = [os.path.join(self.disk_dir, n) for n in os.listdir(self.disk_dir) if n.endswith(".json")]
+        if len(files) <= self.disk_max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.disk_max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = sum(self.hits.values()) + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "hit_rate": round(sum(self.hits.values()) / lookups, 3) if lookups else 0.0,
+            }
@@ -4,6 +4,10 @@ import re
 import io
 import os
 
+from core.config import settings
+from core.metrics import timer
+from services.receipt_parser import ReceiptParser
+
 # --- TESSERACT CONFIGURATION ---
 # Ensure Tesseract is installed at this path
 TESSERACT_PATH = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
@@ -15,70 +19,50 @@ else:
 
 class OCREngine:
     @staticmethod
-    def extract_data(image_bytes):
+    def normalize_image(img, max_side=None):
+        """Downscales large photos before OCR (JPEG draft decoding + thumbnail) and applies EXIF rotation"""
+        max_side = max_side or settings.OCR_MAX_IMAGE_SIDE
+        if max(img.size) > max_side:
+            # draft() lets the JPEG decoder skip straight to a reduced scale (never below max_side)
+            img.draft("RGB", (max_side, max_side))
+        img = ImageOps.exif_transpose(img)
+        if max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+        return img
+
+    @staticmethod
+    def extract_data(image_bytes, parser=None, timings=None):
+        """
+        parser: "text" (line-based parser on image_to_string) or "layout"
+        (single-pass ReceiptParser on image_to_data word boxes). Defaults to settings.OCR_PARSER.
+        timings: optional dict filled with the seconds spent per stage (decode, preprocess, tesseract, parse)
+        """
+        parser = parser or settings.OCR_PARSER
+        timings = {} if timings is None else timings
         try:
-            # 1. Load image from bytes
-            img = Image.open(io.BytesIO(image_bytes))
+            # 1. Load image from bytes (downscaled to an OCR-friendly resolution)
+            with timer(timings, "ocr_decode"):
+                img = OCREngine.normalize_image(Image.open(io.BytesIO(image_bytes)))
             
             # 2. Preprocessing for better accuracy
-            img = ImageOps.grayscale(img)
-            img = ImageOps.autocontrast(img)
+            with timer(timings, "ocr_preprocess"):
+                img = ImageOps.grayscale(img)
+                img = ImageOps.autocontrast(img)
             
             # 3. Extracting raw text
             # lang='fra+eng+ara' supports French, English, and Arabic
-            text = pytesseract.image_to_string(img, lang='fra+eng+ara', config='--psm 6')
-            
-            lines = text.split('\n')
-            scanned_items = []
-            merchant = "Unknown Merchant"
-            grand_total = 0.0
-
-            print("\n--- STARTING ITEM-BY-ITEM SCAN ---")
-
-            # 4. Extract Merchant (usually the first line with letters)
-            for line in lines:
-                clean_line = line.strip()
-                if len(clean_line) > 2 and any(c.isalpha() for c in clean_line):
-                    merchant = clean_line
-                    break
+            if parser == "layout":
+                with timer(timings, "ocr_tesseract"):
+                    data = pytesseract.image_to_data(
+                        img, lang='fra+eng+ara', config='--psm 6', output_type=pytesseract.Output.DICT
+                    )
+                with timer(timings, "ocr_parse"):
+                    return ReceiptParser.parse_words(ReceiptParser.words_from_tesseract(data))
 
-            # 5. Extract Line Items (Product Name + Price)
-            for line in lines:
-                clean_line = line.strip()
-                # Pattern to find prices (e.g., 10.99 or 5,50)
-                price_search = re.search(r'(\d+[.,]\d{2})', clean_line)
-                
-                if price_search:
-                    current_price = float(price_search.group(1).replace(',', '.'))
-                    # The product name is usually everything before the price
-                    product_name = clean_line.replace(price_search.group(0), "").strip()
-                    
-                    # Ignore lines that are clearly 'Total' or 'Tax' to avoid duplicates
-                    if any(key in clean_line.upper() for key in ["TOTAL", "SUBTOTAL", "TAX", "VAT", "CASH"]):
-                        # If it's the Grand Total line, save it separately
-                        if "TOTAL" in clean_line.upper() and grand_total == 0:
-                            grand_total = current_price
-                        continue
-                    
-                    if len(product_name) > 2:
-                        scanned_items.append({
-                            "label": product_name,
-                            "price": current_price
-                        })
-                        print(f"Found Item: {product_name} -> {current_price}")
-
-            # 6. Fallback for Grand Total
-            if grand_total == 0:
-                all_prices = re.findall(r'\d+[.,]\d{2}', text)
-                if all_prices:
-                    grand_total = max([float(p.replace(',', '.')) for p in all_prices])
-
-            return {
-                "merchant": merchant,
-                "items": scanned_items,
-                "total": grand_total,
-                "category": "Shopping" # Default category
-            }
+            with timer(timings, "ocr_tesseract"):
+                text = pytesseract.image_to_string(img, lang='fra+eng+ara', config='--psm 6')
+            with timer(timings, "ocr_parse"):
+                return OCREngine.parse_text(text)
 
         except Exception as e:
             print(f"❌ OCR Engine Error: {str(e)}")
@@ -87,4 +71,59 @@ class OCREngine:
                 "items": [],
                 "total": 0.0,
                 "category": "None"
-            }
\ No newline at end of file
+            }
+
+    @staticmethod
+    def parse_text(text):
+        """Line-based parser over the raw Tesseract text (the "text" parser mode)"""
+        lines = text.split('\n')
+        scanned_items = []
+        merchant = "Unknown Merchant"
+        grand_total = 0.0
+
+        print("\n--- STARTING ITEM-BY-ITEM SCAN ---")
+
+        # 4. Extract Merchant (usually the first line with letters)
+        for line in lines:
+            clean_line = line.strip()
+            if len(clean_line) > 2 and any(c.isalpha() for c in clean_line):
+                merchant = clean_line
+                break
+
+        # 5. Extract Line Items (Product Name + Price)
+        for line in lines:
+            clean_line = line.strip()
+            # Pattern to find prices (e.g., 10.99 or 5,50)
+            price_search = re.search(r'(\d+[.,]\d{2})', clean_line)
+            
+            if price_search:
+                current_price = float(price_search.group(1).replace(',', '.'))
+                # The product name is usually everything before the price
+                product_name = clean_line.replace(price_search.group(0), "").strip()
+                
+                # Ignore lines that are clearly 'Total' or 'Tax' to avoid duplicates
+                if any(key in clean_line.upper() for key in ["TOTAL", "SUBTOTAL", "TAX", "VAT", "CASH"]):
+                    # If it's the Grand Total line, save it separately
+                    if "TOTAL" in clean_line.upper() and grand_total == 0:
+                        grand_total = current_price
+                    continue
+                
+                if len(product_name) > 2:
+                    scanned_items.append({
+                        "label": product_name,
+                        "price": current_price
+                    })
+                    print(f"Found Item: {product_name} -> {current_price}")
+
+        # 6. Fallback for Grand Total
+        if grand_total == 0:
+            all_prices = re.findall(r'\d+[.,]\d{2}', text)
+            if all_prices:
+                grand_total = max([float(p.replace(',', '.')) for p in all_prices])
+
+        return {
+            "merchant": merchant,
+            "items": scanned_items,
+            "total": grand_total,
+            "category": "Shopping" # Default category
+        }
@@ -0,0 +1,163 @@
+import asyncio
+import io
+import os
+import zipfile
+
+from core.config import settings
+from core.metrics import metrics
+from services.job_queue import JobQueue, QueueFullError
+from services.ocr_cache import OCRCache
+
+ocr_jobs = JobQueue("ocr", max_workers=settings.OCR_WORKERS, max_pending=settings.OCR_QUEUE_SIZE)
+ocr_cache = OCRCache(
+    max_entries=settings.OCR_CACHE_ENTRIES,
+    max_bytes=settings.OCR_CACHE_MAX_BYTES,
+    disk_dir=settings.OCR_CACHE_DIR or None,
+    max_distance=settings.OCR_CACHE_MAX_DISTANCE,
+    max_thumb_diff=settings.OCR_CACHE_MAX_THUMB_DIFF,
+)
+
+# Stage timings added to the result by run_ocr, recorded into `metrics` by submit's done-callback.
+# The job result is shared with every reader (status polls, waiters): never mutated, the readers
+# get copies without the key
+TIMINGS_KEY = "_timings"
+
+
+def run_ocr(image_bytes):
+    """Worker entry point (runs in the OCR process pool). The stage timings travel back with the result"""
+    # pytesseract/PIL are loaded by the workers, not by the web process
+    from services.ocr_engine import OCREngine
+    timings = {}
+    result = OCREngine.extract_data(image_bytes, timings=timings)
+    return {**result, TIMINGS_KEY: timings}
+
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff", ".gif"}
+
+
+class BatchTooLargeError(ValueError):
+    """Raised when a batch upload exceeds OCR_BATCH_MAX_FILES or OCR_BATCH_MAX_BYTES"""
+
+
+def _without_timings(result):
+    return {key: value for key, value in result.items() if key != TIMINGS_KEY}
+
+
+def _is_cacheable(result):
+    # Failed scans (blurry photo, Tesseract missing...) must be retried, not remembered
+    return result.get("merchant") != "Scan Error"
+
+
+class OCRService:
+    """
+    Receipt OCR behind a bounded process pool so Tesseract never runs on the event loop.
+    Results are cached by image content, re-uploads of the same receipt skip Tesseract.
+    submit() raises QueueFullError once OCR_QUEUE_SIZE scans are queued or running.
+    """
+
+    @staticmethod
+    async def submit(image_bytes):
+        # 1. Cache: exact bytes first, then perceptual hash for re-encoded copies. Hashing decodes
+        # the image (~100 ms for a 12 MP photo): in a thread, never on the event loop
+        with metrics.stage("ocr_cache_lookup"):
+            cached, ident = await asyncio.to_thread(ocr_cache.lookup, image_bytes)
+        if cached is not None:
+            return ocr_jobs.add_completed(dict(cached, cached=True))
+
+        # 2. Miss: queue the scan and remember the result once it's done
+        job_id = ocr_jobs.submit(run_ocr, image_bytes)
+
+        def _store(future):
+            if future.cancelled() or future.exception() is not None:
+                return
+            result = future.result()
+            metrics.record_timings(result.get(TIMINGS_KEY, {}))
+            if _is_cacheable(result):
+                ocr_cache.put(ident, _without_timings(result))
+
+        ocr_jobs.future(job_id).add_done_callback(_store)
+        return job_id
+
+    @staticmethod
+    def status(job_id):
+        info = ocr_jobs.get(job_id)
+        if info is not None and "result" in info:
+            info["data"] = _without_timings(info.pop("result"))
+        return info
+
+    @staticmethod
+    async def wait(job_id, timeout=None):
+        """Awaits the job result. On timeout the scan keeps running and stays available through status()"""
+        future = asyncio.wrap_future(ocr_jobs.future(job_id))
+        result = await asyncio.wait_for(asyncio.shield(future), timeout=timeout or settings.OCR_TIMEOUT)
+        return _without_timings(result)
+
+    @staticmethod
+    async def scan(image_bytes, timeout=None):
+        return await OCRService.wait(await OCRService.submit(image_bytes), timeout)
+
+    # --- BATCH ---
+
+    @staticmethod
+    def expand_uploads(uploads):
+        """
+        Turns [(filename, bytes)] uploads into a flat list of images, unpacking ZIP archives.
+        Enforces the batch limits on the uncompressed size, so a zip bomb is rejected before extraction.
+        """
+        images, total_bytes = [], 0
+
+        def _add(name, data):
+            nonlocal total_bytes
+            total_bytes += len(data)
+            if len(images) >= settings.OCR_BATCH_MAX_FILES or total_bytes > settings.OCR_BATCH_MAX_BYTES:
+                raise BatchTooLargeError(
+                    f"Batch limited to {settings.OCR_BATCH_MAX_FILES} images / {settings.OCR_BATCH_MAX_BYTES} bytes"
+                )
+            images.append((name, data))
+
+        for filename, data in uploads:
+            if not zipfile.is_zipfile(io.BytesIO(data)):
+                _add(filename, data)
+                continue
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                members = [
+                    info for info in archive.infolist()
+                    if not info.is_dir()
+                    and os.path.splitext(info.filename)[1].lower() in IMAGE_EXTENSIONS
+                    and not os.path.basename(info.filename).startswith(".")
+                ]
+                declared = sum(info.file_size for info in members)
+                if total_bytes + declared > settings.OCR_BATCH_MAX_BYTES:
+                    raise BatchTooLargeError(f"Archive {filename} expands beyond {settings.OCR_BATCH_MAX_BYTES} bytes")
+                for info in members:
+                    _add(f"{filename}/{info.filename}", archive.read(info))
+        return images
+
+    @staticmethod
+    async def scan_many(images):
+        """
+        Fans the images out over the OCR pool and yields one result per image as it finishes.
+        Submissions are paced to the pool size so a big batch never trips the queue backpressure
+        meant for interactive scans.
+        """
+        limiter = asyncio.Semaphore(max(1, settings.OCR_WORKERS))
+
+        async def _one(index, name, data):
+            async with limiter:
+                while True:
+                    try:
+                        result = await OCRService.scan(data)
+                        return {"index": index, "filename": name, "status": "success", "data": result}
+                    except QueueFullError:
+                        await asyncio.sleep(0.5)
+                    except Exception as e:
+                        return {"index": index, "filename": name, "status": "error", "message": str(e) or type(e).__name__}
+
+        tasks = [asyncio.create_task(_one(i, name, data)) for i, (name, data) in enumerate(images)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away: stop waiting on the remaining scans
+            for task in tasks:
+                task.cancel()
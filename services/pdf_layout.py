@@ -0,0 +1,40 @@
+from fpdf import FPDF
+
+
+class ReportPDF(FPDF):
+    """FPDF with the table header repeated on every page and numbered footers"""
+
+    COLUMNS = [("Date", 35), ("Merchant", 70), ("Category", 45), ("Amount", 40)]
+    ROW_HEIGHT = 7
+
+    def __init__(self):
+        super().__init__()
+        self.in_table = False
+
+    def header(self):
+        if self.page_no() == 1:
+            self.set_font("Arial", size=12)
+            self.cell(190, 10, txt="SmartSave - Financial Report", ln=True, align='C')
+            self.ln(5)
+        if self.in_table:
+            self.table_header()
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font("Arial", 'I', 8)
+        self.cell(0, 10, f"Page {self.page_no()}/{{nb}}", align='C')
+
+    def table_header(self):
+        self.set_font("Arial", 'B', 11)
+        for label, width in self.COLUMNS:
+            self.cell(width, self.ROW_HEIGHT + 1, label, 1)
+        self.ln()
+        self.set_font("Arial", '', 9)
+
+    def table_row(self, values):
+        for (_, width), value in zip(self.COLUMNS, values):
+            # Cells don't wrap: cut long labels so they stay inside their column
+            max_chars = int(width / 1.9)
+            text = value if len(value) <= max_chars else value[:max_chars - 3] + "..."
+            self.cell(width, self.ROW_HEIGHT, text, 1)
+        self.ln()
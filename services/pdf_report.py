@@ -0,0 +1,128 @@
+import hashlib
+import os
+import re
+
+from core.config import settings
+from services.data_version import TransactionVersion
+from services.job_queue import JobQueue
+from services.report_export import ReportExporter
+
+# Bump when the layout changes so cached files are regenerated
+REPORT_VERSION = 2
+FINGERPRINT_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+pdf_jobs = JobQueue("pdf", max_workers=settings.PDF_WORKERS)
+
+
+def _latin1(text):
+    # Nettoyage des chaînes pour supprimer les emojis/caractères non-latin1
+    return str(text or "").encode('latin-1', 'ignore').decode('latin-1')
+
+
+def render_report(output_path):
+    """
+    Worker entry point (runs in the PDF process pool): streams the transactions,
+    writes the paginated table and the per-category subtotals, then saves atomically.
+    """
+    from database import SessionLocal
+    # fpdf is only loaded by the PDF workers
+    from services.pdf_layout import ReportPDF
+
+    pdf = ReportPDF()
+    pdf.alias_nb_pages()
+    pdf.set_auto_page_break(True, margin=20)
+    pdf.in_table = True
+    pdf.add_page()
+
+    subtotals = {}
+    total = 0.0
+    rows = 0
+    db = SessionLocal()
+    try:
+        for tx_date, merchant, category, amount, _ in ReportExporter.iter_rows(db):
+            amount = float(amount or 0)
+            pdf.table_row([
+                tx_date.strftime('%Y-%m-%d') if tx_date else "",
+                _latin1(merchant),
+                _latin1(category),
+                f"{amount:.2f} EUR",
+            ])
+            subtotals[category] = subtotals.get(category, 0.0) + amount
+            total += amount
+            rows += 1
+    finally:
+        db.close()
+
+    # Subtotals by category
+    pdf.in_table = False
+    pdf.ln(10)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(190, 10, txt="Subtotals by category", ln=True)
+    pdf.set_font("Arial", '', 10)
+    for category, amount in sorted(subtotals.items(), key=lambda x: x[1], reverse=True):
+        pdf.cell(110, 8, _latin1(category or "Other"), 1)
+        pdf.cell(40, 8, f"{amount:.2f} EUR", 1)
+        pdf.ln()
+
+    pdf.ln(10)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(190, 10, txt=f"TOTAL SPENT: {total:.2f} EUR ({rows} transactions)", ln=True)
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    pdf.output(tmp_path)
+    os.replace(tmp_path, output_path)
+    PDFReportService.prune_cache()
+    return {"rows": rows, "total": round(total, 2)}
+
+
+class PDFReportService:
+    """Cached PDF reports: one file per layout and transaction-set version, rendered in the background"""
+
+    @staticmethod
+    def fingerprint(db):
+        raw = f"v{REPORT_VERSION}:{TransactionVersion.current(db)}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    @staticmethod
+    def report_path(fingerprint):
+        return os.path.join(settings.REPORT_DIR, f"smartsave_report_{fingerprint}.pdf")
+
+    @staticmethod
+    def request_report(db):
+        """Returns the job status for the current data, starting a render if nothing is cached"""
+        fingerprint = PDFReportService.fingerprint(db)
+        path = PDFReportService.report_path(fingerprint)
+        if os.path.exists(path):
+            return {"job_id": fingerprint, "status": "done"}
+
+        os.makedirs(settings.REPORT_DIR, exist_ok=True)
+        pdf_jobs.submit(render_report, path, job_id=fingerprint)
+        return PDFReportService.status(fingerprint)
+
+    @staticmethod
+    def status(job_id):
+        if not FINGERPRINT_PATTERN.match(job_id):
+            return None
+        if os.path.exists(PDFReportService.report_path(job_id)):
+            return {"job_id": job_id, "status": "done"}
+        info = pdf_jobs.get(job_id)
+        if info is not None:
+            info.pop("result", None)
+        return info
+
+    @staticmethod
+    def prune_cache():
+        """Keeps only the newest REPORT_CACHE_MAX_FILES reports on disk"""
+        try:
+            files = [
+                os.path.join(settings.REPORT_DIR, name) for name in os.listdir(settings.REPORT_DIR)
+                if name.startswith("smartsave_report_") and name.endswith(".pdf")
+            ]
+        except FileNotFoundError:
+            return
+        files.sort(key=os.path.getmtime, reverse=True)
+        for path in files[settings.REPORT_CACHE_MAX_FILES:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,157 @@
+import re
+from itertools import groupby
+from operator import itemgetter
+
+# Line ending in an amount: "<label> 12.50", "3,99", "€4.00", "4.00€", "18,90DH", "18,90 DH"
+# group 1 = label, group 2 = amount, group 3 = separate currency word
+LINE_RE = re.compile(
+    r"^(?:(.*?) )?[€$]?(-?\d{1,6}[.,]\d{2})(?:€|\$|[A-Za-z]{1,3})?( (?i:€|\$|EUR|DH|DHS|MAD|USD))?$"
+)
+# Quantity inside the label: "2 x 3,50", "3x", leading "x2"
+QTY_RE = re.compile(r"(?:^|\s)(\d{1,3})\s?[xX*]\s?(?:\d{1,6}[.,]\d{2})?|^[xX](\d{1,3})\b")
+# Checked in this order: "TOTAL HT" is a subtotal and "TOTAL TVA" is tax, not the grand total
+SUBTOTAL_RE = re.compile(r"\b(?:SUB\s?-?TOTAL|SOUS\s?-?TOTAL|TOTAL\s+HT|المجموع\s+الفرعي)\b")
+TAX_RE = re.compile(r"\b(?:TAX|TAXES|TVA|VAT|الضريبة)\b")
+TOTAL_RE = re.compile(r"\b(?:TOTAL|TTC|NET\s+A\s+PAYER|AMOUNT\s+DUE|A\s+PAYER|المجموع)\b")
+SKIP_RE = re.compile(r"\b(?:CASH|ESPECES|ESP|RENDU|CHANGE|MONNAIE|CARTE|CARD|CB|VISA|MASTERCARD|PAIEMENT|PAYMENT|نقدا)\b")
+# Cheap pre-check: plain item lines (the bulk of a receipt) go through a single search
+KEYWORD_RE = re.compile("|".join(p.pattern for p in (SUBTOTAL_RE, TAX_RE, TOTAL_RE, SKIP_RE)))
+LETTER_RE = re.compile(r"[^\W\d_]")
+
+
+class ReceiptParser:
+    """
+    Single-pass receipt parser over OCR word boxes (pytesseract.image_to_data).
+
+    Words are grouped into lines by (block, paragraph, line) as they stream in. The amount of a
+    line is its rightmost price token; amounts of item lines are expected to sit in one right-aligned
+    column, so a price far to the left of that column (dates, phone numbers, "2 x 3,50") is not
+    taken as the line amount. Each line is classified once (subtotal / tax / total / payment / item)
+    with compiled patterns on its upper-cased label.
+    """
+
+    # Pseudo box size used by words_from_text() (one character = CHAR_WIDTH px)
+    CHAR_WIDTH = 10
+    LINE_HEIGHT = 20
+
+    # --- INPUT ADAPTERS ---
+
+    @staticmethod
+    def words_from_tesseract(data):
+        """image_to_data(..., output_type=Output.DICT) -> list of word dicts (empty boxes dropped)"""
+        words = []
+        for i, text in enumerate(data["text"]):
+            text = (text or "").strip()
+            if not text or float(data["conf"][i]) < 0:
+                continue
+            words.append({
+                "text": text,
+                "left": data["left"][i],
+                "width": data["width"][i],
+                "height": data["height"][i],
+                "line": (data["block_num"][i], data["par_num"][i], data["line_num"][i]),
+            })
+        return words
+
+    @staticmethod
+    def words_from_text(text):
+        """Plain receipt text -> monospace word boxes, so fixtures can be parsed without Tesseract"""
+        words = []
+        for line_no, line in enumerate(text.split("\n")):
+            for match in re.finditer(r"\S+", line):
+                words.append({
+                    "text": match.group(0),
+                    "left": match.start() * ReceiptParser.CHAR_WIDTH,
+                    "width": len(match.group(0)) * ReceiptParser.CHAR_WIDTH,
+                    "height": ReceiptParser.LINE_HEIGHT,
+                    "line": (1, 1, line_no),
+                })
+        return words
+
+    @staticmethod
+    def parse_text(text):
+        return ReceiptParser.parse_words(ReceiptParser.words_from_text(text))
+
+    # --- PARSER ---
+
+    @staticmethod
+    def parse_words(words):
+        state = {
+            "merchant": None, "merchant_height": 0, "seen_price": False,
+            "items": [], "total": None, "subtotal": None, "tax": 0.0, "max_price": 0.0,
+            "column": [],  # right edges of the last item amounts
+        }
+
+        for _, line_words in groupby(words, key=itemgetter("line")):
+            ReceiptParser._consume_line(list(line_words), state)
+
+        # Grand total: explicit TOTAL line, else subtotal + tax, else the items (or the largest amount seen)
+        total = state["total"]
+        if total is None and state["subtotal"] is not None:
+            total = state["subtotal"] + state["tax"]
+        if total is None:
+            total = sum(item["price"] for item in state["items"]) or state["max_price"]
+
+        return {
+            "merchant": state["merchant"] or "Unknown Merchant",
+            "items": state["items"],
+            "total": round(total, 2),
+            "tax": round(state["tax"], 2),
+            "category": "Shopping"  # Default category
+        }
+
+    @staticmethod
+    def _consume_line(line_words, state):
+        # Words arrive in reading order (image_to_data and words_from_text both emit them left to right)
+        # 1. Amount = rightmost word (or the one before a trailing currency word), matched on the joined line
+        text = " ".join([w["text"] for w in line_words])
+        match = LINE_RE.match(text)
+
+        # 2. No amount: header lines, the merchant is the tallest text line above the first amount
+        if match is None:
+            if not state["seen_price"] and len(text) > 2 and LETTER_RE.search(text):
+                height = max(w["height"] for w in line_words)
+                if state["merchant"] is None or height > state["merchant_height"]:
+                    state["merchant"], state["merchant_height"] = text, height
+            return
+
+        label = match.group(1) or ""
+        price_word = line_words[-2 if match.group(3) else -1]
+        price = float(match.group(2).replace(",", "."))
+        state["seen_price"] = True
+
+        # 3. Summary lines
+        upper = label.upper()
+        if KEYWORD_RE.search(upper):
+            if SUBTOTAL_RE.search(upper):
+                state["subtotal"] = price
+            elif TAX_RE.search(upper):
+                state["tax"] += price
+            elif TOTAL_RE.search(upper):
+                state["total"] = price if state["total"] is None else max(state["total"], price)
+                state["max_price"] = max(state["max_price"], price)
+            # else: payment / change lines
+            return
+
+        # 4. Item lines: the amount must sit in the price column once it's known
+        right = price_word["left"] + price_word["width"]
+        column = state["column"]
+        if column:
+            expected = sorted(column)[len(column) // 2]
+            if right < expected - 3 * price_word["height"]:
+                return
+
+        qty_match = QTY_RE.search(label) if ("X" in upper or "*" in label) else None
+        qty = int(qty_match.group(1) or qty_match.group(2)) if qty_match else 1
+        name = QTY_RE.sub(" ", label).strip(" :.-") if qty_match else label.strip(" :.-")
+        if len(name) <= 2 or not LETTER_RE.search(name):
+            return
+        state["max_price"] = max(state["max_price"], price)
+
+        item = {"label": name, "price": price}
+        if qty > 1:
+            item["qty"] = qty
+        state["items"].append(item)
+        column.append(right)
+        if len(column) > 8:
+            column.pop(0)
@@ -0,0 +1,85 @@
+import csv
+import zlib
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+from models.models import Transaction
+
+CSV_HEADER = ['Date', 'Merchant', 'Category', 'Amount', 'Essential']
+
+
+class ReportExporter:
+    """
+    Constant-memory exports: rows are read from a server-side cursor in batches
+    and encoded batch by batch, so memory stays flat whatever the history size.
+    """
+
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def filtered_query(db, start=None, end=None, category=None):
+        """Column-only query (no ORM hydration) with the optional export filters. `end` is inclusive."""
+        query = db.query(
+            Transaction.date, Transaction.merchant, Transaction.category,
+            Transaction.amount, Transaction.is_essential
+        )
+        if start is not None:
+            query = query.filter(Transaction.date >= datetime.combine(start, time.min))
+        if end is not None:
+            query = query.filter(Transaction.date < datetime.combine(end + timedelta(days=1), time.min))
+        if category:
+            query = query.filter(Transaction.category == category)
+        return query.order_by(Transaction.id)
+
+    @staticmethod
+    def iter_rows(db, start=None, end=None, category=None, batch_size=None):
+        batch_size = batch_size or ReportExporter.BATCH_SIZE
+        query = ReportExporter.filtered_query(db, start, end, category)
+        # stream_results -> server-side cursor on PostgreSQL, yield_per -> fetch by batches
+        yield from query.execution_options(stream_results=True, yield_per=batch_size)
+
+    @staticmethod
+    def iter_csv(rows, batch_size=None):
+        """Encodes rows to CSV text, one chunk per batch, reusing a single small buffer."""
+        batch_size = batch_size or ReportExporter.BATCH_SIZE
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_HEADER)
+
+        pending = 0
+        for tx_date, merchant, category, amount, is_essential in rows:
+            writer.writerow([tx_date.strftime('%Y-%m-%d') if tx_date else '', merchant, category, amount, is_essential])
+            pending += 1
+            if pending >= batch_size:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        yield buffer.getvalue()
+
+    @staticmethod
+    def gzip_chunks(chunks, level=6):
+        """Gzip-compresses a stream of text chunks on the fly."""
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.flush()
+
+    @staticmethod
+    def stream_csv(session_factory, start=None, end=None, category=None, compress=False):
+        """
+        Generator for StreamingResponse. It owns its DB session because the request
+        dependency session is closed before the response body is sent.
+        """
+        db = session_factory()
+        try:
+            chunks = ReportExporter.iter_csv(ReportExporter.iter_rows(db, start, end, category))
+            if compress:
+                yield from ReportExporter.gzip_chunks(chunks)
+            else:
+                for chunk in chunks:
+                    yield chunk.encode('utf-8')
+        finally:
+            db.close()
@@ -0,0 +1,91 @@
+import threading
+import time
+
+from services.serenity_engine import SerenityEngine
+from services.spending_rollup import SpendingRollup
+
+
+class ScoreCache:
+    """
+    Serenity score without touching the database on the hot pages.
+
+    Keeps the spending total and transaction count (what SerenityEngine.analyze_rollup reads) and
+    the analysis for the current budget:
+    - the write routes apply their delta (record) right after committing, reset-data clears it
+    - /update-budget drops the analysis, the total is kept: rescoring it is O(1)
+    - a reload that started before a write is discarded (version check), and the totals are
+      re-read after `ttl` seconds anyway to pick up writes from other processes (scripts, workers)
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._totals = None     # (total_spent, tx_count, loaded_at)
+        self._analysis = None   # (budget, analysis)
+        self._version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def peek(self, budget):
+        """The cached analysis, or None when the totals have to be (re)loaded"""
+        with self._lock:
+            if self._totals is None or time.monotonic() - self._totals[2] > self.ttl:
+                return None
+            self.hits += 1
+            if self._analysis is None or self._analysis[0] != budget:
+                self._analysis = (budget, self._score(budget))
+            return self._analysis[1]
+
+    def load(self, db, budget):
+        """Reads the totals from the rollup (sync, for run_sync) and caches them"""
+        with self._lock:
+            version = self._version
+        total_spent, tx_count = SpendingRollup.totals(db)
+        with self._lock:
+            self.loads += 1
+            if version != self._version:
+                # A write landed while we were reading: answer with what we read, don't cache it
+                return self._analysis_of(total_spent, tx_count, budget)
+            self._totals = (total_spent, tx_count, time.monotonic())
+            self._analysis = (budget, self._score(budget))
+            return self._analysis[1]
+
+    def record(self, amount, count=1):
+        """Delta of a committed write: record(tx.amount) on add, record(-tx.amount, -1) on delete"""
+        with self._lock:
+            self._version += 1
+            if self._totals is not None:
+                total_spent, tx_count, loaded_at = self._totals
+                self._totals = (total_spent + amount, tx_count + count, loaded_at)
+            self._analysis = None
+
+    def invalidate(self):
+        """Totals changed wholesale (reset, bulk import...): next read reloads"""
+        with self._lock:
+            self._version += 1
+            self._totals = None
+            self._analysis = None
+
+    def budget_changed(self):
+        with self._lock:
+            self._analysis = None
+
+    def _score(self, budget):
+        total_spent, tx_count, _ = self._totals
+        return self._analysis_of(total_spent, tx_count, budget)
+
+    @staticmethod
+    def _analysis_of(total_spent, tx_count, budget):
+        # Same result as SerenityEngine.analyze_rollup
+        if tx_count <= 0:
+            return {"score": 100, "status": "Perfect", "total_spent": 0}
+        return SerenityEngine.score_total(total_spent, budget)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached": self._totals is not None,
+                "hits": self.hits,
+                "loads": self.loads,
+                "version": self._version,
+            }
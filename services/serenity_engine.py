@@ -1,18 +1,40 @@
+from datetime import date, datetime
+
+from core.metrics import metrics
+
+
 class SerenityEngine:
     @staticmethod
     def analyze_finances(transactions, budget=1500.0):
-        if not transactions:
+        """transactions: a TransactionFrame, or records (dicts / ORM objects) turned into one"""
+        from services.transaction_frame import TransactionFrame
+
+        with metrics.stage("serenity_analyze"):
+            frame = TransactionFrame.of(transactions)
+            if not len(frame):
+                return {"score": 100, "status": "Perfect", "total_spent": 0}
+
+            # 1. Calcul du total dépensé
+            return SerenityEngine.score_total(frame.total(), budget)
+
+    @staticmethod
+    def analyze_rollup(db, budget=1500.0):
+        """Same analysis, reading the total from the daily/category rollup instead of the raw table"""
+        from services.spending_rollup import SpendingRollup
+
+        total_spent, tx_count = SpendingRollup.totals(db)
+        if tx_count == 0:
             return {"score": 100, "status": "Perfect", "total_spent": 0}
+        return SerenityEngine.score_total(total_spent, budget)
 
-        # 1. Calcul du total dépensé
-        total_spent = sum(float(t.amount if hasattr(t, 'amount') else t['amount']) for t in transactions)
-        
+    @staticmethod
+    def score_total(total_spent, budget=1500.0):
         # 2. Logique du Score (Basée sur le budget réel)
-        # Si on a dépensé 0, le score est 100. 
+        # Si on a dépensé 0, le score est 100.
         # Plus on dépense, plus le score baisse.
-        
+
         usage_ratio = total_spent / budget
-        
+
         # Formule : On part de 100 et on retire des points selon l'utilisation du budget
         if usage_ratio <= 0.5:
             score = 100 - (usage_ratio * 40) # Entre 100 et 80
@@ -20,7 +42,7 @@ class SerenityEngine:
             score = 80 - ((usage_ratio - 0.5) * 100) # Entre 80 et 30
         else:
             score = 30 - ((usage_ratio - 1.0) * 20) # En dessous de 30 si dépassement
-            
+
         # On s'assure que le score reste entre 0 et 100
         score = max(0, min(100, int(score)))
 
@@ -34,4 +56,87 @@ class SerenityEngine:
             "score": score,
             "status": status,
             "total_spent": round(total_spent, 2)
-        }
\ No newline at end of file
+        }
+
+    # --- BATCH (NumPy) ---
+
+    STATUSES = ("Critical", "Warning", "Good", "Excellent")
+
+    @staticmethod
+    def score_batch(amounts, groups=None, budgets=1500.0, n_groups=None):
+        """
+        Vectorized analyze_finances for many users or months at once (nightly recomputation, score history).
+        amounts: transaction amounts; groups: the user/month index (0..n_groups-1) of each amount,
+        None = a single group; budgets: one budget or one per group.
+        Returns {"score", "status", "total_spent"} arrays, identical to the scalar version group by group
+        (groups without any transaction get 100 / "Perfect", like an empty list).
+        """
+        import numpy as np
+
+        amounts = np.asarray(amounts, dtype=np.float64)
+        groups = np.zeros(len(amounts), dtype=np.intp) if groups is None else np.asarray(groups, dtype=np.intp)
+        n_groups = n_groups if n_groups is not None else (int(groups.max()) + 1 if len(groups) else 1)
+
+        # 1. Totaux par groupe : bincount additionne dans l'ordre des transactions, comme sum()
+        totals = np.bincount(groups, weights=amounts, minlength=n_groups)
+        counts = np.bincount(groups, minlength=n_groups)
+
+        # 2. Même formule que score_total, branche par branche (sur les totaux non arrondis, comme elle)
+        usage_ratio = totals / np.broadcast_to(np.asarray(budgets, dtype=np.float64), totals.shape)
+        score = np.where(
+            usage_ratio <= 0.5, 100 - (usage_ratio * 40),
+            np.where(usage_ratio <= 1.0, 80 - ((usage_ratio - 0.5) * 100), 30 - ((usage_ratio - 1.0) * 20))
+        )
+        score = np.clip(np.trunc(score), 0, 100).astype(np.int64)
+
+        # 3. Statuts : > 80 Excellent, > 50 Good, > 20 Warning, sinon Critical
+        status = np.array(SerenityEngine.STATUSES, dtype=object)[np.searchsorted([20, 50, 80], score, side="left")]
+        # total_spent rounded with round() (not np.round, which differs on ties like 2.675): one call per group
+        totals = np.array([round(total, 2) for total in totals.tolist()], dtype=np.float64)
+        empty = counts == 0
+        score[empty] = 100
+        status[empty] = "Perfect"
+        totals[empty] = 0
+
+        return {"score": score, "status": status, "total_spent": totals}
+
+    @staticmethod
+    def score_history(db, budget=1500.0, months=12, today=None):
+        """
+        Monthly scores for the last `months` calendar months, oldest first. Summed per month by the
+        database from the daily rollup; a month without spending scores like no transactions (100)
+        """
+        import numpy as np
+        from sqlalchemy import extract, func
+        from models.models import DailySpending
+
+        today = today or datetime.utcnow().date()
+        last = today.year * 12 + today.month - 1
+        first = last - months + 1
+
+        # 1. Une ligne par mois avec des dépenses, à partir du premier mois affiché
+        year, month = extract("year", DailySpending.day), extract("month", DailySpending.day)
+        rows = db.query(year, month, func.sum(DailySpending.total)) \
+            .filter(DailySpending.day >= date(first // 12, first % 12 + 1, 1)) \
+            .group_by(year, month).all()
+        totals, groups = [], []
+        for row_year, row_month, total in rows:
+            index = int(row_year) * 12 + int(row_month) - 1 - first
+            if index < months:  # future-dated transactions stay out of the chart
+                totals.append(float(total or 0))
+                groups.append(index)
+
+        # 2. Every month of the range, the ones without a row are empty groups
+        scored = SerenityEngine.score_batch(
+            np.array(totals, dtype=np.float64), np.array(groups, dtype=np.int64), budget, n_groups=months
+        )
+        return [
+            {
+                "month": f"{(first + i) // 12}-{(first + i) % 12 + 1:02d}",
+                "score": int(scored["score"][i]),
+                "status": scored["status"][i],
+                "total_spent": float(scored["total_spent"][i]),
+            }
+            for i in range(months)
+        ]
+
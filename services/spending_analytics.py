@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta, time
+
+from sqlalchemy import func, extract, case
+
+from models.models import DailySpending
+from services.budget_analyzer import BudgetAnalyzer
+
+WEEKDAY_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+WEEK_OF_MONTH_LABELS = ["Week 1", "Week 2", "Week 3", "Week 4"]
+MONTH_LABELS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+# Custom ranges longer than this are charted per month instead of per day
+MAX_DAILY_BUCKETS = 31
+
+
+class SpendingAnalytics:
+    """
+    Analytics page aggregation pushed down to the database.
+    One GROUP BY (chart bucket, category) over the daily/category rollup (see
+    SpendingRollup) returns plain rows, read into a TransactionFrame: category
+    totals and chart buckets then come from the same code as the demo data,
+    without hydrating any transaction as an ORM object. Windows are aligned on
+    whole days.
+    """
+
+    PERIODS = ("week", "month", "quarter", "12m", "custom")
+
+    @staticmethod
+    def resolve_period(period="week", start=None, end=None, now=None):
+        """Turns a period name (and optional custom dates) into a time window and a bucket kind."""
+        now = now or datetime.now()
+
+        if period == "custom" and start is not None:
+            start_dt = datetime.combine(start, time.min)
+            end_dt = datetime.combine(end or now.date(), time.max)
+            days = (end_dt.date() - start_dt.date()).days + 1
+            bucket = "day" if days <= MAX_DAILY_BUCKETS else "month"
+        elif period == "quarter":
+            # Calendar quarter containing today
+            first_month = 3 * ((now.month - 1) // 3) + 1
+            start_dt, end_dt, bucket = datetime(now.year, first_month, 1), now, "month"
+        elif period == "12m":
+            # Rolling 12 months: the current month plus the 11 before it
+            month_index = now.year * 12 + now.month - 1 - 11
+            start_dt = datetime(month_index // 12, month_index % 12 + 1, 1)
+            end_dt, bucket = now, "month"
+        elif period == "month":
+            # The last 30 calendar days, today included
+            start_dt = datetime.combine(now.date() - timedelta(days=29), time.min)
+            end_dt, bucket = None, "week_of_month"
+        else:
+            # The last 7 calendar days, today included: each weekday bucket holds a single day
+            period = "week"
+            start_dt = datetime.combine(now.date() - timedelta(days=6), time.min)
+            end_dt, bucket = None, "weekday"
+
+        return {"period": period, "start": start_dt, "end": end_dt, "bucket": bucket, "now": now}
+
+    # --- BUCKETS ---
+
+    @staticmethod
+    def _bucket_keys(window):
+        """Ordered bucket keys and chart labels for the window."""
+        bucket = window["bucket"]
+        if bucket == "weekday":
+            return list(range(7)), list(WEEKDAY_LABELS)
+        if bucket == "week_of_month":
+            return list(range(4)), list(WEEK_OF_MONTH_LABELS)
+
+        start = window["start"].date()
+        stop = (window["end"] or window["now"]).date()
+        keys, labels = [], []
+        if bucket == "month":
+            year, month = start.year, start.month
+            while (year, month) <= (stop.year, stop.month):
+                keys.append((year, month))
+                labels.append(f"{MONTH_LABELS[month - 1]} {str(year)[2:]}")
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        else:
+            day = start
+            while day <= stop:
+                keys.append((day.year, day.month, day.day))
+                labels.append(f"{MONTH_LABELS[day.month - 1]} {day.day:02d}")
+                day += timedelta(days=1)
+        return keys, labels
+
+    @staticmethod
+    def _bucket_columns(bucket, date_col):
+        """SQL expressions grouping the days by chart bucket (portable across PostgreSQL and SQLite)."""
+        if bucket == "weekday":
+            return [extract("dow", date_col)]
+        if bucket == "week_of_month":
+            day = extract("day", date_col)
+            return [case((day <= 7, 0), (day <= 14, 1), (day <= 21, 2), else_=3)]
+        if bucket == "month":
+            return [extract("year", date_col), extract("month", date_col)]
+        return [extract("year", date_col), extract("month", date_col), extract("day", date_col)]
+
+    @staticmethod
+    def _build(window, cat_totals, bucket_totals):
+        total_spent = sum(cat_totals.values())
+        keys, labels = SpendingAnalytics._bucket_keys(window)
+        values = [round(bucket_totals.get(k, 0.0), 2) for k in keys]
+        return {
+            "period": window["period"],
+            "total_spent": round(total_spent, 2),
+            "labels": labels,
+            "values": values,
+            "category_insights": BudgetAnalyzer.insights_from_totals(cat_totals, total_spent),
+        }
+
+    # --- ENTRY POINTS ---
+
+    @staticmethod
+    def summarize(db, window):
+        """
+        Runs the grouped query for the window and summarizes its rows (see summarize_records).
+        Returns None when the period has no transactions so the caller can fall back to demo data.
+        """
+        from services.transaction_frame import TransactionFrame
+
+        filters = [DailySpending.day >= window["start"].date()]
+        if window["end"] is not None:
+            filters.append(DailySpending.day <= window["end"].date())
+
+        # One (amount, category, date) row per chart bucket and category: any day of the group
+        # falls in the same bucket, its first one stands for the group
+        bucket_cols = SpendingAnalytics._bucket_columns(window["bucket"], DailySpending.day)
+        rows = (
+            db.query(func.sum(DailySpending.total), DailySpending.category, func.min(DailySpending.day))
+            .filter(*filters)
+            .group_by(*bucket_cols, DailySpending.category)
+            .all()
+        )
+        if not rows:
+            return None
+        return SpendingAnalytics.summarize_records(TransactionFrame.from_rows(rows), window)
+
+    @staticmethod
+    def summarize_records(tx_list, window):
+        """
+        Same output computed in memory from a TransactionFrame (or records turned into one, e.g.
+        MOCK_TRANSACTIONS: transactions without a date count at window["now"]).
+        """
+        from services.transaction_frame import TransactionFrame
+
+        frame = TransactionFrame.of(tx_list)
+        bucket_totals = frame.bucket_totals(window["bucket"], window["now"])
+        return SpendingAnalytics._build(window, frame.category_totals(), bucket_totals)
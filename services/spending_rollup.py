@@ -0,0 +1,134 @@
+from datetime import date, datetime
+
+from sqlalchemy import func
+
+from models.models import DailySpending, Transaction
+
+# Primary key columns cannot be NULL, transactions without a category are grouped here
+UNCATEGORIZED = "Other"
+
+
+class SpendingRollup:
+    """
+    Incrementally maintained (day, category) spending totals.
+    The write routes call record/remove/clear inside their own DB transaction,
+    the read side (SerenityEngine, analytics) only sums a few rollup rows.
+    """
+
+    @staticmethod
+    def _key(tx_date, category):
+        day = tx_date.date() if isinstance(tx_date, datetime) else tx_date
+        return day or datetime.utcnow().date(), category or UNCATEGORIZED
+
+    @staticmethod
+    def _upsert(db, day, category, amount, count):
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            insert = None
+
+        if insert is not None:
+            # Atomic upsert so concurrent writers on the same (day, category) don't collide
+            stmt = insert(DailySpending).values(day=day, category=category, total=amount, tx_count=count)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DailySpending.day, DailySpending.category],
+                set_={
+                    "total": DailySpending.total + stmt.excluded.total,
+                    "tx_count": DailySpending.tx_count + stmt.excluded.tx_count,
+                },
+            )
+            db.execute(stmt)
+            return
+
+        row = db.get(DailySpending, (day, category))
+        if row is None:
+            db.add(DailySpending(day=day, category=category, total=amount, tx_count=count))
+        else:
+            row.total += amount
+            row.tx_count += count
+
+    @staticmethod
+    def record(db, tx):
+        """Adds a (flushed) transaction to the rollup. Does not commit."""
+        day, category = SpendingRollup._key(tx.date, tx.category)
+        SpendingRollup._upsert(db, day, category, float(tx.amount or 0), 1)
+
+    @staticmethod
+    def remove(db, tx):
+        """Removes a transaction from the rollup. Does not commit."""
+        day, category = SpendingRollup._key(tx.date, tx.category)
+        SpendingRollup._upsert(db, day, category, -float(tx.amount or 0), -1)
+        db.query(DailySpending).filter(
+            DailySpending.day == day,
+            DailySpending.category == category,
+            DailySpending.tx_count <= 0,
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def clear(db):
+        db.query(DailySpending).delete(synchronize_session=False)
+
+    @staticmethod
+    def totals(db):
+        """(total_spent, transaction_count) over the whole history."""
+        total, count = db.query(func.sum(DailySpending.total), func.sum(DailySpending.tx_count)).one()
+        return float(total or 0), int(count or 0)
+
+    # --- BACKFILL & DRIFT CHECK ---
+
+    @staticmethod
+    def _raw_rows(db):
+        """Aggregates the raw transactions table the same way the rollup does."""
+        day_col = func.date(Transaction.date)
+        rows = (
+            db.query(day_col, Transaction.category, func.sum(Transaction.amount), func.count(Transaction.id))
+            .group_by(day_col, Transaction.category)
+            .all()
+        )
+        result = {}
+        for day, category, total, count in rows:
+            # SQLite returns date() as a string, PostgreSQL as a date
+            if isinstance(day, str):
+                day = date.fromisoformat(day)
+            key = SpendingRollup._key(day, category)
+            prev_total, prev_count = result.get(key, (0.0, 0))
+            result[key] = (prev_total + float(total or 0), prev_count + int(count))
+        return result
+
+    @staticmethod
+    def rebuild(db):
+        """Recomputes the whole rollup from the transactions table. Commits."""
+        raw = SpendingRollup._raw_rows(db)
+        SpendingRollup.clear(db)
+        db.add_all([
+            DailySpending(day=day, category=category, total=total, tx_count=count)
+            for (day, category), (total, count) in raw.items()
+        ])
+        db.commit()
+        return len(raw)
+
+    @staticmethod
+    def check_drift(db, tolerance=0.005):
+        """Lists the (day, category) keys where the rollup disagrees with the raw table."""
+        raw = SpendingRollup._raw_rows(db)
+        rolled = {
+            (r.day, r.category): (float(r.total or 0), int(r.tx_count or 0))
+            for r in db.query(DailySpending).all()
+        }
+        drift = []
+        for key in sorted(set(raw) | set(rolled), key=lambda k: (k[0], k[1])):
+            raw_total, raw_count = raw.get(key, (0.0, 0))
+            roll_total, roll_count = rolled.get(key, (0.0, 0))
+            if raw_count != roll_count or abs(raw_total - roll_total) > tolerance:
+                drift.append({
+                    "day": key[0].isoformat(),
+                    "category": key[1],
+                    "raw_total": round(raw_total, 2),
+                    "rollup_total": round(roll_total, 2),
+                    "raw_count": raw_count,
+                    "rollup_count": roll_count,
+                })
+        return drift
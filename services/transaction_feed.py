@@ -0,0 +1,90 @@
+import base64
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import tuple_
+
+from models.models import Transaction
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+class TransactionFeed:
+    """
+    Keyset (cursor) pagination of the transaction list, newest first.
+
+    Pages are ordered on (date, id) and the next page starts strictly after the last row sent,
+    so fetching page N costs the same as page 1 (no OFFSET scan, backed by ix_transactions_date_id)
+    and rows added meanwhile don't shift or duplicate anything. The cursor is opaque to clients.
+    Transactions without a date come after all the dated ones, newest id first: their cursor
+    carries an empty date.
+    """
+
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+
+    @staticmethod
+    def encode_cursor(tx_date, tx_id):
+        raw = f"{tx_date.isoformat() if tx_date else ''}|{tx_id}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            tx_date, tx_id = raw.split("|")
+            return (datetime.fromisoformat(tx_date) if tx_date else None), int(tx_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+    @staticmethod
+    def page(db, limit=None, cursor=None, category=None, search=None, start=None, end=None):
+        """
+        One page of transactions as dicts plus the cursor of the next one (None on the last page).
+        Filters: category, merchant substring (`search`), start/end dates (`end` is inclusive).
+        """
+        limit = max(1, min(limit or TransactionFeed.DEFAULT_LIMIT, TransactionFeed.MAX_LIMIT))
+        query = db.query(
+            Transaction.id, Transaction.date, Transaction.merchant,
+            Transaction.category, Transaction.amount, Transaction.is_essential
+        )
+        after_date, after_id = TransactionFeed.decode_cursor(cursor) if cursor else (None, None)
+        if category:
+            query = query.filter(Transaction.category == category)
+        if search:
+            pattern = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.filter(Transaction.merchant.ilike(f"%{pattern}%", escape="\\"))
+        if start is not None:
+            query = query.filter(Transaction.date >= datetime.combine(start, time.min))
+        if end is not None:
+            query = query.filter(Transaction.date < datetime.combine(end + timedelta(days=1), time.min))
+
+        # One extra row tells whether there is a next page
+        rows = []
+        if after_id is None or after_date is not None:
+            dated = query.filter(Transaction.date.isnot(None))
+            if after_id is not None:
+                dated = dated.filter(tuple_(Transaction.date, Transaction.id) < (after_date, after_id))
+            rows = dated.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit + 1).all()
+        # Then the undated ones (never within a date range)
+        if len(rows) <= limit and start is None and end is None:
+            undated = query.filter(Transaction.date.is_(None))
+            if after_date is None and after_id is not None:
+                undated = undated.filter(Transaction.id < after_id)
+            rows += undated.order_by(Transaction.id.desc()).limit(limit + 1 - len(rows)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = [
+            {
+                "id": row.id,
+                "date": row.date.isoformat() if row.date else None,
+                "merchant": row.merchant,
+                "category": row.category,
+                "amount": row.amount,
+                "is_essential": row.is_essential,
+            }
+            for row in rows
+        ]
+        next_cursor = TransactionFeed.encode_cursor(rows[-1].date, rows[-1].id) if has_more else None
+        return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,125 @@
+"""
+Anomaly pre-filter benchmark: how many /analyze-spending calls still reach Gemini.
+
+Simulates a user spending for --days days (--per-day transactions a day, recurring merchants,
+a few subscriptions) with --anomaly-rate of the transactions replaced by injected anomalies
+(price spikes, a new merchant far above its category, a subscription price increase).
+/analyze-spending is called once a day; before the pre-filter every call went to the LLM.
+Reports the share of calls escalated, the Gemini calls left once an explanation is reused while
+the same anomalies stay flagged, the injected anomalies caught and the detection cost.
+
+    python tests/bench_anomaly_filter.py --days 180 --per-day 3 --budget 3500 --anomaly-rate 0.02
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+if str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from core.config import settings
+from services.anomaly_detector import AnomalyDetector
+
+Row = namedtuple("Row", "id date merchant category amount is_essential")
+
+MERCHANTS = [
+    # merchant, category, typical amount, spread, essential
+    ("Carrefour", "Food", 55, 0.25, True),
+    ("Lidl", "Food", 30, 0.3, True),
+    ("Starbucks", "Food", 6, 0.3, False),
+    ("Uber", "Transport", 15, 0.35, False),
+    ("Shell", "Transport", 60, 0.15, True),
+    ("Zara", "Shopping", 45, 0.5, False),
+    ("Pharmacie", "Health", 18, 0.4, True),
+    ("Cinema", "Fun", 12, 0.2, False),
+]
+SUBSCRIPTIONS = [("Netflix", "Subs", 15.99), ("Spotify", "Subs", 10.99)]
+
+
+def simulate(days, per_day, anomaly_rate, budget, seed):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    transactions, injected, calls = [], set(), []
+    next_id = 1
+    for day in range(days):
+        today = start + timedelta(days=day)
+        for _ in range(rng.randint(max(per_day - 2, 1), per_day + 2)):
+            merchant, category, typical, spread, essential = rng.choice(MERCHANTS)
+            amount = round(rng.lognormvariate(0, spread) * typical, 2)
+            if rng.random() < anomaly_rate:
+                kind = rng.choice(("spike", "new_merchant"))
+                if kind == "spike":
+                    amount = round(typical * rng.uniform(4, 10), 2)
+                else:
+                    usual = max(m[2] for m in MERCHANTS if m[1] == category)
+                    merchant, amount = f"Unknown shop {next_id}", round(usual * rng.uniform(4, 8), 2)
+                injected.add(next_id)
+            transactions.append(Row(next_id, today, merchant, category, amount, essential))
+            next_id += 1
+        if today.day == 1:
+            for merchant, category, price in SUBSCRIPTIONS:
+                if day > 60 and rng.random() < anomaly_rate * 10:
+                    price, _ = round(price * 1.2, 2), injected.add(next_id)
+                transactions.append(Row(next_id, today, merchant, category, price, False))
+                next_id += 1
+        calls.append((today, len(transactions)))
+    return transactions, injected, calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--per-day", type=int, default=3)
+    parser.add_argument("--anomaly-rate", type=float, default=0.02)
+    parser.add_argument("--budget", type=float, default=3500.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    transactions, injected, calls = simulate(args.days, args.per_day, args.anomaly_rate, args.budget, args.seed)
+    escalated, caught, elapsed = 0, set(), 0.0
+    explained, gemini_calls = {}, 0  # findings signature -> day of the last Gemini call
+    by_kind = {}
+    for today, count in calls:
+        seen = transactions[:count]
+        recent = seen[-AnomalyDetector.RECENT:][::-1]
+        since = today - timedelta(days=AnomalyDetector.HISTORY_DAYS)
+        history = [t for t in seen if t.date >= since][-AnomalyDetector.HISTORY_MAX_ROWS:]
+        month = today.replace(day=1)
+        non_essential = sum(t.amount for t in seen if t.date >= month and not t.is_essential)
+
+        begin = time.perf_counter()
+        findings, _ = AnomalyDetector.analyze(recent, history, args.budget, non_essential)
+        elapsed += time.perf_counter() - begin
+
+        if findings:
+            escalated += 1
+            signature = repr(AnomalyDetector.signature(findings))
+            if signature not in explained or (today - explained[signature]).total_seconds() > settings.ANOMALY_CACHE_TTL:
+                explained[signature] = today
+                gemini_calls += 1
+            for f in findings:
+                by_kind[f["kind"]] = by_kind.get(f["kind"], 0) + 1
+                if f["transaction_id"] in injected:
+                    caught.add(f["transaction_id"])
+
+    print(f"{len(transactions)} transactions over {args.days} days, {len(injected)} injected anomalies, "
+          f"{len(calls)} /analyze-spending calls (budget {args.budget:g}€)")
+    print(f"LLM calls: before {len(calls)}, after {escalated} ({escalated / len(calls) * 100:.0f}% escalated, "
+          f"{(1 - escalated / len(calls)) * 100:.0f}% answered locally)")
+    print(f"Gemini calls with explanations reused for the same findings: {gemini_calls} "
+          f"({gemini_calls / len(calls) * 100:.0f}% of the calls)")
+    print(f"injected anomalies flagged: {len(caught)}/{len(injected)}")
+    print(f"findings by kind (summed over calls): {by_kind}")
+    print(f"local detection: {elapsed / len(calls) * 1000:.2f} ms/call")
+
+
+if __name__ == "__main__":
+    main()
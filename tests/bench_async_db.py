@@ -0,0 +1,163 @@
+"""
+Concurrency benchmark: sync SessionLocal inside `async def` vs AsyncSession.
+
+Two endpoints run the same query (recent transactions + rollup total). The first
+uses the old pattern (blocking session in an async handler), the second goes
+through get_async_db. N requests are fired with C in flight and p50/p95/p99 are
+reported for each.
+
+    python tests/bench_async_db.py --rows 20000 --concurrency 50 --requests 500 --latency-ms 20
+
+By default a throwaway SQLite file is used (aiosqlite on the async side).
+--latency-ms adds a per-query round-trip delay inside the driver to stand in
+for a network database. Pass --url to point at a real PostgreSQL instead.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+if str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="sync DATABASE_URL (default: temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="simulated DB round-trip (SQLite only)")
+    return parser.parse_args()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def fire(client, path, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies, time.perf_counter() - wall
+
+
+def main():
+    args = parse_args()
+    tmpdir = None
+    if args.url:
+        os.environ["DATABASE_URL"] = args.url
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="smartsave-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+    import httpx
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import event, select, text
+
+    from database import Base, SessionLocal, engine, async_engine, get_async_db
+    from models.models import Transaction
+    from services.spending_rollup import SpendingRollup
+
+    # 1. Simulated network latency: a sleep() SQL function evaluated inside the driver
+    if engine.dialect.name == "sqlite" and args.latency_ms > 0:
+        def sleep_ms(ms):
+            time.sleep(ms / 1000)
+            return 0
+
+        def register(dbapi_connection, _):
+            dbapi_connection.create_function("bench_sleep", 1, sleep_ms)
+
+        event.listen(engine, "connect", register)
+        event.listen(async_engine.sync_engine, "connect", register)
+        latency_sql = text(f"SELECT bench_sleep({args.latency_ms})")
+    else:
+        latency_sql = None
+
+    # 2. Seed
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    if db.query(Transaction.id).first() is None:
+        db.bulk_save_objects([
+            Transaction(merchant=f"Shop {i % 50}", amount=float(i % 97) + 0.5, category=f"Cat {i % 8}")
+            for i in range(args.rows)
+        ])
+        db.commit()
+        SpendingRollup.rebuild(db)
+    db.close()
+
+    # 3. Same work, two session styles
+    app = FastAPI()
+
+    @app.get("/sync")
+    async def sync_route():
+        db = SessionLocal()
+        try:
+            if latency_sql is not None:
+                db.execute(latency_sql)
+            recent = db.query(Transaction).order_by(Transaction.id.desc()).limit(50).all()
+            total, _ = SpendingRollup.totals(db)
+            return {"n": len(recent), "total": total}
+        finally:
+            db.close()
+
+    @app.get("/async")
+    async def async_route(db=Depends(get_async_db)):
+        if latency_sql is not None:
+            await db.execute(latency_sql)
+        recent = (await db.scalars(select(Transaction).order_by(Transaction.id.desc()).limit(50))).all()
+        total, _ = await db.run_sync(SpendingRollup.totals)
+        return {"n": len(recent), "total": total}
+
+    # 4. Serve over TCP from its own thread/loop so a blocked server loop can't stall the load generator
+    import socket
+    import threading
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    async def run():
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            print(f"{args.requests} requests, concurrency {args.concurrency}, "
+                  f"{args.rows} rows, latency {args.latency_ms} ms ({engine.dialect.name})")
+            print(f"{'mode':<7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+            for path in ("/sync", "/async"):
+                await fire(client, path, min(20, args.requests), args.concurrency)  # warm-up
+                latencies, wall = await fire(client, path, args.requests, args.concurrency)
+                print(f"{path[1:]:<7}{statistics.median(latencies):>10.1f}{percentile(latencies, 95):>10.1f}"
+                      f"{percentile(latencies, 99):>10.1f}{args.requests / wall:>10.1f}")
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
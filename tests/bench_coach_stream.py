@@ -0,0 +1,95 @@
+"""
+Time-to-first-token benchmark for the coach endpoints: JSON mode vs ?stream=true (SSE).
+
+Runs the app and the stand-in LLM server (tests/fake_llm_server.py) on local ports and
+calls /chat, /generate-report and /calculate-plan both ways. For JSON mode the first
+useful byte is the whole answer; for SSE it is the first `token` event.
+
+    python tests/bench_coach_stream.py --latency-ms 600 --token-ms 40 --rounds 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+if str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+ENDPOINTS = [
+    ("POST", "/chat", {"message": "How am I doing this month?"}),
+    ("GET", "/generate-report", None),
+    ("POST", "/calculate-plan", {"name": "Vacation", "target": 1200}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=600.0, help="LLM time to first token")
+    parser.add_argument("--token-ms", type=float, default=40.0, help="LLM delay between tokens")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    from fake_llm_server import start_in_thread
+
+    llm_url, _, llm_server = start_in_thread(latency_ms=args.latency_ms, jitter_ms=0, token_ms=args.token_ms)
+    tmpdir = tempfile.mkdtemp(prefix="smartsave-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["GROQ_BASE_URL"] = llm_url
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.chdir(root_path)
+
+    import httpx
+    import socket
+    import uvicorn
+    from main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    async def run():
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            # A few transactions so /generate-report calls the LLM
+            for amount in (45.0, 12.5, 80.0):
+                await client.post("/add-transaction", json={"merchant": "Carrefour", "amount": amount, "category": "Food"})
+
+            print(f"LLM: {args.latency_ms} ms to first token, {args.token_ms} ms/token, {args.rounds} rounds")
+            print(f"{'endpoint':<18}{'json total':>12}{'sse first':>12}{'sse total':>12}   (median ms)")
+            for method, path, body in ENDPOINTS:
+                json_ms, first_ms, sse_ms = [], [], []
+                for _ in range(args.rounds):
+                    start = time.perf_counter()
+                    response = await client.request(method, path, json=body)
+                    response.raise_for_status()
+                    json_ms.append((time.perf_counter() - start) * 1000)
+
+                    start, first = time.perf_counter(), None
+                    async with client.stream(method, path, params={"stream": "true"}, json=body) as response:
+                        async for line in response.aiter_lines():
+                            if first is None and line == "event: token":
+                                first = (time.perf_counter() - start) * 1000
+                    first_ms.append(first)
+                    sse_ms.append((time.perf_counter() - start) * 1000)
+                print(f"{path:<18}{statistics.median(json_ms):>12.0f}{statistics.median(first_ms):>12.0f}"
+                      f"{statistics.median(sse_ms):>12.0f}")
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.should_exit = True
+        llm_server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
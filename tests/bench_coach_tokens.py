@@ -0,0 +1,191 @@
+"""
+Prompt size benchmark: tokens sent per coach request before and after the compact context builder.
+
+"before" rebuilds the messages the way /chat, /generate-report and /calculate-plan used to
+(route system prompt + AICoach system prompt, raw transaction lists embedded in both).
+"after" goes through CoachContext + AICoach.build_messages as the routes do now.
+Tokens are estimated at ~4 characters per token (tiktoken's cl100k_base is used if installed).
+Also reports the digest build time, cold and when reused across turns.
+
+    python tests/bench_coach_tokens.py --rows 5000 --budget-tokens 250
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+if str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+# --- Prompts as they were built before CoachContext (frozen copy, for comparison only) ---
+
+LEGACY_COACH_PROMPT = """
+            You are SmartSave AI, an expert, empathetic, and highly analytical personal financial coach. Your goal is to guide the user towards financial peace of mind without sounding robotic or judgmental.
+
+            ### USER CONTEXT:
+            - Serenity Score: {score}/100.
+            (Context: 0-49 = Financial stress, needs strict budgeting. 50-79 = Stable, needs optimization. 80-100 = Excellent, focus on aggressive saving/investing).
+            - Recent Transactions: {transactions}
+
+            ### STRICT CORE RULES:
+            1. LANGUAGE MATCHING: You MUST respond entirely in the exact same language as the user's current message (e.g., if they ask in French, reply in French; if in Arabic, reply in Arabic).
+            2. DATA-DRIVEN COACHING: Never give generic advice (like "save more money"). You MUST ground your advice by explicitly referencing items from their 'Recent Transactions' or their current 'Serenity Score'.
+            3. ACTIONABLE & CONCISE: Keep your response short (maximum 3 to 4 brief paragraphs). Always end with one clear, practical action step they can take today.
+            4. FORMATTING: Use Markdown. Bold key financial terms, numbers, or merchant names to make the text easily scannable on a mobile screen. Use bullet points if listing multiple steps.
+            5. EMPATHY & TONE: Always maintain an empathetic, supportive tone. Avoid any language that could be perceived as judgmental or robotic. You are a trusted friend guiding them towards financial wellness, not a strict accountant.
+            6. NO GENERIC ADVICE: Avoid any advice that could apply to anyone. Your guidance MUST be personalized based on their specific 'Serenity Score' and 'Recent Transactions'. For example, if they have a low score and many dining out transactions, you might say: "I see you've been dining out frequently, which can add up. With a Serenity Score of {score}, focusing on cooking at home could help reduce expenses and improve your financial peace of mind."
+               """
+
+LEGACY_CHAT_PROMPT = """
+        You are a high-level personal financial coach.
+        User Context:
+        - Name: {name}
+        - Current Serenity Score: {score}/100
+        - Monthly Budget Limit: {budget}€
+        - Recent Transactions: {transactions}
+
+        Instructions:
+        1. Be professional, motivating, and use emojis.
+        2. Always refer to the user's real transactions if they ask about their spending.
+        3. If the score is low, be protective and give urgent advice.
+        4. DETECTION: Identify the language used by the user (Arabic,spanich, French, or English).
+        5. LANGUAGE: ALWAYS reply in the SAME language used by Saleh. If he speaks Arabic, you MUST reply in Arabic.
+        """
+
+
+def legacy_messages(kind, rows, score, total_spent, budget, history):
+    if kind == "chat":
+        tx_summary = ", ".join(f"{t.merchant}: {t.amount}€ ({t.category})" for t in rows[-10:])
+        route_system = LEGACY_CHAT_PROMPT.format(name="Saleh", score=score, budget=budget, transactions=tx_summary)
+        inner = [{"role": "system", "content": route_system}] + history + [{"role": "user", "content": "Where can I cut?"}]
+        coach_score, coach_tx = score, tx_summary
+    elif kind == "report":
+        summary = "\n".join(f"- {t.merchant}: {t.amount}€ ({t.category})" for t in rows[-20:])
+        inner = [
+            {"role": "system", "content": "You are a professional financial advisor. Analyze the user's spending and provide a structured, motivating report in English with emojis."},
+            {"role": "user", "content": f"Transactions:\n{summary}\nBudget Limit: {budget}€\n\nPlease provide a monthly summary and 3 tips."},
+        ]
+        coach_score, coach_tx = 100, "Monthly Review"
+    else:
+        inner = [
+            {"role": "system", "content": "You are an expert financial coach. Provide motivating, detailed, and structured savings plans in English."},
+            {"role": "user", "content": PLAN_REQUEST.format(extra=f"\n                Current monthly spending: {total_spent}€.")},
+        ]
+        coach_score, coach_tx = score, "Général"
+    return [{"role": "system", "content": LEGACY_COACH_PROMPT.format(score=coach_score, transactions=coach_tx)}] + inner
+
+
+PLAN_REQUEST = """
+                The user wants to save 1200.0€ for the project: 'Vacation'.{extra}
+
+                Please provide a comprehensive action plan including:
+                1. A quick analysis of their current financial situation.
+                2. The exact amount to save daily and weekly to reach the goal.
+                3. Two concrete tips to reduce spending based on their categories.
+                4. A personalized motivational closing statement.
+
+                Use a friendly tone and include emojis. 🚀
+            """
+
+
+def new_messages(coach, kind, digest, history):
+    if kind == "chat":
+        system = ("Chat with Saleh. Be professional and motivating, use emojis. Refer to their real transactions "
+                  "when they ask about their spending. If the score is low, be protective and give urgent advice.")
+        chat = [{"role": "system", "content": system}] + history + [{"role": "user", "content": "Where can I cut?"}]
+    elif kind == "report":
+        chat = [
+            {"role": "system", "content": "You are a professional financial advisor. Analyze the user's spending and provide a structured, motivating report in English with emojis."},
+            {"role": "user", "content": "Please provide a monthly summary and 3 tips."},
+        ]
+    else:
+        chat = [
+            {"role": "system", "content": "You are an expert financial coach. Provide motivating, detailed, and structured savings plans in English."},
+            {"role": "user", "content": PLAN_REQUEST.format(extra="")},
+        ]
+    return coach.build_messages(chat, None, digest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--budget-tokens", type=int, default=250)
+    parser.add_argument("--turns", type=int, default=20, help="chat turns reusing the digest")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="smartsave-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+
+    from database import Base, SessionLocal, engine
+    from models.models import Transaction
+    from services.coach_context import CoachContext, estimate_tokens
+    from services.data_version import TransactionVersion
+    from services.serenity_engine import SerenityEngine
+    from services.spending_rollup import SpendingRollup
+    from api.open_ai_client import AICoach
+
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        count_tokens, tokenizer = (lambda text: len(encoding.encode(text))), "tiktoken cl100k_base"
+    except ImportError:
+        count_tokens, tokenizer = estimate_tokens, "~4 chars/token"
+
+    # 1. Seed ~2 months of spending
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    rng = random.Random(42)
+    merchants = [("Carrefour", "Food"), ("Uber", "Transport"), ("Netflix", "Subs"), ("Zara", "Shopping"),
+                 ("Starbucks", "Food"), ("Shell", "Transport"), ("Cinema", "Fun"), ("Pharmacie", "Health")]
+    now = datetime.utcnow()
+    db.bulk_save_objects([
+        Transaction(merchant=m, category=c, amount=round(rng.lognormvariate(3, 0.8), 2),
+                    date=now - timedelta(minutes=rng.randint(0, 60 * 24 * 60)))
+        for m, c in (rng.choice(merchants) for _ in range(args.rows))
+    ])
+    db.commit()
+    SpendingRollup.rebuild(db)
+
+    budget = 1500.0
+    rows = db.query(Transaction).order_by(Transaction.id).all()
+    analysis = SerenityEngine.analyze_rollup(db, budget)
+    history = [
+        {"role": "user", "content": "Am I spending too much on food?"},
+        {"role": "assistant", "content": "Food is your **largest category** this month. Try batch cooking on Sunday."},
+    ]
+
+    coach = AICoach()
+    context = CoachContext(token_budget=args.budget_tokens)
+    version = TransactionVersion.current(db)
+
+    start = time.perf_counter()
+    digest = context.get(db, budget, version)
+    cold_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for _ in range(args.turns):
+        context.get(db, budget, TransactionVersion.current(db))
+    warm_ms = (time.perf_counter() - start) * 1000 / args.turns
+
+    def size(messages):
+        return sum(count_tokens(m["content"]) for m in messages), sum(m["role"] == "system" for m in messages)
+
+    print(f"{args.rows} transactions, digest budget {args.budget_tokens} tokens, tokenizer: {tokenizer}")
+    print(f"digest: {count_tokens(digest)} tokens, built in {cold_ms:.1f} ms, reused in {warm_ms:.2f} ms/turn "
+          f"(version check)\n")
+    print(digest + "\n")
+    print(f"{'request':<10}{'before':>10}{'after':>10}{'saved':>8}{'system msgs':>14}")
+    for kind in ("chat", "report", "plan"):
+        before, before_sys = size(legacy_messages(kind, rows, analysis["score"], analysis["total_spent"], budget, history))
+        after, after_sys = size(new_messages(coach, kind, digest, history))
+        print(f"{kind:<10}{before:>10}{after:>10}{(before - after) / before * 100:>7.0f}%{f'{before_sys} -> {after_sys}':>14}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
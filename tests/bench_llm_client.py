@@ -0,0 +1,92 @@
+"""
+AICoach benchmark against the local stand-in LLM server (tests/fake_llm_server.py).
+
+Fires N coach calls with C in flight from one event loop, first with the blocking
+get_financial_advice (what the routes used to do), then with get_financial_advice_async.
+Reports p50/p95, calls/s and the peak concurrency the server saw, which the async
+client caps at LLM_MAX_CONCURRENCY.
+
+    python tests/bench_llm_client.py --requests 100 --concurrency 20 --latency-ms 300 --error-rate 0.1
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+if str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-llm-concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    from fake_llm_server import start_in_thread
+
+    base_url, app, server = start_in_thread(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 5,
+                                            error_rate=args.error_rate)
+    os.environ["GROQ_BASE_URL"] = base_url
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.max_llm_concurrency)
+
+    from api.open_ai_client import AICoach, FALLBACK_MESSAGE
+
+    coach = AICoach()
+    stats = app.state.stats
+
+    async def fire(call):
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies, failures = [], 0
+
+        async def one():
+            nonlocal failures
+            async with semaphore:
+                start = time.perf_counter()
+                answer = await call()
+                latencies.append((time.perf_counter() - start) * 1000)
+                failures += answer == FALLBACK_MESSAGE
+
+        stats["max_in_flight"] = 0
+        wall = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        return latencies, failures, time.perf_counter() - wall
+
+    async def blocking_call():
+        return coach.get_financial_advice("How am I doing?", 72, "Carrefour: 45€ (Food)")
+
+    async def async_call():
+        return await coach.get_financial_advice_async("How am I doing?", 72, "Carrefour: 45€ (Food)")
+
+    async def run():
+        print(f"{args.requests} calls, concurrency {args.concurrency}, server latency {args.latency_ms} ms, "
+              f"error rate {args.error_rate}, LLM_MAX_CONCURRENCY {args.max_llm_concurrency}")
+        print(f"{'mode':<10}{'p50 ms':>10}{'p95 ms':>10}{'calls/s':>10}{'failed':>8}{'peak':>6}")
+        for name, call in (("blocking", blocking_call), ("async", async_call)):
+            latencies, failures, wall = await fire(call)
+            print(f"{name:<10}{statistics.median(latencies):>10.1f}{percentile(latencies, 95):>10.1f}"
+                  f"{args.requests / wall:>10.1f}{failures:>8}{stats['max_in_flight']:>6}")
+        await coach.aclose()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
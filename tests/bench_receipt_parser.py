@@ -0,0 +1,74 @@
+"""
+Receipt parser benchmark: legacy line parser (OCREngine.parse_text) vs the single-pass
+layout parser (ReceiptParser) on the fixture corpus in tests/fixtures/receipts.
+
+Tesseract is not involved: the layout parser is fed monospace word boxes built from the
+fixture text, the same shape image_to_data() returns. Reports receipts/s, the parse cost
+per receipt (compare with the few hundred ms Tesseract itself takes per photo) and how
+many fixtures each parser gets right (merchant, total, tax).
+
+    python tests/bench_receipt_parser.py --rounds 2000
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+if str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+FIXTURES = Path(__file__).parent / "fixtures" / "receipts"
+
+
+def load_corpus():
+    expected = json.loads((FIXTURES / "expected.json").read_text(encoding="utf-8"))
+    return [(name, (FIXTURES / name).read_text(encoding="utf-8"), want) for name, want in expected.items()]
+
+
+def is_correct(result, want):
+    return (
+        result["merchant"] == want["merchant"]
+        and abs(result["total"] - want["total"]) < 0.005
+        # The legacy parser doesn't report tax
+        and ("tax" not in result or abs(result["tax"] - want["tax"]) < 0.005)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=1000, help="passes over the corpus per parser")
+    args = parser.parse_args()
+
+    from services.ocr_engine import OCREngine
+    from services.receipt_parser import ReceiptParser
+
+    corpus = load_corpus()
+    # Word boxes are built up front: in production they come straight from image_to_data()
+    boxes = [ReceiptParser.words_from_text(text) for _, text, _ in corpus]
+
+    parsers = {
+        "text": lambda i: OCREngine.parse_text(corpus[i][1]),
+        "layout": lambda i: ReceiptParser.parse_words(boxes[i]),
+    }
+
+    print(f"{len(corpus)} receipts x {args.rounds} rounds")
+    print(f"{'parser':<8}{'receipts/s':>12}{'us/receipt':>12}{'correct':>10}")
+    for name, parse in parsers.items():
+        # The legacy parser prints every item, keep that out of the timing
+        with contextlib.redirect_stdout(io.StringIO()):
+            correct = sum(is_correct(parse(i), corpus[i][2]) for i in range(len(corpus)))
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                for i in range(len(corpus)):
+                    parse(i)
+            elapsed = time.perf_counter() - start
+        count = args.rounds * len(corpus)
+        print(f"{name:<8}{count / elapsed:>12.0f}{elapsed / count * 1e6:>12.1f}{f'{correct}/{len(corpus)}':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Serenity scoring benchmark: scalar analyze_finances per group vs one SerenityEngine.score_batch call.
+
+Generates --rows transactions spread over --groups users (or user-months) and scores every group:
+- scalar: analyze_finances on each group's transaction dicts, as a nightly loop would
+- batch: score_batch on the amount/group arrays
+then checks that both give the same score, status and total for every group.
+
+    python tests/bench_serenity_batch.py --rows 1000000 --groups 10000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+if str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import numpy as np
+
+from services.serenity_engine import SerenityEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--groups", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    amounts = np.round(rng.lognormal(3, 0.9, args.rows), 2)
+    groups = rng.integers(0, args.groups, args.rows)
+    budgets = rng.choice([800.0, 1500.0, 2500.0, 4000.0], args.groups)
+
+    # Scalar path: the per-group transaction lists a loop over users would build
+    by_group = [[] for _ in range(args.groups)]
+    for amount, group in zip(amounts.tolist(), groups.tolist()):
+        by_group[group].append({"amount": amount})
+    start = time.perf_counter()
+    scalar = [SerenityEngine.analyze_finances(txs, budget) for txs, budget in zip(by_group, budgets.tolist())]
+    scalar_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = SerenityEngine.score_batch(amounts, groups, budgets, n_groups=args.groups)
+    batch_s = time.perf_counter() - start
+
+    mismatches = sum(
+        (expected["score"], expected["status"], expected["total_spent"])
+        != (int(batch["score"][g]), batch["status"][g], float(batch["total_spent"][g]))
+        for g, expected in enumerate(scalar)
+    )
+    print(f"{args.rows} transactions, {args.groups} groups")
+    print(f"scalar analyze_finances loop: {scalar_s * 1000:8.1f} ms")
+    print(f"score_batch:                  {batch_s * 1000:8.1f} ms  ({scalar_s / batch_s:.0f}x)")
+    print(f"mismatching groups: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Transaction feed benchmark: home page time against history size.
+
+Seeds --rows transactions in a temporary SQLite database (in steps) and times, at each size:
+- all: the full list as the home page used to load it (every ORM row, newest first)
+- first page: TransactionFeed.page, what /home renders now
+- deep page: a page read through its cursor near the end of the history, vs the same page by OFFSET
+
+    python tests/bench_transaction_feed.py --rows 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+if str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+
+def best_of(repeat, run):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="smartsave-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+
+    from database import Base, SessionLocal, engine
+    from models.models import Transaction
+    from services.transaction_feed import TransactionFeed
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(3)
+    now = datetime(2026, 6, 30)
+    limit = TransactionFeed.DEFAULT_LIMIT
+    step = args.rows // args.steps
+
+    print(f"{'rows':>8} {'all':>10} {'first page':>12} {'deep OFFSET':>12} {'deep cursor':>12}")
+    for size in range(step, step * args.steps + 1, step):
+        with engine.begin() as conn:
+            conn.execute(Transaction.__table__.insert(), [
+                {"merchant": f"M{rng.randrange(300)}", "category": "Food", "amount": 12.5,
+                 "is_essential": True, "date": now - timedelta(minutes=rng.randrange(365 * 24 * 60))}
+                for _ in range(step)
+            ])
+        with SessionLocal() as db:
+            offset = size - 2 * limit
+            deep = db.query(Transaction.date, Transaction.id).order_by(
+                Transaction.date.desc(), Transaction.id.desc()).offset(offset - 1).first()
+            cursor = TransactionFeed.encode_cursor(deep.date, deep.id)
+
+            all_ms = best_of(args.repeat, lambda: db.query(Transaction).order_by(Transaction.id.desc()).all())
+            first_ms = best_of(args.repeat, lambda: TransactionFeed.page(db, limit))
+            offset_ms = best_of(args.repeat, lambda: db.query(Transaction).order_by(
+                Transaction.date.desc(), Transaction.id.desc()).offset(offset).limit(limit).all())
+            cursor_ms = best_of(args.repeat, lambda: TransactionFeed.page(db, limit, cursor))
+            db.expunge_all()
+        print(f"{size:>8} {all_ms:>8.1f}ms {first_ms:>10.2f}ms {offset_ms:>10.2f}ms {cursor_ms:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
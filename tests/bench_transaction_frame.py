@@ -0,0 +1,103 @@
+"""
+TransactionFrame benchmark: memory and time of the in-memory analysis path.
+
+Seeds --rows transactions in a temporary SQLite database, then runs the analysis the services do
+(total + score, category insights, monthly chart buckets) two ways:
+- ORM: db.query(Transaction).all() then the per-record loops (hasattr on every element)
+- frame: TransactionFrame.from_rows over column tuples (no ORM objects) then the array aggregates
+Memory is the peak traced by tracemalloc while loading and analyzing.
+
+    python tests/bench_transaction_frame.py --rows 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+if str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+
+def legacy_analysis(tx_list, now, budget):
+    """What SerenityEngine / BudgetAnalyzer / summarize_records did per record before the frame"""
+    total = sum(float(t.amount if hasattr(t, 'amount') else t['amount']) for t in tx_list)
+    cat_totals, buckets = {}, {}
+    for t in tx_list:
+        name = t.category if hasattr(t, 'category') else t['category']
+        amt = float(t.amount if hasattr(t, 'amount') else t['amount'])
+        dt = t.date if hasattr(t, 'date') else now
+        cat_totals[name] = cat_totals.get(name, 0) + amt
+        buckets[(dt.year, dt.month)] = buckets.get((dt.year, dt.month), 0.0) + amt
+    return round(total, 2), cat_totals, buckets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="smartsave-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+
+    from database import Base, SessionLocal, engine
+    from models.models import Transaction
+    from services.serenity_engine import SerenityEngine
+    from services.transaction_frame import TransactionFrame
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(11)
+    now = datetime(2026, 6, 30)
+    categories = ["Food", "Transport", "Shopping", "Fun", "Health", "Subs", "Housing", "Bills"]
+    with engine.begin() as conn:
+        conn.execute(Transaction.__table__.insert(), [
+            {"merchant": f"M{rng.randrange(300)}", "category": rng.choice(categories),
+             "amount": round(rng.lognormvariate(3, 0.9), 2), "is_essential": True,
+             "date": now - timedelta(minutes=rng.randrange(365 * 24 * 60))}
+            for _ in range(args.rows)
+        ])
+
+    def load_frame(db):
+        rows = db.query(Transaction.amount, Transaction.category, Transaction.date).order_by(Transaction.id).all()
+        return TransactionFrame.from_rows(rows)
+
+    def run_orm():
+        with SessionLocal() as db:
+            tx_list = db.query(Transaction).all()
+            total, cat_totals, buckets = legacy_analysis(tx_list, now, 1500.0)
+            return SerenityEngine.score_total(total, 1500.0), cat_totals, buckets
+
+    def run_frame():
+        with SessionLocal() as db:
+            frame = load_frame(db)
+        return SerenityEngine.analyze_finances(frame, 1500.0), frame.category_totals(), frame.bucket_totals("month", now)
+
+    results = {}
+    for name, run in (("ORM + per-record loops", run_orm), ("TransactionFrame", run_frame)):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results[name] = run()
+            timings.append(time.perf_counter() - start)
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:<24} {min(timings) * 1000:8.0f} ms   peak {peak / 2**20:7.1f} MiB   "
+              f"({peak / args.rows:.0f} B/transaction)")
+
+    (orm_score, orm_cats, orm_buckets), (frame_score, frame_cats, frame_buckets) = results.values()
+    print(f"same score: {orm_score == frame_score}, same category totals: {orm_cats == frame_cats}, "
+          f"same monthly buckets: {orm_buckets == frame_buckets}")
+    with SessionLocal() as db:
+        print(f"frame arrays: {load_frame(db).nbytes / args.rows:.0f} B/transaction")
+
+
+if __name__ == "__main__":
+    main()
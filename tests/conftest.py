@@ -0,0 +1,45 @@
+import os
+import sys
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+if str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+# database.py needs a URL at import time, the tests use their own in-memory engines
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+
+
+@pytest.fixture
+def make_session_factory():
+    """Builds a sessionmaker over a fresh in-memory database with every table created"""
+    engines = []
+
+    def make():
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        engines.append(engine)
+        return sessionmaker(bind=engine)
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def session_factory(make_session_factory):
+    return make_session_factory()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
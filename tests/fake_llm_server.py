@@ -0,0 +1,147 @@
+"""
+Stand-in for the Groq chat completions API, for offline latency/throughput tests.
+
+Answers POST /openai/v1/chat/completions (the path the Groq SDK calls) with a canned
+completion after a configurable delay, and can fail a share of the calls with 503 or 429
+to exercise the client retries. With "stream": true the reply is sent as SSE chunks: the
+first one after --latency-ms (time to first token), then one word every --token-ms.
+Non-streamed calls take the same total time. GET /stats reports calls, failures and the
+peak number of requests in flight.
+
+    python tests/fake_llm_server.py --port 8900 --latency-ms 800 --token-ms 30 --error-rate 0.1
+    GROQ_BASE_URL=http://127.0.0.1:8900 GROQ_API_KEY=fake uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+
+from fastapi import Body, FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CANNED_REPLY = (
+    "**Great progress!** Your spending is under control this month. "
+    "Cut one restaurant outing this week and move the difference to your savings goal today."
+)
+
+
+def create_app(latency_ms=500.0, jitter_ms=100.0, error_rate=0.0, rate_limit_rate=0.0, reply=CANNED_REPLY, token_ms=0.0):
+    app = FastAPI()
+    stats = {"calls": 0, "errors": 0, "rate_limited": 0, "in_flight": 0, "max_in_flight": 0}
+    app.state.stats = stats
+
+    words = [word + " " for word in reply.split(" ")]
+    words[-1] = words[-1].rstrip()
+
+    def _chunk(completion_id, model, delta, finish_reason=None):
+        return "data: " + json.dumps({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }) + "\n\n"
+
+    async def _stream(model):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        try:
+            yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+            for word in words:
+                yield _chunk(completion_id, model, {"content": word})
+                await asyncio.sleep(token_ms / 1000)
+            yield _chunk(completion_id, model, {}, "stop")
+            yield "data: [DONE]\n\n"
+        finally:
+            stats["in_flight"] -= 1
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(payload: dict = Body(...)):
+        stats["calls"] += 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        streaming = False
+        try:
+            delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+            await asyncio.sleep(delay)
+
+            roll = random.random()
+            if roll < rate_limit_rate:
+                stats["rate_limited"] += 1
+                return JSONResponse(
+                    {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                    status_code=429, headers={"retry-after": "0.2"},
+                )
+            if roll < rate_limit_rate + error_rate:
+                stats["errors"] += 1
+                return JSONResponse({"error": {"message": "Service unavailable", "type": "server_error"}}, status_code=503)
+
+            if payload.get("stream"):
+                streaming = True  # in_flight is released when the stream ends
+                return StreamingResponse(_stream(payload.get("model", "fake")), media_type="text/event-stream")
+            await asyncio.sleep(len(words) * token_ms / 1000)
+
+            prompt_tokens = sum(len(str(m.get("content", ""))) for m in payload.get("messages", [])) // 4
+            return {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(reply) // 4,
+                    "total_tokens": prompt_tokens + len(reply) // 4,
+                },
+            }
+        finally:
+            if not streaming:
+                stats["in_flight"] -= 1
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def start_in_thread(port=0, **options):
+    """Runs the server in a daemon thread. Returns (base_url, app, server); set server.should_exit to stop it"""
+    import socket
+    import uvicorn
+
+    if not port:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+    app = create_app(**options)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", app, server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--token-ms", type=float, default=30.0, help="delay between streamed words")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of calls answered with 429")
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate, token_ms=args.token_ms)
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
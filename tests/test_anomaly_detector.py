@@ -0,0 +1,59 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from services.anomaly_detector import AnomalyDetector
+
+Row = namedtuple("Row", "id date merchant category amount")
+START = datetime(2026, 1, 1)
+
+
+def rows(spec, first_id=1):
+    return [Row(first_id + i, START + timedelta(days=first_id + i), m, c, a) for i, (m, c, a) in enumerate(spec)]
+
+
+HISTORY = rows(
+    [("Carrefour", "Food", a) for a in (52.1, 48.3, 61.0, 55.4, 47.9, 58.2, 50.0, 53.7, 49.5, 56.8)]
+    + [("Netflix", "Subs", 15.99)] * 4
+    + [("Uber", "Transport", a) for a in (12.0, 18.5, 9.8, 15.2, 21.0, 11.4, 14.1, 16.7, 13.3, 10.9)]
+)
+
+
+def check(recent, non_essential=0.0, budget=1500.0):
+    history = HISTORY + recent
+    return AnomalyDetector.analyze(recent[::-1], history, budget, non_essential)
+
+
+def test_usual_spending_is_not_escalated():
+    findings, analysis = check(rows([("Carrefour", "Food", 57.0), ("Uber", "Transport", 14.0), ("Netflix", "Subs", 15.99)], 100))
+    assert findings == []
+    assert analysis["has_anomaly"] is False
+    assert set(analysis) == {"has_anomaly", "severity", "reason", "advice"}
+
+
+def test_price_spike_and_subscription_increase():
+    findings, analysis = check(rows([("CARREFOUR", "Food", 240.0), ("Netflix", "Subs", 19.99)], 100))
+    kinds = {f["kind"]: f for f in findings}
+    assert kinds["price_spike"]["severity"] == "high"
+    assert kinds["price_change"]["severity"] == "low"
+    assert analysis["has_anomaly"] is True and analysis["severity"] == "high"
+    assert "Carrefour" in analysis["reason"] or "CARREFOUR" in analysis["reason"]
+
+
+def test_new_merchant_against_the_category_upper_quartile():
+    findings, _ = check(rows([("Bolt", "Transport", 95.0)], 100))
+    assert [f["kind"] for f in findings] == ["unusual_amount"]
+
+
+def test_merchant_with_mostly_refunds():
+    # Median of the history <= 0: no price ratio, the z-score over the purchases still applies
+    refunds = [Row(200 + i, START + timedelta(days=i), "Amazon", "Shopping", a)
+               for i, a in enumerate([-20.0] * 6 + [30.0, 45.0, 60.0, 80.0])]
+    recent = rows([("Amazon", "Shopping", 900.0)], 100)
+    findings = AnomalyDetector.detect(recent, HISTORY + refunds + recent, 1500.0)
+    assert [f["kind"] for f in findings] == ["unusual_amount"]
+
+
+def test_non_essential_overspend():
+    findings, analysis = check(rows([("Uber", "Transport", 14.0)], 100), non_essential=800.0)
+    assert [f["kind"] for f in findings] == ["non_essential_overspend"]
+    assert analysis["severity"] == "high"
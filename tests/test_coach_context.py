@@ -0,0 +1,39 @@
+from services.coach_context import CoachContext, estimate_tokens
+
+
+LINES = [
+    "Serenity 42/100 (Stable), spent 900€ in total, 600€ this month = 40% of the 1500€ budget",
+    "Month by category (vs last month): Food 300€ (+10%), Transport 200€ (-5%), Fun 100€ (new)",
+    "Recent: Carrefour 12.5€ Food; Uber 8€ Transport; Cinema 11€ Fun",
+]
+
+
+def test_fit_keeps_everything_within_budget():
+    assert CoachContext.fit(LINES, 500) == "\n".join(LINES)
+
+
+def test_fit_drops_by_priority_and_trims_at_item_boundary():
+    budget = estimate_tokens(LINES[0]) + 1 + 20
+    digest = CoachContext.fit(LINES, budget).split("\n")
+    assert digest[0] == LINES[0]
+    assert digest[1].startswith("Month by category (vs last month): Food 300€ (+10%)")
+    assert "Fun" not in digest[1]
+    assert len(digest) == 2
+    assert sum(estimate_tokens(line) + 1 for line in digest) <= budget
+
+
+def test_fit_never_cuts_the_headline_into_pieces():
+    assert CoachContext.fit(LINES, 5) == ""
+
+
+def test_one_digest_for_every_caller_until_the_data_or_budget_changes(monkeypatch):
+    context = CoachContext()
+    monkeypatch.setattr(context, "build", lambda db, budget: f"digest {budget}")
+
+    assert context.get(None, 1500, "t:1") == "digest 1500"
+    assert context.get(None, 1500, "t:1") == "digest 1500"
+    assert (context.builds, context.hits) == (1, 1)
+
+    context.get(None, 1500, "t:2")
+    assert context.get(None, 1800, "t:2") == "digest 1800"
+    assert context.builds == 3
@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import pytest
+
+from api.open_ai_client import FALLBACK_MESSAGE, CoachStreamError
+
+
+@pytest.fixture
+def stream_advice():
+    from web.routes import stream_advice
+    return stream_advice
+
+
+async def tokens(*words, fail=False):
+    for word in words:
+        await asyncio.sleep(0)
+        yield word
+    if fail:
+        raise CoachStreamError("connection reset")
+
+
+def read_events(response, log):
+    """Parses the SSE body into (event, payload) pairs, also appending them to `log` as they are sent"""
+    async def scenario():
+        async for chunk in response.body_iterator:
+            event, data = chunk.strip().split("\n")
+            assert event.startswith("event: ") and data.startswith("data: ")
+            log.append((event[len("event: "):], json.loads(data[len("data: "):])))
+        return list(log)
+
+    return asyncio.run(scenario())
+
+
+def test_tokens_then_done_with_the_full_text(stream_advice):
+    response = stream_advice(tokens("Save ", "20 ", "EUR."), "response")
+    assert response.media_type == "text/event-stream"
+    assert response.headers["cache-control"] == "no-cache"
+    assert read_events(response, []) == [
+        ("token", {"text": "Save "}), ("token", {"text": "20 "}), ("token", {"text": "EUR."}),
+        ("done", {"response": "Save 20 EUR."}),
+    ]
+
+
+def test_history_is_saved_once_the_whole_answer_went_out(stream_advice):
+    log, saved = [], []
+
+    async def save_history(advice):
+        # Every token was sent before, the done event comes after
+        saved.append((advice, [event for event, _ in log]))
+
+    events = read_events(stream_advice(tokens("Cut ", "Netflix."), "response", on_complete=save_history), log)
+    assert saved == [("Cut Netflix.", ["token", "token"])]
+    assert events[-1] == ("done", {"response": "Cut Netflix."})
+
+
+def test_broken_stream_ends_with_an_error_event_and_saves_nothing(stream_advice):
+    saved = []
+    response = stream_advice(tokens("Cut ", "the ", fail=True), "response", on_complete=saved.append)
+    assert read_events(response, []) == [
+        ("token", {"text": "Cut "}), ("token", {"text": "the "}), ("error", {"message": FALLBACK_MESSAGE}),
+    ]
+    assert saved == []
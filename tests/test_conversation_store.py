@@ -0,0 +1,66 @@
+import pytest
+
+from models.models import ChatMessage
+from services.conversation_store import ConversationStore
+
+
+def chat(store, db, session_id, turns):
+    for i in range(turns):
+        store.append(db, session_id, f"Question {i}? More detail.", f"Answer {i}. Longer explanation here.")
+        db.commit()
+
+
+def test_window_stays_bounded_and_older_turns_are_summarized(db):
+    store = ConversationStore(max_turns=2, max_bytes=10_000, summary_chars=200)
+    chat(store, db, "a", 50)
+
+    window = store.window(db, "a")
+    assert window[0]["role"] == "system" and window[0]["content"].startswith(ConversationStore.SUMMARY_HEADER)
+    assert [m["content"] for m in window[1:]] == [
+        "Question 48? More detail.", "Answer 48. Longer explanation here.",
+        "Question 49? More detail.", "Answer 49. Longer explanation here.",
+    ]
+    summary = window[0]["content"].split("\n", 1)[1]
+    assert len(summary) <= 200
+    assert summary.endswith("- coach: Answer 47.")
+    # Everything is still in the database
+    assert db.query(ChatMessage).filter(ChatMessage.session_id == "a").count() == 100
+
+
+def test_byte_cap_and_sessions_are_isolated(db):
+    store = ConversationStore(max_turns=10, max_bytes=100, summary_chars=300)
+    store.append(db, "a", "x" * 80, "y" * 80)
+    store.append(db, "b", "hello", "hi")
+    db.commit()
+
+    assert [m["content"] for m in store.window(db, "a")[1:]] == ["y" * 80]
+    assert [m["content"] for m in store.window(db, "b")] == ["hello", "hi"]
+    assert store.stats()["bytes"] <= 2 * (100 + 300)
+
+
+def test_conversation_survives_restart(db):
+    chat(ConversationStore(max_turns=2), db, "a", 5)
+
+    restarted = ConversationStore(max_turns=2)
+    window = restarted.window(db, "a")
+    assert "Question 2?" in window[0]["content"]
+    assert [m["content"] for m in window[1:]][-1] == "Answer 4. Longer explanation here."
+    assert len(window) == 5
+    assert restarted.stats()["loads"] == 1
+
+
+def test_chat_without_a_message_is_rejected_before_the_coach_is_called(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from web import routes
+
+    async def no_llm(*args, **kwargs):
+        pytest.fail("the coach was called")
+
+    monkeypatch.setattr(routes.coach, "get_financial_advice_async", no_llm)
+    app = FastAPI()
+    app.include_router(routes.router)
+    client = TestClient(app)
+    for payload in ({}, {"message": None}, {"message": 42}, {"message": ["hi"]}):
+        response = client.post("/chat", json=payload)
+        assert response.status_code == 400 and response.json() == {"detail": "Missing message"}
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+
+from models.models import Transaction
+from services.data_version import TransactionVersion
+from services.pdf_report import PDFReportService
+
+
+@pytest.fixture
+def make_db(make_session_factory):
+    def make():
+        db = make_session_factory()()
+        TransactionVersion.ensure(db)
+        return db
+
+    return make
+
+
+def add(db, merchant, amount):
+    # Same steps as /add-transaction
+    tx = Transaction(merchant=merchant, amount=amount, category="Food", date=datetime(2026, 5, 1))
+    db.add(tx)
+    db.flush()
+    TransactionVersion.bump(db)
+    db.commit()
+    return tx
+
+
+def test_reused_id_and_amount_still_change_the_version(make_db):
+    db = make_db()
+    add(db, "Carrefour", 20.0)
+    last = add(db, "Uber", 12.5)
+    before, pdf_before = TransactionVersion.current(db), PDFReportService.fingerprint(db)
+    assert TransactionVersion.current(db) == before
+
+    # SQLite hands the highest id out again: count, ids and amounts all end up the same
+    TransactionVersion.bump(db)
+    db.delete(last)
+    db.commit()
+    replacement = add(db, "Netflix", 12.5)
+    assert replacement.id == last.id
+
+    assert TransactionVersion.current(db) != before
+    assert PDFReportService.fingerprint(db) != pdf_before
+
+
+def test_versions_are_never_shared_between_databases(make_db):
+    first, second = make_db(), make_db()
+    TransactionVersion.ensure(first)
+    assert TransactionVersion.current(first) != TransactionVersion.current(second)
+    assert TransactionVersion.current(first).endswith(":0")
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from core.config import settings
+from core.db_pool import TimedAsyncQueuePool, TimedQueuePool, engine_options, pool_status, track_checkouts
+from core.security import require_admin
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/pool.db", poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.2
+    )
+    track_checkouts(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_pool_counts_checkouts_waits_and_timeouts(engine):
+    held = engine.connect()
+    held.execute(text("select 1"))
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+
+    # Released 100ms later: the second checkout waits for it
+    threading.Timer(0.1, held.close).start()
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+        status = pool_status(engine)
+
+    assert status["checked_out"] == 1 and status["capacity"] == 1
+    assert status["checkouts"] == 2 and status["peak_checked_out"] == 1
+    assert status["timeouts"] == 1 and status["waits"] == 2
+    assert 50 <= status["wait_max_ms"] < 1000
+
+    # dispose() recreates the pool, the counters carry over
+    engine.dispose()
+    assert pool_status(engine)["checkouts"] == 2
+
+
+def test_engine_options(monkeypatch):
+    assert "poolclass" not in engine_options("sqlite://")
+    assert engine_options("sqlite+aiosqlite:////tmp/app.db", is_async=True)["poolclass"] is TimedAsyncQueuePool
+
+    monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 5000)
+    sync_options = engine_options("postgresql://u:p@db/app")
+    assert sync_options["pool_size"] == settings.DB_POOL_SIZE
+    assert sync_options["connect_args"] == {"options": "-c statement_timeout=5000"}
+    async_options = engine_options("postgresql+asyncpg://u:p@db/app", is_async=True)
+    assert async_options["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+    assert "connect_args" not in engine_options("sqlite:////tmp/app.db")
+
+
+def test_admin_token_check(monkeypatch):
+    app = FastAPI()
+
+    @app.get("/admin/db-pool", dependencies=[Depends(require_admin)])
+    async def stats():
+        return {}
+
+    client = TestClient(app)
+    assert client.get("/admin/db-pool", headers={"X-Admin-Token": "s3cret"}).status_code == 403  # ADMIN_TOKEN unset
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/admin/db-pool", headers={"X-Admin-Token": "s3cret"}).status_code == 200
+    assert client.get("/admin/db-pool").status_code == 403
+    # Non-ASCII bytes: a plain 403, not a TypeError from compare_digest
+    assert client.get("/admin/db-pool", headers={"X-Admin-Token": "s3crét".encode("latin-1")}).status_code == 403
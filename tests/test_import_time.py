@@ -0,0 +1,54 @@
+"""
+Startup budget: `import main` in a fresh interpreter, timed with python -X importtime.
+
+Fails when the app takes longer than IMPORT_TIME_BUDGET_MS to import (best of 3 runs), or when one
+of the heavy optional dependencies is loaded at import time instead of on first use.
+
+    python tests/test_import_time.py      # prints the slowest top-level imports
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+
+BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+RUNS = 3
+# Loaded by the routes/workers that need them (Gemini, PDF workers, OCR workers, coach, login, analysis)
+LAZY_MODULES = ("google.genai", "fpdf", "passlib", "pytesseract", "PIL", "groq", "httpx", "pyinstrument", "numpy")
+
+
+def import_profile():
+    """{module: cumulative microseconds} of one `import main`"""
+    env = dict(os.environ, DATABASE_URL="sqlite://", GROQ_API_KEY="x", GEMINI_API_KEY="x")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=root_path, env=env, capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative, name = line.split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def test_heavy_dependencies_are_not_imported_at_startup():
+    profile = import_profile()
+    eager = sorted(m for m in profile if m in LAZY_MODULES)
+    assert not eager, f"imported at startup: {eager}"
+
+
+def test_startup_import_budget():
+    best_ms = min(import_profile()["main"] for _ in range(RUNS)) / 1000
+    assert best_ms <= BUDGET_MS, f"import main: {best_ms:.0f} ms > budget {BUDGET_MS:.0f} ms"
+
+
+if __name__ == "__main__":
+    profile = import_profile()
+    print(f"import main: {profile['main'] / 1000:.0f} ms (budget {BUDGET_MS:.0f} ms)")
+    for name, micros in sorted(profile.items(), key=lambda item: -item[1])[1:16]:
+        print(f"{micros / 1000:8.1f} ms  {name}")
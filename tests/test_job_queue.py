@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+from services.job_queue import JobQueue, QueueFullError
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def test_submit_rejects_beyond_max_pending(release):
+    jobs = JobQueue("test", max_workers=1, max_pending=2, use_processes=False)
+    running = jobs.submit(release.wait, 5)
+    queued = jobs.submit(release.wait, 5)
+    assert jobs.pending_count() == 2
+
+    with pytest.raises(QueueFullError):
+        jobs.submit(release.wait, 5)
+    # A job already in flight is deduplicated, not rejected
+    assert jobs.submit(release.wait, 5, job_id=queued) == queued
+
+    release.set()
+    jobs.future(running).result(timeout=5)
+    jobs.future(queued).result(timeout=5)
+    assert jobs.get(queued)["status"] == "done"
+    # Room again once the pending jobs finished
+    done = jobs.submit(sum, [1, 2])
+    assert jobs.future(done).result(timeout=5) == 3
+    jobs.shutdown()
+
+
+def test_failed_and_unknown_jobs():
+    jobs = JobQueue("test", max_workers=1, use_processes=False)
+    job_id = jobs.submit(int, "not a number")
+    with pytest.raises(ValueError):
+        jobs.future(job_id).result(timeout=5)
+    info = jobs.get(job_id)
+    assert info["status"] == "error" and "invalid literal" in info["error"]
+    assert jobs.get("missing") is None
+    jobs.shutdown()
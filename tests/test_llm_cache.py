@@ -0,0 +1,33 @@
+from services.llm_cache import LLMCache
+
+
+def test_key_normalizes_inputs():
+    a = LLMCache.make_key("plan", transactions="abc", budget=1500, goal="Vacation ", target=1200)
+    b = LLMCache.make_key("plan", transactions="abc", budget=1500.0, goal="vacation", target=1200.0)
+    assert a == b
+    assert a != LLMCache.make_key("plan", transactions="abd", budget=1500, goal="Vacation", target=1200)
+    assert a != LLMCache.make_key("report", transactions="abc", budget=1500, goal="Vacation", target=1200)
+
+
+def test_ttl_lru_and_invalidate(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.llm_cache.time.monotonic", lambda: now[0])
+    cache = LLMCache(max_entries=2, ttl=60)
+
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert cache.get("c") == "C"
+
+    now[0] += 61
+    assert cache.get("a") is None
+
+    cache.put("d", "D")
+    cache.invalidate()
+    assert cache.get("d") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["evictions"] == 1 and stats["expired"] == 1
+    assert stats["hit_rate"] == 0.4
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from services.llm_guard import LLMBusyError, LLMGuard
+
+
+def test_identical_calls_share_one_flight():
+    guard = LLMGuard(max_in_flight_per_user=1)
+    calls = []
+
+    async def fake_llm():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        # Same key from one caller: only the leader counts against the limit
+        return await asyncio.gather(*(guard.run("report", "alice", fake_llm) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["answer"] * 5
+    assert len(calls) == 1
+    assert guard.stats()["coalesced"] == 4 and guard.stats()["in_flight"] == 0
+
+
+def test_caller_over_limit_is_rejected():
+    guard = LLMGuard(max_in_flight_per_user=1, retry_after=7)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def main():
+        first = asyncio.ensure_future(guard.run("a", "alice", slow))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMBusyError) as busy:
+            await guard.run("b", "alice", slow)
+        assert busy.value.retry_after == 7
+        assert await guard.run("c", "bob", slow) == "ok"
+        assert await first == "ok"
+        assert await guard.run("b", "alice", slow) == "ok"
+
+    asyncio.run(main())
+
+
+def test_waiters_retry_when_leader_fails():
+    guard = LLMGuard()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return "second try"
+
+    async def main():
+        return await asyncio.gather(guard.run("k", "a", flaky), guard.run("k", "b", flaky), return_exceptions=True)
+
+    leader, follower = asyncio.run(main())
+    assert isinstance(leader, RuntimeError)
+    assert follower == "second try"
+
+
+def test_callers_behind_one_proxy_get_their_own_quota():
+    from core.security import sign_session
+    from web.routes import SESSION_COOKIE, _caller_id
+
+    def request(cookie=None):
+        headers = [(b"cookie", f"{SESSION_COOKIE}={cookie}".encode())] if cookie else []
+        return Request({"type": "http", "headers": headers, "client": ("10.0.0.1", 5000)})
+
+    alice, bob = request(sign_session("a" * 32)), request(sign_session("b" * 32))
+    assert _caller_id(alice) != _caller_id(bob)
+    assert _caller_id(alice) == _caller_id(request(sign_session("a" * 32))) == "session:" + "a" * 32
+    # No session the server issued: the client address, whatever cookie is made up
+    signed = sign_session("a" * 32)
+    forged = signed[:-1] + ("1" if signed.endswith("0") else "0")
+    for cookie in (None, "not-a-session", "c" * 32, f"{'c' * 32}.{'0' * 64}", forged):
+        assert _caller_id(request(cookie)) == "ip:10.0.0.1"
@@ -0,0 +1,70 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from core.metrics import Metrics, MetricsMiddleware, instrument_queries, timer
+
+
+def sample(rendered, line_start):
+    """Value of the first exposition line starting with line_start"""
+    return next(float(line.rsplit(" ", 1)[1]) for line in rendered.splitlines() if line.startswith(line_start))
+
+
+def test_histograms_are_cumulative_and_bounds_inclusive():
+    registry = Metrics()
+    for seconds in (0.004, 0.005, 0.3, 120):
+        registry.observe_stage('ocr "tesseract"', seconds)
+    rendered = registry.render()
+
+    name = 'smartsave_stage_duration_seconds_bucket{stage="ocr \\"tesseract\\"",'
+    assert sample(rendered, name + 'le="0.005"}') == 2
+    assert sample(rendered, name + 'le="0.5"}') == 3
+    assert sample(rendered, name + 'le="60.0"}') == 3
+    assert sample(rendered, name + 'le="+Inf"}') == 4
+    assert sample(rendered, "smartsave_stage_duration_seconds_sum") == pytest.approx(120.309)
+
+
+def test_middleware_labels_route_templates_and_errors():
+    registry = Metrics()
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.get("/goals/{goal_id}")
+    async def goal(goal_id: int):
+        if goal_id == 0:
+            raise RuntimeError("boom")
+        return {"id": goal_id}
+
+    client = TestClient(app, raise_server_exceptions=False)
+    for goal_id in (1, 2, 0):
+        client.get(f"/goals/{goal_id}")
+    client.get("/nowhere")
+    rendered = registry.render()
+
+    assert sample(rendered, 'smartsave_http_requests_total{method="GET",route="/goals/{goal_id}",status="200"}') == 2
+    assert sample(rendered, 'smartsave_http_requests_total{method="GET",route="/goals/{goal_id}",status="500"}') == 1
+    assert sample(rendered, 'smartsave_http_requests_total{method="GET",route="unmatched",status="404"}') == 1
+    assert sample(rendered, 'smartsave_http_request_duration_seconds_count{method="GET",route="/goals/{goal_id}"}') == 3
+    assert sample(rendered, "smartsave_http_requests_in_flight") == 0
+
+
+def test_query_and_worker_timings():
+    registry = Metrics()
+    engine = create_engine("sqlite://")
+    instrument_queries(engine, "primary", registry)
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+        conn.execute(text("  SELECT 2"))
+        conn.execute(text("pragma user_version"))
+
+    timings = {}
+    for _ in range(2):
+        with timer(timings, "ocr_decode"):
+            pass
+    registry.record_timings(timings)
+    rendered = registry.render()
+
+    assert sample(rendered, 'smartsave_db_query_duration_seconds_count{engine="primary",operation="select"}') == 2
+    assert sample(rendered, 'smartsave_db_query_duration_seconds_count{engine="primary",operation="other"}') == 1
+    assert sample(rendered, 'smartsave_stage_duration_seconds_count{stage="ocr_decode"}') == 1
@@ -0,0 +1,143 @@
+import asyncio
+import io
+import threading
+import time
+import zipfile
+
+import pytest
+
+from core.config import settings
+from services import ocr_service
+from services.job_queue import JobQueue, QueueFullError
+from services.ocr_cache import OCRCache
+from services.ocr_service import TIMINGS_KEY, BatchTooLargeError, OCRService
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+@pytest.fixture
+def pool(monkeypatch, release):
+    """OCR pool of 1 worker and 2 pending scans, each scan blocked until `release` is set"""
+    jobs = JobQueue("ocr", max_workers=1, max_pending=2, use_processes=False)
+    monkeypatch.setattr(ocr_service, "ocr_jobs", jobs)
+    monkeypatch.setattr(ocr_service, "ocr_cache", OCRCache())
+
+    def fake_ocr(image_bytes):
+        release.wait(5)
+        return {"merchant": image_bytes.decode(), "total": 1.0, TIMINGS_KEY: {"ocr_total": 0.001}}
+
+    monkeypatch.setattr(ocr_service, "run_ocr", fake_ocr)
+    yield jobs
+    jobs.shutdown()
+
+
+def test_submit_rejects_scans_beyond_the_queue_size(pool, release):
+    async def scenario():
+        first = await OCRService.submit(b"receipt 1")
+        await OCRService.submit(b"receipt 2")
+        with pytest.raises(QueueFullError):
+            await OCRService.submit(b"receipt 3")
+        return first
+
+    first = asyncio.run(scenario())
+
+    release.set()
+    pool.future(first).result(timeout=5)
+    assert OCRService.status(first)["data"]["merchant"] == "receipt 1"
+
+
+def test_cache_lookup_does_not_block_the_event_loop(pool, release, monkeypatch):
+    def slow_lookup(image_bytes):
+        time.sleep(0.3)  # decoding and hashing a large photo
+        return None, {"key": "k", "phash": None, "ratio": None, "thumb": None}
+
+    monkeypatch.setattr(ocr_service.ocr_cache, "lookup", slow_lookup)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await OCRService.submit(b"big photo")
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 10
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_expand_uploads_unpacks_archives():
+    archive = make_zip({
+        "week1/a.jpg": b"A", "week1/b.PNG": b"B", "notes.txt": b"skip", "__MACOSX/._a.jpg": b"skip", "week2/": b"",
+    })
+    images = OCRService.expand_uploads([("single.jpg", b"S"), ("receipts.zip", archive)])
+    assert images == [("single.jpg", b"S"), ("receipts.zip/week1/a.jpg", b"A"), ("receipts.zip/week1/b.PNG", b"B")]
+
+
+def test_expand_uploads_enforces_the_batch_limits(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_BATCH_MAX_FILES", 3)
+    monkeypatch.setattr(settings, "OCR_BATCH_MAX_BYTES", 1024 * 1024)
+
+    with pytest.raises(BatchTooLargeError):
+        OCRService.expand_uploads([(f"{i}.jpg", b"x") for i in range(4)])
+    with pytest.raises(BatchTooLargeError):
+        OCRService.expand_uploads([("big.jpg", b"x" * (1024 * 1024 + 1))])
+
+    # Zip bomb: 20 MB of zeros compress to ~20 KB, rejected from the declared sizes before extraction
+    bomb = make_zip({"bomb.png": bytes(20 * 1024 * 1024)})
+    assert len(bomb) < 100 * 1024
+    monkeypatch.setattr(zipfile.ZipFile, "read", lambda *args: pytest.fail("archive was extracted"))
+    with pytest.raises(BatchTooLargeError, match="expands beyond"):
+        OCRService.expand_uploads([("bomb.zip", bomb)])
+
+
+def test_scan_many_yields_every_image_with_its_status(pool, release, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_WORKERS", 1)
+    release.set()
+
+    # b"\xff" isn't valid UTF-8: that scan fails in fake_ocr, the others go through
+    async def scenario():
+        return [item async for item in OCRService.scan_many([("a.jpg", b"a"), ("bad.jpg", b"\xff"), ("b.jpg", b"b")])]
+
+    results = sorted(asyncio.run(scenario()), key=lambda item: item["index"])
+    assert [(r["filename"], r["status"]) for r in results] == [("a.jpg", "success"), ("bad.jpg", "error"), ("b.jpg", "success")]
+    assert results[2]["data"]["merchant"] == "b"
+
+
+def test_stage_timings_never_reach_the_readers(pool, release, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(ocr_service.metrics, "record_timings", recorded.append)
+    release.set()
+
+    callbacks_done = threading.Event()
+
+    async def scenario():
+        job_id = await OCRService.submit(b"receipt")
+        # Done-callbacks run in order: this one once submit's has stored the result
+        pool.future(job_id).add_done_callback(lambda _: callbacks_done.set())
+        return job_id, await OCRService.wait(job_id)
+
+    job_id, result = asyncio.run(scenario())
+    assert callbacks_done.wait(5)
+    assert TIMINGS_KEY not in result and TIMINGS_KEY not in OCRService.status(job_id)["data"]
+    assert TIMINGS_KEY not in ocr_service.ocr_cache.lookup(b"receipt")[0]
+    # The shared job result is left as the worker returned it, the timings recorded once
+    assert pool.future(job_id).result()[TIMINGS_KEY] == {"ocr_total": 0.001}
+    assert recorded == [{"ocr_total": 0.001}]
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import random
+
+import httpx
+import pytest
+from groq import AsyncGroq, RateLimitError
+
+from api.open_ai_client import FALLBACK_MESSAGE, AICoach, CoachStreamError
+from core.config import settings
+
+REQUEST = httpx.Request("POST", "https://api.groq.test/openai/v1/chat/completions")
+
+
+def completion(content="Save 20 EUR today."):
+    return httpx.Response(200, json={
+        "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "test",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    })
+
+
+def error(status, **headers):
+    return httpx.Response(
+        status, json={"error": {"message": "try again", "type": "server_error"}}, headers=headers, request=REQUEST,
+    )
+
+
+def coach_with(handler):
+    """AICoach whose async client sends every request to handler(request) instead of the network"""
+    coach = AICoach()
+    coach._async_client = AsyncGroq(
+        api_key="test", base_url="https://api.groq.test",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)), max_retries=0,
+    )
+    return coach
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY", 0.001)
+
+
+def test_transient_errors_are_retried():
+    responses = [error(429), error(503), completion()]
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return responses[len(calls) - 1]
+
+    coach = coach_with(handler)
+    assert asyncio.run(coach.get_financial_advice_async("Hi", 80, "")) == "Save 20 EUR today."
+    assert len(calls) == 3
+
+
+def test_retries_give_up_after_max_retries_and_skip_client_errors():
+    calls = []
+
+    def failing(request):
+        calls.append(request)
+        return error(502)
+
+    assert asyncio.run(coach_with(failing).get_financial_advice_async("Hi", 80, "")) == FALLBACK_MESSAGE
+    assert len(calls) == settings.LLM_MAX_RETRIES + 1
+
+    # A bad request won't get better: a single attempt
+    calls.clear()
+
+    def rejected(request):
+        calls.append(request)
+        return error(400)
+
+    assert asyncio.run(coach_with(rejected).get_financial_advice_async("Hi", 80, "")) == FALLBACK_MESSAGE
+    assert len(calls) == 1
+
+
+def test_retry_delay_stays_within_the_jitter_bounds(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY", 0.5)
+    random.seed(3)
+    for attempt in range(4):
+        delays = [AICoach.retry_delay(attempt) for _ in range(500)]
+        ceiling = 0.5 * 2 ** attempt
+        assert all(0 <= delay <= ceiling for delay in delays)
+        # Full jitter: spread over the whole range, not bunched at the ceiling
+        assert min(delays) < ceiling * 0.1 and max(delays) > ceiling * 0.9
+
+    # The server's Retry-After wins, capped at the request timeout
+    limited = RateLimitError("slow down", response=error(429, **{"retry-after": "3"}), body=None)
+    assert AICoach.retry_delay(0, limited) == 3.0
+    too_long = RateLimitError("slow down", response=error(429, **{"retry-after": "3600"}), body=None)
+    assert AICoach.retry_delay(0, too_long) == settings.LLM_TIMEOUT
+
+
+def test_in_flight_calls_never_exceed_the_concurrency_cap(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_CONCURRENCY", 3)
+    in_flight = peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return completion()
+
+    coach = coach_with(handler)
+
+    async def scenario():
+        return await asyncio.gather(*(coach.get_financial_advice_async(f"Question {i}", 80, "") for i in range(12)))
+
+    assert asyncio.run(scenario()) == ["Save 20 EUR today."] * 12
+    assert peak == 3
+
+
+def sse_chunks(*words):
+    for word in words:
+        chunk = {"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "test",
+                 "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+        yield f"data: {json.dumps(chunk)}\n\n".encode()
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    """SSE body that loses the connection after its first two tokens"""
+
+    async def __aiter__(self):
+        for chunk in sse_chunks("Cut ", "the "):
+            yield chunk
+        raise httpx.ReadError("connection reset", request=REQUEST)
+
+
+async def collect(tokens):
+    return [token async for token in tokens]
+
+
+def test_stream_yields_tokens_and_caches_the_complete_answer():
+    coach = coach_with(lambda request: httpx.Response(
+        200, headers={"content-type": "text/event-stream"},
+        content=b"".join(sse_chunks("Cut ", "the ", "cinema.")) + b"data: [DONE]\n\n",
+    ))
+    assert asyncio.run(collect(coach.stream_financial_advice("Hi", 80, "", cache_key="k"))) == ["Cut ", "the ", "cinema."]
+    assert coach.cache.get("k") == "Cut the cinema."
+
+
+def test_stream_broken_after_the_first_tokens_raises_and_is_not_cached():
+    coach = coach_with(lambda request: httpx.Response(
+        200, headers={"content-type": "text/event-stream"}, stream=BrokenStream(),
+    ))
+    received = []
+
+    async def scenario():
+        async for token in coach.stream_financial_advice("Hi", 80, "", cache_key="k"):
+            received.append(token)
+
+    with pytest.raises(CoachStreamError):
+        asyncio.run(scenario())
+    assert received == ["Cut ", "the "]
+    assert coach.cache.get("k") is None
+
+    # Nothing produced yet: retried, then the fallback text
+    coach = coach_with(lambda request: error(503))
+    assert asyncio.run(collect(coach.stream_financial_advice("Hi", 80, ""))) == [FALLBACK_MESSAGE]
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+from core.config import settings
+from models.models import Transaction
+from services import pdf_layout, pdf_report
+from services.data_version import TransactionVersion
+from services.job_queue import JobQueue
+from services.pdf_report import PDFReportService, render_report
+
+
+class RecordingPDF(pdf_layout.ReportPDF):
+    """ReportPDF keeping the page of every table header and the text of every cell"""
+
+    instances = []
+
+    def __init__(self):
+        super().__init__()
+        self.header_pages, self.cells = [], []
+        RecordingPDF.instances.append(self)
+
+    def table_header(self):
+        self.header_pages.append(self.page_no())
+        super().table_header()
+
+    def cell(self, *args, **kwargs):
+        text = args[2] if len(args) > 2 else kwargs.get("txt", kwargs.get("text", ""))
+        self.cells.append(text)
+        return super().cell(*args, **kwargs)
+
+
+@pytest.fixture
+def reports(session_factory, monkeypatch, tmp_path):
+    """80 transactions over 3 categories, rendered by a thread pool into tmp_path"""
+    with session_factory() as db:
+        TransactionVersion.ensure(db)
+        for i in range(80):
+            db.add(Transaction(
+                merchant=f"Shop {i}", amount=1.25 * (i + 1), category=("Food", "Fun", "Transport")[i % 3],
+                date=datetime(2026, 5, 1) + timedelta(hours=i),
+            ))
+        TransactionVersion.bump(db)
+        db.commit()
+
+    jobs = JobQueue("pdf", max_workers=1, use_processes=False)
+    monkeypatch.setattr(pdf_report, "pdf_jobs", jobs)
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    monkeypatch.setattr(settings, "REPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(pdf_layout, "ReportPDF", RecordingPDF)
+    RecordingPDF.instances = []
+    yield jobs
+    jobs.shutdown()
+
+
+def test_table_spans_pages_and_ends_with_category_subtotals(reports, tmp_path):
+    output = tmp_path / "report.pdf"
+    assert render_report(str(output)) == {"rows": 80, "total": 4050.0}
+    assert output.read_bytes().startswith(b"%PDF")
+
+    [pdf] = RecordingPDF.instances
+    # The table header is repeated at the top of every page the table runs on
+    assert pdf.page_no() >= 3
+    assert pdf.header_pages == list(range(1, pdf.page_no() + 1))
+
+    total_line = "TOTAL SPENT: 4050.00 EUR (80 transactions)"
+    subtotals = pdf.cells[pdf.cells.index("Subtotals by category") + 1:pdf.cells.index(total_line)]
+    expected = {
+        category: sum(1.25 * (i + 1) for i in range(80) if i % 3 == index)
+        for index, category in enumerate(("Food", "Fun", "Transport"))
+    }
+    assert subtotals[0::2] == sorted(expected, key=expected.get, reverse=True)
+    assert subtotals[1::2] == [f"{expected[category]:.2f} EUR" for category in subtotals[0::2]]
+
+
+def test_second_export_of_the_same_version_is_served_from_disk(reports, db, monkeypatch):
+    submitted = []
+    submit = reports.submit
+    monkeypatch.setattr(reports, "submit", lambda *args, **kwargs: submitted.append(kwargs) or submit(*args, **kwargs))
+
+    first = PDFReportService.request_report(db)
+    assert first["status"] in ("queued", "running", "done")
+    reports.future(first["job_id"]).result(timeout=30)
+    assert PDFReportService.status(first["job_id"])["status"] == "done"
+
+    # Same version: the cached file answers, no render is queued
+    assert PDFReportService.request_report(db) == {"job_id": first["job_id"], "status": "done"}
+    assert len(submitted) == 1 and len(RecordingPDF.instances) == 1
+
+    # Any committed write changes the version, hence the file
+    TransactionVersion.bump(db)
+    db.commit()
+    second = PDFReportService.request_report(db)
+    assert second["job_id"] != first["job_id"] and len(submitted) == 2
+    reports.future(second["job_id"]).result(timeout=30)
+
+
+def test_status_of_unknown_or_malformed_jobs(reports):
+    assert PDFReportService.status("0" * 32) is None
+    assert PDFReportService.status("../../etc/passwd") is None
@@ -0,0 +1,83 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.config import settings
+from core.profiling import ProfilerMiddleware, ProfileStore
+
+
+def test_store_lists_newest_first_and_prunes(tmp_path):
+    store = ProfileStore(str(tmp_path), max_files=2)
+    for second in range(3):
+        name = f"20260501-10000{second}-abcdef"
+        store.save(name, {"path": f"/r{second}"}, {"html": "<html></html>", "speedscope": "{}"})
+
+    assert [p["path"] for p in store.list()] == ["/r2", "/r1"]
+    assert not (tmp_path / "20260501-100000-abcdef.html").exists()
+    assert store.list()[0]["files"] == ["20260501-100002-abcdef.html", "20260501-100002-abcdef.speedscope.json"]
+
+    assert store.path("20260501-100002-abcdef.speedscope.json") == str(tmp_path / "20260501-100002-abcdef.speedscope.json")
+    for bad in ("../secret.html", "20260501-100002-abcdef.json", "x.html"):
+        assert store.path(bad) is None
+
+
+def make_app(tmp_path, **options):
+    store = ProfileStore(str(tmp_path))
+    app = FastAPI()
+    app.add_middleware(ProfilerMiddleware, store=store, formats=["html", "speedscope"], **options)
+
+    @app.get("/analytics")
+    async def analytics():
+        return {"ok": True}
+
+    return app, store
+
+
+def test_profile_flag_needs_the_admin_token(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    app, store = make_app(tmp_path)
+    client = TestClient(app)
+
+    for headers in ({"X-Profile": "1"}, {"X-Profile": "1", "X-Admin-Token": "nope"}):
+        response = client.get("/analytics", headers=headers)
+        assert response.status_code == 200 and "x-profile-id" not in response.headers
+    assert "x-profile-id" not in client.get("/analytics?xprofile=1", headers={"X-Admin-Token": "s3cret"}).headers
+    assert store.list() == []
+
+
+def test_admin_is_told_when_the_profiler_is_busy(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    app = FastAPI()
+
+    @app.get("/analytics")
+    async def analytics():
+        return {"ok": True}
+
+    # Another request is being profiled
+    profiler = ProfilerMiddleware(app, store=ProfileStore(str(tmp_path)))
+    profiler._active = True
+    client = TestClient(profiler)
+
+    response = client.get("/analytics?profile=1", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200 and response.headers["x-profile-skipped"] == "busy"
+    assert "x-profile-id" not in response.headers
+    # Not revealed to callers without the token
+    assert "x-profile-skipped" not in client.get("/analytics?profile=1").headers
+
+
+def test_flagged_request_is_profiled(tmp_path, monkeypatch):
+    pytest.importorskip("pyinstrument")
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    app, store = make_app(tmp_path, slow_ms=60_000)
+    client = TestClient(app)
+
+    response = client.get("/analytics?profile=1", headers={"X-Admin-Token": "s3cret"})
+    [profile] = store.list()
+    assert response.headers["x-profile-id"] == profile["name"]
+    assert profile["route"] == "/analytics" and profile["trigger"] == "flag"
+    assert len(profile["files"]) == 2
+
+    # Sampled but fast: profiled, not kept
+    app, store = make_app(tmp_path / "sampled", sample_rate=1.0, slow_ms=60_000)
+    TestClient(app).get("/analytics")
+    assert store.list() == []
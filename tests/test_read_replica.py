@@ -0,0 +1,60 @@
+import asyncio
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.replica import WRITE_COOKIE, ReadYourWritesMiddleware, ReplicaHealth, recently_wrote
+
+
+def test_replica_health_falls_back_and_recovers(tmp_path):
+    async def scenario():
+        # Two SQLite files stand in for the primary and the replica; only the replica matters here
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica.db")
+        health = ReplicaHealth(engine, check_interval=3600)
+        assert await health.available()
+
+        health.mark_down(RuntimeError("connection reset"))
+        # Not re-probed before check_interval: reads stay on the primary
+        assert not await health.available() and health.fallbacks == 1
+
+        health.check_interval = 0
+        assert await health.available() and health.last_error is None
+        await engine.dispose()
+
+        missing = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db")
+        unreachable = ReplicaHealth(missing)
+        assert not await unreachable.available()
+        assert unreachable.stats()["last_error"].startswith("OperationalError")
+        await missing.dispose()
+        # aiosqlite's worker thread outlives a failed connect by a moment, let it finish before the loop closes
+        await asyncio.sleep(0.05)
+        assert not await ReplicaHealth(None).available()
+
+    asyncio.run(scenario())
+
+
+def test_writes_pin_the_caller_to_the_primary():
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, window=30)
+
+    @app.post("/write")
+    async def write(ok: bool = True):
+        if not ok:
+            raise HTTPException(status_code=400)
+        return {}
+
+    @app.get("/read")
+    async def read(request: Request):
+        return {"primary": recently_wrote(request)}
+
+    client = TestClient(app)
+    assert client.get("/read").json() == {"primary": False}
+    client.post("/write", params={"ok": False})
+    assert client.get("/read").json() == {"primary": False}
+
+    assert WRITE_COOKIE in client.post("/write").cookies
+    assert client.get("/read").json() == {"primary": True}
+    # Reads don't extend the window, another caller isn't affected
+    assert WRITE_COOKIE not in client.get("/read").cookies
+    assert TestClient(app).get("/read").json() == {"primary": False}
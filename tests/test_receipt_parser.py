@@ -0,0 +1,36 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from services.receipt_parser import ReceiptParser
+
+FIXTURES = Path(__file__).parent / "fixtures" / "receipts"
+EXPECTED = json.loads((FIXTURES / "expected.json").read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_layout_parser_fixtures(name):
+    want = EXPECTED[name]
+    result = ReceiptParser.parse_text((FIXTURES / name).read_text(encoding="utf-8"))
+    assert result["merchant"] == want["merchant"]
+    assert result["total"] == pytest.approx(want["total"])
+    assert result["tax"] == pytest.approx(want["tax"])
+    assert len(result["items"]) == want["items"]
+
+
+def test_tesseract_words_are_grouped_by_line():
+    data = {
+        "text": ["", "ACME", "Apples", "2.50", "TOTAL", "2.50"],
+        "conf": [-1, 95, 90, 91, 93, 92],
+        "left": [0, 40, 10, 300, 10, 300],
+        "width": [0, 120, 80, 40, 70, 40],
+        "height": [0, 40, 20, 20, 20, 20],
+        "block_num": [1, 1, 1, 1, 1, 1],
+        "par_num": [1, 1, 1, 1, 1, 1],
+        "line_num": [0, 1, 2, 2, 3, 3],
+    }
+    result = ReceiptParser.parse_words(ReceiptParser.words_from_tesseract(data))
+    assert result["merchant"] == "ACME"
+    assert result["items"] == [{"label": "Apples", "price": 2.5}]
+    assert result["total"] == 2.5
@@ -0,0 +1,51 @@
+import csv
+import gzip
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+import pytest
+
+from models.models import Transaction
+from services.report_export import CSV_HEADER, ReportExporter
+
+
+@pytest.fixture
+def session_factory(session_factory):
+    with session_factory() as db:
+        # One Food and one Fun transaction a day, the Fun one just before midnight
+        for day in range(10):
+            when = datetime(2026, 5, 1) + timedelta(days=day)
+            db.add(Transaction(merchant=f"Market {day}", amount=10.0 + day, category="Food", date=when.replace(hour=9)))
+            db.add(Transaction(merchant="Cinema, downtown", amount=5.5, category="Fun", date=when.replace(hour=23, minute=59)))
+        db.commit()
+    return session_factory
+
+
+def export(session_factory, **filters):
+    body = b"".join(ReportExporter.stream_csv(session_factory, **filters))
+    return list(csv.reader(StringIO(body.decode("utf-8"))))
+
+
+def test_filters_end_day_is_inclusive(session_factory):
+    rows = export(session_factory, start=date(2026, 5, 3), end=date(2026, 5, 4))
+    assert rows[0] == CSV_HEADER
+    assert [r[0] for r in rows[1:]] == ["2026-05-03"] * 2 + ["2026-05-04"] * 2
+
+    fun = export(session_factory, category="Fun", end=date(2026, 5, 2))
+    assert fun[1:] == [["2026-05-01", "Cinema, downtown", "Fun", "5.5", "True"], ["2026-05-02", "Cinema, downtown", "Fun", "5.5", "True"]]
+    assert export(session_factory, category="Rent") == [CSV_HEADER]
+    assert len(export(session_factory)) == 21
+
+
+def test_gzip_output_matches_the_plain_csv(session_factory):
+    plain = b"".join(ReportExporter.stream_csv(session_factory, category="Food"))
+    compressed = b"".join(ReportExporter.stream_csv(session_factory, category="Food", compress=True))
+    assert compressed[:2] == b"\x1f\x8b"
+    assert gzip.decompress(compressed) == plain
+
+
+def test_csv_is_encoded_batch_by_batch():
+    rows = [(datetime(2026, 5, 1), f"Shop {i}", "Food", 1.0, True) for i in range(25)]
+    chunks = list(ReportExporter.iter_csv(iter(rows), batch_size=10))
+    # Header + 10 rows, 10 rows, the last 5
+    assert [chunk.count("\n") for chunk in chunks] == [11, 10, 5]
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from models.models import Transaction
+from services.score_cache import ScoreCache
+from services.serenity_engine import SerenityEngine
+from services.spending_rollup import SpendingRollup
+
+
+def add(db, amount):
+    tx = Transaction(merchant="Shop", amount=amount, category="Food", date=datetime(2026, 5, 1))
+    db.add(tx)
+    db.flush()
+    SpendingRollup.record(db, tx)
+    db.commit()
+    return tx
+
+
+def test_deltas_keep_the_cached_score_in_sync(db):
+    cache = ScoreCache(ttl=3600)
+    assert cache.peek(1500.0) is None
+    assert cache.load(db, 1500.0) == SerenityEngine.analyze_rollup(db, 1500.0)
+
+    tx = add(db, 900.0)
+    cache.record(900.0)
+    add(db, 120.5)
+    cache.record(120.5)
+    assert cache.peek(1500.0) == SerenityEngine.analyze_rollup(db, 1500.0)
+
+    SpendingRollup.remove(db, tx)
+    db.delete(tx)
+    db.commit()
+    cache.record(-900.0, -1)
+    assert cache.peek(1500.0) == SerenityEngine.analyze_rollup(db, 1500.0)
+    # Budget change: rescored from the cached total, no reload
+    assert cache.peek(100.0) == SerenityEngine.analyze_rollup(db, 100.0)
+    assert cache.stats()["loads"] == 1
+
+
+def test_reload_racing_a_write_is_not_cached(db, monkeypatch):
+    cache = ScoreCache(ttl=3600)
+    totals = SpendingRollup.totals
+
+    def totals_then_write(session):
+        result = totals(session)
+        cache.record(50.0)  # a write commits while the reload is reading
+        return result
+
+    monkeypatch.setattr(SpendingRollup, "totals", staticmethod(totals_then_write))
+    cache.load(db, 1500.0)
+    assert cache.peek(1500.0) is None
+
+
+def test_invalidate_and_ttl(db, monkeypatch):
+    cache = ScoreCache(ttl=10)
+    now = [100.0]
+    monkeypatch.setattr("services.score_cache.time.monotonic", lambda: now[0])
+    cache.load(db, 1500.0)
+    assert cache.peek(1500.0)["status"] == "Perfect"
+    now[0] += 11
+    assert cache.peek(1500.0) is None
+    cache.load(db, 1500.0)
+    cache.invalidate()
+    assert cache.peek(1500.0) is None
@@ -0,0 +1,67 @@
+import random
+from datetime import date
+
+import numpy as np
+
+from models.models import DailySpending
+from services.serenity_engine import SerenityEngine
+
+
+def test_batch_matches_scalar_scores():
+    rng = random.Random(7)
+    n_groups = 50
+    amounts = [round(rng.uniform(0.5, 400), 2) for _ in range(2000)]
+    groups = [rng.randrange(n_groups - 1) for _ in amounts]  # the last group stays empty
+    budgets = [rng.choice([300.0, 1500.0, 2500.0, 99.99]) for _ in range(n_groups)]
+
+    batch = SerenityEngine.score_batch(np.array(amounts), np.array(groups), np.array(budgets), n_groups=n_groups)
+    for g in range(n_groups):
+        expected = SerenityEngine.analyze_finances(
+            [{"amount": a} for a, group in zip(amounts, groups) if group == g], budgets[g]
+        )
+        assert int(batch["score"][g]) == expected["score"]
+        assert batch["status"][g] == expected["status"]
+        assert float(batch["total_spent"][g]) == expected["total_spent"]
+    assert batch["status"][-1] == "Perfect"
+
+
+def test_batch_boundaries_and_rounding_ties():
+    # 750 = exactly 50% of the budget, 1500 = 100%, 2.675 rounds to 2.67 with round() but 2.68 with np.round,
+    # 750.004 and 1500.004 are just past a boundary but round to it
+    totals = [750.0, 750.004, 1500.0, 1500.004, 1500.01, 0.0, 2.675, 10_000.0]
+    batch = SerenityEngine.score_batch(totals, range(len(totals)), 1500.0)
+    for i, total in enumerate(totals):
+        expected = SerenityEngine.score_total(total, 1500.0)
+        assert (int(batch["score"][i]), batch["status"][i], float(batch["total_spent"][i])) == \
+            (expected["score"], expected["status"], expected["total_spent"])
+
+    # Scored on the exact total like analyze_finances always did, only total_spent is rounded
+    assert SerenityEngine.analyze_finances([{"amount": 750.004}], 1500.0) == {"score": 79, "status": "Good", "total_spent": 750.0}
+    assert SerenityEngine.score_total(750.0, 1500.0)["score"] == 80
+    assert (int(batch["score"][1]), float(batch["total_spent"][1])) == (79, 750.0)
+
+
+def test_single_group_default():
+    batch = SerenityEngine.score_batch([100.0, 200.0])
+    assert batch["score"].tolist() == [SerenityEngine.analyze_finances([{"amount": 100.0}, {"amount": 200.0}])["score"]]
+
+
+def test_history_is_zero_filled_and_limited_to_the_window(db):
+    db.add_all([
+        DailySpending(day=date(2025, 1, 10), category="Food", total=5000.0, tx_count=3),  # before the window
+        DailySpending(day=date(2026, 2, 3), category="Food", total=400.0, tx_count=2),
+        DailySpending(day=date(2026, 2, 20), category="Fun", total=350.0, tx_count=1),
+        DailySpending(day=date(2026, 4, 1), category="Housing", total=1800.0, tx_count=1),
+        DailySpending(day=date(2026, 7, 1), category="Food", total=90.0, tx_count=1),  # future-dated
+    ])
+    db.commit()
+
+    history = SerenityEngine.score_history(db, budget=1500.0, months=4, today=date(2026, 5, 18))
+    assert [h["month"] for h in history] == ["2026-02", "2026-03", "2026-04", "2026-05"]
+    assert [h["total_spent"] for h in history] == [750.0, 0.0, 1800.0, 0.0]
+    assert history[0] == {"month": "2026-02", **SerenityEngine.score_total(750.0, 1500.0)}
+    assert history[2]["score"] == SerenityEngine.score_total(1800.0, 1500.0)["score"]
+    assert (history[1]["score"], history[1]["status"]) == (100, "Perfect")
+
+    # Across a year boundary
+    assert [h["month"] for h in SerenityEngine.score_history(db, months=3, today=date(2026, 1, 5))] == ["2025-11", "2025-12", "2026-01"]
@@ -0,0 +1,110 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from models.models import Transaction
+from services.budget_analyzer import BudgetAnalyzer
+from services.spending_analytics import SpendingAnalytics
+from services.spending_rollup import SpendingRollup
+
+NOW = datetime(2026, 5, 20, 15, 30)
+CATEGORIES = ["Food", "Transport", "Housing", "Fun", "Health"]
+
+
+@pytest.fixture
+def db(db):
+    rng = random.Random(7)
+    first_day = datetime(2025, 4, 1)
+    for _ in range(600):
+        day = first_day + timedelta(days=rng.randrange((NOW - first_day).days + 1))
+        # Quarters of a unit add up exactly in floats: both paths must give the very same totals
+        db.add(Transaction(
+            merchant="Shop", amount=rng.randint(1, 40000) / 4, category=rng.choice(CATEGORIES),
+            date=day.replace(hour=rng.randrange(24), minute=rng.randrange(60)),
+        ))
+    db.commit()
+    SpendingRollup.rebuild(db)
+    return db
+
+
+def in_window(db, window):
+    """The raw transactions of the window, whole days like the rollup"""
+    start, end = window["start"].date(), window["end"].date() if window["end"] else None
+    return [
+        tx for tx in db.query(Transaction).order_by(Transaction.id).all()
+        if tx.date.date() >= start and (end is None or tx.date.date() <= end)
+    ]
+
+
+def by_name(insights):
+    # Equal amounts may come out in either order
+    return sorted(insights, key=lambda card: card["name"])
+
+
+@pytest.mark.parametrize("period, start, end", [
+    ("week", None, None),
+    ("month", None, None),
+    ("quarter", None, None),
+    ("12m", None, None),
+    ("custom", date(2026, 2, 25), date(2026, 3, 10)),
+    ("custom", date(2025, 6, 15), date(2026, 1, 5)),
+])
+def test_grouped_totals_match_the_per_transaction_analyzer(db, period, start, end):
+    window = SpendingAnalytics.resolve_period(period, start, end, now=NOW)
+    transactions = in_window(db, window)
+    assert transactions
+
+    summary = SpendingAnalytics.summarize(db, window)
+    total = sum(tx.amount for tx in transactions)
+    assert summary["total_spent"] == round(total, 2)
+    assert by_name(summary["category_insights"]) == by_name(BudgetAnalyzer.get_category_insights(transactions, total))
+
+    # Chart buckets: same as the in-memory path over the same transactions
+    in_memory = SpendingAnalytics.summarize_records(transactions, window)
+    assert summary["labels"] == in_memory["labels"]
+    assert summary["values"] == in_memory["values"]
+    assert sum(summary["values"]) == pytest.approx(total)
+
+
+def test_custom_range_ending_before_it_starts_is_empty(db):
+    window = SpendingAnalytics.resolve_period("custom", date(2026, 3, 10), date(2026, 2, 25), now=NOW)
+    assert in_window(db, window) == []
+    assert SpendingAnalytics.summarize(db, window) is None
+    assert BudgetAnalyzer.get_category_insights([], 0) == []
+
+
+def test_week_and_month_cover_whole_days_up_to_today(db):
+    week = SpendingAnalytics.resolve_period("week", now=NOW)
+    month = SpendingAnalytics.resolve_period("month", now=NOW)
+    assert week["start"] == datetime(2026, 5, 14) and month["start"] == datetime(2026, 4, 21)
+
+    # A week ago today is the same weekday as today: it must stay out of today's bucket
+    db.add(Transaction(merchant="Week ago", amount=1000.0, category="Food", date=NOW - timedelta(days=7)))
+    db.add(Transaction(merchant="Month ago", amount=1000.0, category="Food", date=NOW - timedelta(days=30)))
+    db.add(Transaction(merchant="Today", amount=0.25, category="Food", date=NOW))
+    db.commit()
+    SpendingRollup.rebuild(db)
+
+    week_transactions = in_window(db, week)
+    assert "Week ago" not in {tx.merchant for tx in week_transactions}
+    assert "Month ago" not in {tx.merchant for tx in in_window(db, month)}
+    today = round(sum(tx.amount for tx in week_transactions if tx.date.date() == NOW.date()), 2)
+    assert SpendingAnalytics.summarize(db, week)["values"][NOW.weekday()] == today
+    for window in (week, month):
+        total = sum(tx.amount for tx in in_window(db, window))
+        assert SpendingAnalytics.summarize(db, window)["total_spent"] == round(total, 2)
+
+
+def test_summary_frame_holds_one_row_per_bucket_and_category(db, monkeypatch):
+    from services.transaction_frame import TransactionFrame
+
+    built = []
+    from_rows = TransactionFrame.from_rows
+    monkeypatch.setattr(TransactionFrame, "from_rows", staticmethod(lambda rows: built.append(len(rows)) or from_rows(rows)))
+
+    window = SpendingAnalytics.resolve_period("12m", now=NOW)
+    summary = SpendingAnalytics.summarize(db, window)
+    assert len(in_window(db, window)) > 12 * len(CATEGORIES)
+    assert built == [12 * len(CATEGORIES)]
+    assert len(summary["values"]) == 12
@@ -0,0 +1,66 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.models import DailySpending, Transaction
+from services.spending_rollup import SpendingRollup
+
+
+def add(db, amount, category="Food", when=datetime(2026, 5, 1, 9)):
+    # Same steps as /add-transaction
+    tx = Transaction(merchant="Shop", amount=amount, category=category, date=when)
+    db.add(tx)
+    db.flush()
+    SpendingRollup.record(db, tx)
+    db.commit()
+    return tx
+
+
+def delete(db, tx):
+    # Same steps as /delete-transaction
+    SpendingRollup.remove(db, tx)
+    db.delete(tx)
+    db.commit()
+
+
+def test_adds_and_deletes_keep_the_rollup_in_sync(db):
+    rng = random.Random(3)
+    kept = []
+    for i in range(200):
+        when = datetime(2026, 5, 1, 8) + timedelta(days=rng.randrange(20), hours=rng.randrange(14))
+        kept.append(add(db, rng.randint(1, 9999) / 100, rng.choice(["Food", "Fun", "Bills", None]), when))
+        if i % 3 == 0:
+            delete(db, kept.pop(rng.randrange(len(kept))))
+
+    assert SpendingRollup.check_drift(db) == []
+    total, count = SpendingRollup.totals(db)
+    assert count == len(kept)
+    assert total == pytest.approx(sum(tx.amount for tx in kept))
+    # Missing categories are grouped under one rollup key
+    assert db.query(DailySpending).filter(DailySpending.category.is_(None)).count() == 0
+
+
+def test_deleting_the_last_transaction_of_a_day_drops_its_row(db):
+    first = add(db, 12.5)
+    second = add(db, 7.5)
+    delete(db, first)
+    assert [(r.total, r.tx_count) for r in db.query(DailySpending).all()] == [(7.5, 1)]
+
+    delete(db, second)
+    assert db.query(DailySpending).count() == 0
+    assert SpendingRollup.check_drift(db) == []
+
+
+def test_drift_is_reported_and_rebuild_fixes_it(db):
+    add(db, 10.0)
+    # A write that bypassed the rollup
+    db.add(Transaction(merchant="Import", amount=4.0, category="Fun", date=datetime(2026, 5, 2, 18)))
+    db.commit()
+
+    [drift] = SpendingRollup.check_drift(db)
+    assert (drift["day"], drift["category"], drift["raw_count"], drift["rollup_count"]) == ("2026-05-02", "Fun", 1, 0)
+
+    assert SpendingRollup.rebuild(db) == 2
+    assert SpendingRollup.check_drift(db) == []
+    assert SpendingRollup.totals(db) == (14.0, 2)
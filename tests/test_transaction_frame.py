@@ -0,0 +1,65 @@
+import random
+from datetime import datetime, timedelta
+
+from services.budget_analyzer import BudgetAnalyzer
+from services.serenity_engine import SerenityEngine
+from services.spending_analytics import SpendingAnalytics
+from services.transaction_frame import TransactionFrame
+
+NOW = datetime(2026, 3, 18, 15, 30)
+
+
+def records(n=400, seed=5):
+    rng = random.Random(seed)
+    return [
+        {
+            "amount": round(rng.uniform(1, 300), 2),
+            "category": rng.choice(["Food", "Transport", "Fun", None]),
+            "date": NOW - timedelta(days=rng.randint(0, 400), minutes=rng.randint(0, 1440)),
+        }
+        for _ in range(n)
+    ]
+
+
+def legacy_buckets(tx_list, bucket):
+    """The per-record loop summarize_records used to run"""
+    totals = {}
+    for t in tx_list:
+        dt = t.get("date") or NOW
+        if bucket == "weekday":
+            key = dt.weekday()
+        elif bucket == "week_of_month":
+            key = min((dt.day - 1) // 7, 3)
+        elif bucket == "month":
+            key = (dt.year, dt.month)
+        else:
+            key = (dt.year, dt.month, dt.day)
+        totals[key] = totals.get(key, 0.0) + t["amount"]
+    return totals
+
+
+def test_frame_matches_record_loops():
+    data = records()
+    frame = TransactionFrame.from_records(data)
+
+    assert len(frame) == len(data)
+    assert frame.total() == sum(t["amount"] for t in data)
+    legacy_categories = {}
+    for t in data:
+        legacy_categories[t["category"]] = legacy_categories.get(t["category"], 0) + t["amount"]
+    assert frame.category_totals() == legacy_categories
+    for bucket in ("weekday", "week_of_month", "month", "day"):
+        assert frame.bucket_totals(bucket, NOW) == legacy_buckets(data, bucket)
+
+
+def test_services_accept_frames_and_records_alike():
+    data = [dict(t, date=None) for t in records(50)]
+    frame = TransactionFrame.from_records(data)
+    assert SerenityEngine.analyze_finances(frame, 1500) == SerenityEngine.analyze_finances(data, 1500)
+    assert BudgetAnalyzer.get_category_insights(frame, 500) == BudgetAnalyzer.get_category_insights(data, 500)
+
+    window = SpendingAnalytics.resolve_period("week", now=NOW)
+    summary = SpendingAnalytics.summarize_records(frame, window)
+    # Undated records all land on "now" (a Wednesday)
+    assert summary["values"][2] == round(frame.total(), 2)
+    assert SerenityEngine.analyze_finances(TransactionFrame.from_records([]))["status"] == "Perfect"
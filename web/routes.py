@@ -1,45 +1,106 @@
-import csv
 import sys
 import os
 import json
+import asyncio
 import traceback
-from io import StringIO, BytesIO
+import zipfile
+import uuid
+import inspect
+import logging
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
+from typing import List, Optional
 
-from fastapi import APIRouter, File, UploadFile, Request, Body, Depends, HTTPException, Form
-from fastapi.responses import StreamingResponse, HTMLResponse, RedirectResponse
+from fastapi import APIRouter, File, UploadFile, Request, Response, Body, Depends, HTTPException, Form
+from fastapi.responses import StreamingResponse, HTMLResponse, RedirectResponse, FileResponse, JSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from google import genai
 from dotenv import load_dotenv
-from fpdf import FPDF
-from passlib.context import CryptContext
 
 # --- INITIALIZATION ---
 load_dotenv()
 router = APIRouter()
 templates = Jinja2Templates(directory="web/templates")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
 
 # Fix imports for project root
 root_path = Path(__file__).parent.parent
 if str(root_path) not in sys.path:
     sys.path.insert(0, str(root_path))
 
-from database import SessionLocal, get_db
+from database import (
+    AsyncSessionLocal, get_async_db, get_read_db, get_read_sessionmaker,
+    engine, async_engine, read_engine, read_async_engine, replica,
+)
 from models.models import BankCard, Transaction, Goal, User
-from services.ocr_engine import OCREngine
+from services.ocr_service import OCRService, BatchTooLargeError
+from services.job_queue import QueueFullError
+from core.config import settings
+from core.security import hash_password, verify_password, require_admin, sign_session, verify_session
+from core.db_pool import pool_status
+from core.metrics import metrics
+from core.profiling import profile_store, profiler_available
 from services.serenity_engine import SerenityEngine
-from api.open_ai_client import AICoach
+from services.spending_analytics import SpendingAnalytics
+from services.spending_rollup import SpendingRollup
+from services.report_export import ReportExporter
+from services.pdf_report import PDFReportService, pdf_jobs
+from services.data_version import TransactionVersion
+from services.llm_cache import LLMCache
+from services.llm_guard import LLMGuard, LLMBusyError
+from services.coach_context import CoachContext
+from services.conversation_store import ConversationStore
+from services.anomaly_detector import AnomalyDetector
+from services.score_cache import ScoreCache
+from services.transaction_feed import TransactionFeed, InvalidCursorError
+from api.open_ai_client import AICoach, FALLBACK_MESSAGE
 
 coach = AICoach()
-api_key = os.getenv("GEMINI_API_KEY")
-ai_client = genai.Client(api_key=api_key) if api_key else None
+coach_context = CoachContext(token_budget=settings.COACH_CONTEXT_TOKENS)
+# Coach conversations per browser session (cookie), bounded in memory, persisted in chat_messages
+conversations = ConversationStore(
+    max_turns=settings.CHAT_MAX_TURNS,
+    max_bytes=settings.CHAT_MAX_BYTES,
+    summary_chars=settings.CHAT_SUMMARY_CHARS,
+    max_sessions=settings.CHAT_MAX_SESSIONS,
+)
+SESSION_COOKIE = "smartsave_session"
+# Serenity score kept in memory, delta-updated by the transaction writes
+score_cache = ScoreCache(ttl=settings.SCORE_CACHE_TTL)
+# Gemini explanations of the anomalies flagged by AnomalyDetector, keyed by what was flagged
+anomaly_answers = LLMCache(max_entries=settings.LLM_CACHE_ENTRIES, ttl=settings.ANOMALY_CACHE_TTL)
+# Single-flight + per-caller admission control for every Groq/Gemini call
+llm_guard = LLMGuard(
+    max_in_flight_per_user=settings.LLM_MAX_IN_FLIGHT_PER_USER,
+    retry_after=settings.LLM_RETRY_AFTER,
+    flight_timeout=settings.LLM_TIMEOUT * (settings.LLM_MAX_RETRIES + 1) + 30,
+)
+_gemini_client = None
+_mock_frame = None
 CONFIG_FILE = "user_settings.json"
+# /export-pdf waits this long for a fresh render before answering 202 with the job URLs
+PDF_INLINE_WAIT_SECONDS = 15
 
 # --- UTILS ---
+def gemini_client():
+    """Gemini client, created on first use (google.genai alone takes ~1s to import); None without GEMINI_API_KEY"""
+    global _gemini_client
+    api_key = os.getenv("GEMINI_API_KEY")
+    if _gemini_client is None and api_key:
+        from google import genai
+        _gemini_client = genai.Client(api_key=api_key)
+    return _gemini_client
+
+def mock_frame():
+    """Demo data as a columnar frame (see TransactionFrame), built on first use: numpy stays off the startup path"""
+    global _mock_frame
+    if _mock_frame is None:
+        from services.transaction_frame import TransactionFrame
+        _mock_frame = TransactionFrame.from_records(MOCK_TRANSACTIONS)
+    return _mock_frame
+
 def save_budget_to_disk(amount):
     with open(CONFIG_FILE, "w") as f:
         json.dump({"monthly_budget": float(amount)}, f)
@@ -53,8 +114,29 @@ def load_budget_from_disk():
         except: return 1500.0
     return 1500.0
 
+async def serenity_score(db):
+    """Serenity analysis for the current budget: O(1) from score_cache, the rollup on a miss"""
+    budget = USER_CONFIG["monthly_budget"]
+    analysis = score_cache.peek(budget)
+    if analysis is None:
+        # Write deltas are applied to what gets cached here: load it from the primary, never a lagging replica
+        if db.bind is async_engine:
+            analysis = await db.run_sync(score_cache.load, budget)
+        else:
+            async with AsyncSessionLocal() as primary:
+                analysis = await primary.run_sync(score_cache.load, budget)
+    return analysis
+
+def parse_date_param(value):
+    """Parses an optional YYYY-MM-DD query param (empty form fields count as missing)"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+
 USER_CONFIG = {"monthly_budget": load_budget_from_disk()}
-chat_history = []
 MOCK_TRANSACTIONS = [
     {"id": 1, "merchant": "Netflix", "amount": 15.99, "category": "Subs", "is_essential": False},
     {"id": 2, "merchant": "Carrefour", "amount": 82.50, "category": "Food", "is_essential": True},
@@ -83,11 +165,12 @@ async def register_user(
     username: str = Form(...), 
     email: str = Form(...), 
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        hashed_pwd = pwd_context.hash(password)
-        existing_user = db.query(User).filter(User.email == email).first()
+        # bcrypt is CPU-bound: hash off the event loop
+        hashed_pwd = await asyncio.to_thread(hash_password, password)
+        existing_user = await db.scalar(select(User).where(User.email == email))
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -96,10 +179,10 @@ async def register_user(
             hashed_password=hashed_pwd, monthly_budget=1500.0
         )
         db.add(new_user)
-        db.commit()
+        await db.commit()
         return RedirectResponse(url="/home", status_code=303)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/login", response_class=HTMLResponse)
@@ -107,22 +190,27 @@ async def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @router.post("/login")
-async def login_user(email: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == email).first()
-    if user and pwd_context.verify(password, user.hashed_password):
+async def login_user(email: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.email == email))
+    if user and await asyncio.to_thread(verify_password, password, user.hashed_password):
         return RedirectResponse(url="/home", status_code=303)
     raise HTTPException(status_code=401, detail="Invalid email or password")
 
 # --- 2. THE APP CONTENT (HOME) ---
 
 @router.get("/home", response_class=HTMLResponse)
-async def read_home(request: Request, db: Session = Depends(get_db)):
-    current_user = db.query(User).order_by(User.id.desc()).first()
+async def read_home(request: Request, db: AsyncSession = Depends(get_read_db)):
+    current_user = await db.scalar(select(User).order_by(User.id.desc()))
     user_display_name = current_user.username if current_user else "Guest"
-    db_tx = db.query(Transaction).order_by(Transaction.id.desc()).all()
-    tx_to_analyze = db_tx if db_tx else MOCK_TRANSACTIONS
-    cards = db.query(BankCard).all()
-    analysis = SerenityEngine.analyze_finances(tx_to_analyze, budget=USER_CONFIG["monthly_budget"])
+    # Première page seulement : la suite est chargée à la demande via /transactions
+    feed = await db.run_sync(TransactionFeed.page, settings.TX_PAGE_SIZE)
+    db_tx = feed["items"]
+    cards = (await db.scalars(select(BankCard))).all()
+    # Score from the cache (daily/category rollup on a miss) instead of re-summing the raw table
+    if db_tx:
+        analysis = await serenity_score(db)
+    else:
+        analysis = SerenityEngine.analyze_finances(mock_frame(), budget=USER_CONFIG["monthly_budget"])
     
     remaining = USER_CONFIG["monthly_budget"] - analysis['total_spent']
     return templates.TemplateResponse("index.html", {
@@ -133,9 +221,29 @@ async def read_home(request: Request, db: Session = Depends(get_db)):
         "status": analysis["status"],
         "remaining": round(remaining, 2), 
         "budget": USER_CONFIG["monthly_budget"],
-        "transactions": db_tx, "dynamic_alert": "ready to save" if not db_tx else None
+        "transactions": db_tx, "next_cursor": feed["next_cursor"],
+        "dynamic_alert": "ready to save" if not db_tx else None
     })
 
+# Transaction list, newest first, by pages: ?cursor= from the previous page's next_cursor
+@router.get("/transactions")
+async def list_transactions(
+    limit: int = TransactionFeed.DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    q: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    try:
+        page = await db.run_sync(
+            TransactionFeed.page, limit, cursor, category, q, parse_date_param(start), parse_date_param(end)
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", **page}
+
 # route for updating budget
 
 @router.post("/update-budget")
@@ -148,21 +256,37 @@ async def update_budget(payload: dict = Body(...)):
             USER_CONFIG["monthly_budget"] = val
             # SAUVEGARDE PHYSIQUE ICI
             save_budget_to_disk(val) 
+            score_cache.budget_changed()
             return {"status": "success", "budget": val}
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid number")
     raise HTTPException(status_code=400, detail="Missing budget data")
 
 # --- UPLOAD RECEIPT AND OCR PROCESSING ---
+def _ocr_queue_full(e):
+    # Backpressure: the client should retry later instead of piling more scans on the pool
+    return JSONResponse(
+        {"status": "error", "message": str(e)},
+        status_code=503,
+        headers={"Retry-After": str(settings.OCR_RETRY_AFTER)}
+    )
+
 @router.post("/scan-receipt")
 async def scan_receipt(file: UploadFile = File(...)):
     try:
         # 1. Read the image file sent from the browser
         contents = await file.read()
         
-        # 2. Call our OCR engine to extract data
-        # We pass the bytes directly to the engine
-        extracted_data = OCREngine.extract_data(contents)
+        # 2. Queue the scan on the OCR process pool and wait for it without blocking the event loop
+        job_id = await OCRService.submit(contents)
+        try:
+            extracted_data = await OCRService.wait(job_id)
+        except asyncio.TimeoutError:
+            return JSONResponse({
+                "status": "pending",
+                "job_id": job_id,
+                "status_url": f"/scan-receipt/jobs/{job_id}"
+            }, status_code=202)
         
         # 3. Return the result to the UI
         return {
@@ -170,89 +294,144 @@ async def scan_receipt(file: UploadFile = File(...)):
             "data": extracted_data
         }
         
+    except QueueFullError as e:
+        return _ocr_queue_full(e)
     except Exception as e:
         # If something goes wrong (blurry image, etc.), return an error
         return {
             "status": "error",
             "message": str(e)
         }
+
+@router.post("/scan-receipt/jobs")
+async def create_scan_job(file: UploadFile = File(...)):
+    """Queues a scan and returns its job id right away, poll the status URL for the result"""
+    contents = await file.read()
+    try:
+        job_id = await OCRService.submit(contents)
+    except QueueFullError as e:
+        return _ocr_queue_full(e)
+    return JSONResponse({
+        "status": "queued",
+        "job_id": job_id,
+        "status_url": f"/scan-receipt/jobs/{job_id}"
+    }, status_code=202)
+
+@router.get("/scan-receipt/jobs/{job_id}")
+async def scan_job_status(job_id: str):
+    info = OCRService.status(job_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return info
+
+# --- BATCH RECEIPT SCANNING ---
+@router.post("/scan-receipts")
+async def scan_receipts(files: List[UploadFile] = File(...), format: str = "ndjson"):
+    """
+    Scans many receipts (images and/or ZIP archives) in parallel on the OCR pool.
+    Results are streamed as they finish: NDJSON by default, server-sent events with ?format=sse.
+    """
+    uploads = [(f.filename, await f.read()) for f in files]
+    try:
+        images = await asyncio.to_thread(OCRService.expand_uploads, uploads)
+    except BatchTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Invalid archive: {e}")
+    if not images:
+        raise HTTPException(status_code=400, detail="No images found in the upload")
+
+    use_sse = format == "sse"
+
+    def _encode(event, payload):
+        if use_sse:
+            return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps(payload) + "\n"
+
+    async def _stream():
+        errors = 0
+        async for item in OCRService.scan_many(images):
+            errors += item["status"] != "success"
+            yield _encode("receipt", item)
+        yield _encode("done", {"status": "complete", "count": len(images), "errors": errors})
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # --- EXPORT CSV ---
 @router.get("/export-csv")
-async def export_csv(db: Session = Depends(get_db)):
-    transactions = db.query(Transaction).all()
-    
-    # Create a string buffer to write CSV data
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow(['Date', 'Merchant', 'Category', 'Amount', 'Essential'])
-    
-    # Data rows
-    for tx in transactions:
-        writer.writerow([tx.date.strftime('%Y-%m-%d'), tx.merchant, tx.category, tx.amount, tx.is_essential])
-    
-    output.seek(0)
+async def export_csv(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    category: Optional[str] = None,
+    compress: Optional[str] = None,
+    session_factory=Depends(get_read_sessionmaker)
+):
+    """Streams the report from a server-side cursor: ?start=&end=&category= filters, ?compress=gzip for .csv.gz"""
+    start_date, end_date = parse_date_param(start), parse_date_param(end)
+    gzipped = compress == "gzip"
+
     return StreamingResponse(
-        output, 
-        media_type="text/csv", 
-        headers={"Content-Disposition": "attachment; filename=smartsave_report.csv"}
+        ReportExporter.stream_csv(session_factory, start_date, end_date, category, compress=gzipped),
+        media_type="application/gzip" if gzipped else "text/csv",
+        headers={"Content-Disposition": f"attachment; filename=smartsave_report.csv{'.gz' if gzipped else ''}"}
     )
 
-# --- EXPORT PDF CORRIGÉ ---
-@router.get("/export-pdf")
-async def export_pdf(db: Session = Depends(get_db)):
-    transactions = db.query(Transaction).all()
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # Title
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt="SmartSave - Financial Report", ln=True, align='C')
-    pdf.ln(10)
-    
-    # Table Header
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(40, 10, "Date", 1)
-    pdf.cell(60, 10, "Merchant", 1)
-    pdf.cell(40, 10, "Category", 1)
-    pdf.cell(40, 10, "Amount", 1)
-    pdf.ln()
-    
-    # Table Body
-    pdf.set_font("Arial", '', 10) # Taille légèrement réduite pour le contenu
-    total = 0
-    for tx in transactions:
-        # LA CORRECTION : Nettoyage des chaînes pour supprimer les emojis/caractères non-latin1
-        merchant_clean = tx.merchant.encode('latin-1', 'ignore').decode('latin-1')
-        category_clean = tx.category.encode('latin-1', 'ignore').decode('latin-1')
-        date_str = tx.date.strftime('%Y-%m-%d')
-        
-        pdf.cell(40, 10, date_str, 1)
-        pdf.cell(60, 10, merchant_clean, 1)
-        pdf.cell(40, 10, category_clean, 1)
-        pdf.cell(40, 10, f"{tx.amount} EUR", 1)
-        pdf.ln()
-        total += tx.amount
-        
-    pdf.ln(10)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(200, 10, txt=f"TOTAL SPENT: {total} EUR", ln=True)
-    
-    # On récupère le contenu brut et on utilise BytesIO directement
-    pdf_output = pdf.output(dest='S')
-    
-    # Si tu utilises fpdf2, pdf.output() renvoie déjà des bytes, 
-    # si c'est l'ancien fpdf, il faut l'encoder prudemment
-    if isinstance(pdf_output, str):
-        pdf_output = pdf_output.encode('latin-1')
-        
-    return StreamingResponse(
-        BytesIO(pdf_output), 
-        media_type="application/pdf", 
-        headers={"Content-Disposition": "attachment; filename=smartsave_report.pdf"}
+# --- EXPORT PDF (background job + disk cache) ---
+def _pdf_job_payload(info):
+    job_id = info["job_id"]
+    return {
+        **info,
+        "status_url": f"/export-pdf/jobs/{job_id}",
+        "download_url": f"/export-pdf/jobs/{job_id}/download",
+    }
+
+def _pdf_file_response(job_id):
+    return FileResponse(
+        PDFReportService.report_path(job_id),
+        media_type="application/pdf",
+        filename="smartsave_report.pdf"
     )
 
+@router.get("/export-pdf")
+async def export_pdf(db: AsyncSession = Depends(get_read_db)):
+    """Serves the cached report, or renders it in the worker pool without blocking the event loop"""
+    info = await db.run_sync(PDFReportService.request_report)
+    if info["status"] != "done":
+        future = pdf_jobs.future(info["job_id"])
+        try:
+            # shield: a timeout must not cancel the render, the next click will pick it up
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=PDF_INLINE_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            return JSONResponse(_pdf_job_payload(info), status_code=202)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"PDF generation failed: {e}")
+    return _pdf_file_response(info["job_id"])
+
+@router.post("/export-pdf/jobs")
+async def create_pdf_job(db: AsyncSession = Depends(get_async_db)):
+    info = await db.run_sync(PDFReportService.request_report)
+    return JSONResponse(_pdf_job_payload(info), status_code=200 if info["status"] == "done" else 202)
+
+@router.get("/export-pdf/jobs/{job_id}")
+async def pdf_job_status(job_id: str):
+    info = PDFReportService.status(job_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return _pdf_job_payload(info)
+
+@router.get("/export-pdf/jobs/{job_id}/download")
+async def download_pdf_report(job_id: str):
+    info = PDFReportService.status(job_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    if info["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Report is not ready (status: {info['status']})")
+    return _pdf_file_response(job_id)
+
 #router for settings page
 @router.get("/settings", response_class=HTMLResponse)
 async def read_settings(request: Request):
@@ -266,7 +445,7 @@ async def read_settings(request: Request):
 #route for bank cards page
 
 @router.post("/add-card")
-async def add_card(card_data: CardSchema, db: Session = Depends(get_db)):
+async def add_card(card_data: CardSchema, db: AsyncSession = Depends(get_async_db)):
     try:
         # On crée l'objet à partir de ta classe BankCard dans models.py
         new_card = BankCard(
@@ -279,124 +458,227 @@ async def add_card(card_data: CardSchema, db: Session = Depends(get_db)):
         )
         
         db.add(new_card)
-        db.commit()
-        db.refresh(new_card)
+        await db.commit()
+        await db.refresh(new_card)
         
         return {"status": "success", "message": "Card added!", "card_id": new_card.id}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return {"status": "error", "message": str(e)}
 
 
 #router for reset data
 @router.post("/reset-data")
-async def reset_data(db: Session = Depends(get_db)):
+async def reset_data(db: AsyncSession = Depends(get_async_db)):
     try:
         # Supprime toutes les transactions et tous les objectifs
-        db.query(Transaction).delete()
-        db.query(Goal).delete()
-        db.commit()
+        await db.execute(delete(Transaction))
+        await db.execute(delete(Goal))
+        await db.run_sync(SpendingRollup.clear)
+        await db.run_sync(TransactionVersion.bump)
+        await db.commit()
+        coach.cache.invalidate()
+        score_cache.invalidate()
+        anomaly_answers.invalidate()
         return {"status": "success", "message": "All data cleared"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 from services.budget_analyzer import BudgetAnalyzer
 
-# route for chat with financial coach
+# --- COACH STREAMING (server-sent events) ---
+def _sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def stream_advice(tokens, result_key, on_complete=None):
+    """
+    SSE response forwarding the coach tokens as they arrive: `token` events ({"text"}), then
+    one `done` event carrying the full text under `result_key` (same key as the JSON mode).
+    on_complete(full_text) (plain or async) runs once the whole answer went through. If the
+    answer breaks off, an `error` event ({"message"}) ends the stream instead and on_complete
+    is not called: a partial answer is never kept.
+    """
+    async def _stream():
+        parts = []
+        try:
+            async for token in tokens:
+                parts.append(token)
+                yield _sse_event("token", {"text": token})
+        except Exception as e:
+            logger.warning("Coach stream interrupted after %d tokens: %s", len(parts), e)
+            yield _sse_event("error", {"message": FALLBACK_MESSAGE})
+            return
+        full_text = "".join(parts)
+        if on_complete is not None:
+            result = on_complete(full_text)
+            if inspect.isawaitable(result):
+                await result
+        yield _sse_event("done", {result_key: full_text})
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _single_token(text):
+    yield text
+
+async def coach_digest(db):
+    """(transaction-set version, compact digest) for the coach prompts, the digest is reused until the data changes"""
+    budget = USER_CONFIG["monthly_budget"]
+    with metrics.stage("coach_context"):
+        version = await db.run_sync(TransactionVersion.current)
+        return version, await db.run_sync(coach_context.get, budget, version)
+
+def _cookie_session(request: Request):
+    """Session id from the cookie, None if missing or not signed by us (see sign_session)"""
+    return verify_session(request.cookies.get(SESSION_COOKIE))
+
+def _session_id(request: Request):
+    """Chat session from the cookie, or a new one (an unsigned or forged cookie counts as none)"""
+    session_id = _cookie_session(request)
+    return (session_id, False) if session_id else (uuid.uuid4().hex, True)
+
+def _caller_id(request: Request):
+    """
+    Key of the per-user LLM limits: the session cookie, which only the server issues (signed), so
+    a client can't dodge its limit with made-up cookies. The client IP only without one, behind a
+    reverse proxy every user shares it
+    """
+    session_id = _cookie_session(request)
+    if session_id:
+        return f"session:{session_id}"
+    return f"ip:{request.client.host}" if request.client else "anonymous"
+
+def _llm_busy(e):
+    # Admission control: this caller already has enough AI calls running
+    return JSONResponse(
+        {"status": "error", "message": str(e)},
+        status_code=429,
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+async def guarded_advice(request, key, result_key, make_call, make_stream, stream=False, on_complete=None):
+    """
+    Runs one coach call through llm_guard: identical concurrent requests (same key) share the
+    leader's answer, a caller over its in-flight limit gets a 429.
+    """
+    caller = _caller_id(request)
+    try:
+        if not stream:
+            return {result_key: await llm_guard.run(key, caller, make_call)}
+
+        shared = await llm_guard.join(key)
+        if shared is not None:
+            return stream_advice(_single_token(shared), result_key, on_complete=on_complete)
+        flight = llm_guard.lead(key, caller)
+        return stream_advice(llm_guard.lead_stream(flight, make_stream()), result_key, on_complete=on_complete)
+    except LLMBusyError as e:
+        return _llm_busy(e)
+
+# route for chat with financial coach (?stream=true for server-sent events)
 @router.post("/chat")
-async def chat_with_coach(payload: dict = Body(...), db: Session = Depends(get_db)):
+async def chat_with_coach(request: Request, response: Response, payload: dict = Body(...), stream: bool = False, db: AsyncSession = Depends(get_async_db)):
     user_msg = payload.get("message")
-    current_user = db.query(User).order_by(User.id.desc()).first()
+    if not isinstance(user_msg, str):
+        raise HTTPException(status_code=400, detail="Missing message")
+    session_id, new_session = _session_id(request)
+    current_user = await db.scalar(select(User).order_by(User.id.desc()))
     user_display_name = current_user.username if current_user else "Guest"
-    # 1. Récupérer les vraies transactions en base pour le contexte
-    db_tx = db.query(Transaction).all()
-    tx_summary = ""
-    if db_tx:
-        tx_summary = ", ".join([f"{t.merchant}: {t.amount}€ ({t.category})" for t in db_tx[-10:]])
-    else:
-        tx_summary = "No transactions yet."
+    # 1. Contexte compact (score, catégories, tendances...) précalculé une fois et réutilisé entre les tours
+    _, digest = await coach_digest(db)
 
-    # 2. Analyse financière pour le score
-    analysis = SerenityEngine.analyze_finances(db_tx if db_tx else MOCK_TRANSACTIONS)
-    
-    # 3. LE PROMPT DU COACH (L'âme de ton IA)
-    # On définit ici son rôle, ton score actuel et tes dépenses récentes
+    # 2. LE PROMPT DU COACH (L'âme de ton IA) : seulement le rôle, les règles et les données sont ajoutées par AICoach
     system_instructions = {
-        "role": "system", 
-        "content": f"""
-        You are a high-level personal financial coach. 
-        User Context:
-        - Name: {user_display_name}
-        - Current Serenity Score: {analysis['score']}/100
-        - Monthly Budget Limit: {USER_CONFIG['monthly_budget']}€
-        - Recent Transactions: {tx_summary}
-
-        Instructions:
-        1. Be professional, motivating, and use emojis.
-        2. Always refer to the user's real transactions if they ask about their spending.
-        3. If the score is low, be protective and give urgent advice.
-        4. DETECTION: Identify the language used by the user (Arabic,spanich, French, or English).
-        5. LANGUAGE: ALWAYS reply in the SAME language used by Saleh. If he speaks Arabic, you MUST reply in Arabic.
-        """
+        "role": "system",
+        "content": (
+            f"Chat with {user_display_name}. Be professional and motivating, use emojis. "
+            "Refer to their real transactions when they ask about their spending. "
+            "If the score is low, be protective and give urgent advice."
+        )
     }
 
-    # 4. Historique de la conversation (on garde les 5 derniers messages + les instructions)
-    chat_context = [system_instructions] + chat_history[-5:]
+    # 3. Historique de la session : résumé des anciens tours + derniers échanges (taille bornée)
+    chat_context = [system_instructions] + await db.run_sync(conversations.window, session_id)
     chat_context.append({"role": "user", "content": user_msg})
     
-    # 5. Appel à l'IA
-    advice = coach.get_financial_advice(chat_context, analysis["score"], tx_summary)
-    
-    # Sauvegarde dans l'historique local
-    chat_history.append({"role": "user", "content": user_msg})
-    chat_history.append({"role": "assistant", "content": advice})
-    
-    return {"response": advice}
+    # Sauvegarde de l'échange (une fois la réponse complète). Propre session DB : en streaming
+    # celle de la requête est déjà fermée quand la réponse se termine
+    async def _save_history(advice):
+        async with AsyncSessionLocal() as history_db:
+            await history_db.run_sync(conversations.append, session_id, user_msg, advice)
+            await history_db.commit()
+
+    # 4. Appel à l'IA (chaque message est unique : pas de partage, seulement la limite par utilisateur)
+    result = await guarded_advice(
+        request, f"chat:{uuid.uuid4().hex}", "response",
+        lambda: coach.get_financial_advice_async(chat_context, None, digest),
+        lambda: coach.stream_financial_advice(chat_context, None, digest),
+        stream=stream, on_complete=_save_history
+    )
+    if isinstance(result, dict):
+        await _save_history(result["response"])
+    if new_session:
+        target = response if isinstance(result, dict) else result
+        target.set_cookie(SESSION_COOKIE, sign_session(session_id), max_age=30 * 24 * 3600, httponly=True, samesite="lax")
+    return result
 
 # delete transaction by id
 @router.delete("/delete-transaction/{tx_id}")
-async def delete_transaction(tx_id: int, db: Session = Depends(get_db)):
+async def delete_transaction(tx_id: int, db: AsyncSession = Depends(get_async_db)):
     # CORRECTION : Utilisation de Transaction au lieu de models.Transaction
-    tx = db.query(Transaction).filter(Transaction.id == tx_id).first()
+    tx = await db.scalar(select(Transaction).where(Transaction.id == tx_id))
     if not tx:
         raise HTTPException(status_code=404, detail="Transaction not found")
     try:
-        db.delete(tx)
-        db.commit()
+        await db.run_sync(SpendingRollup.remove, tx)
+        await db.run_sync(TransactionVersion.bump)
+        await db.delete(tx)
+        await db.commit()
+        coach.cache.invalidate()
+        score_cache.record(-float(tx.amount or 0), -1)
         return {"status": "success", "message": "Transaction deleted"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 # Generate monthly report
 @router.get("/generate-report")
-async def generate_report(db: Session = Depends(get_db)):
-    db_tx = db.query(Transaction).all()
-    if not db_tx:
-        return {"report": "No transactions found. Add some expenses to get an AI analysis! 💸"}
-    
-    # Résumé structuré pour l'IA
-    summary = "\n".join([f"- {t.merchant}: {t.amount}€ ({t.category})" for t in db_tx[-20:]])
+async def generate_report(request: Request, stream: bool = False, db: AsyncSession = Depends(get_read_db)):
+    if await db.scalar(select(Transaction.id).limit(1)) is None:
+        empty_report = "No transactions found. Add some expenses to get an AI analysis! 💸"
+        return stream_advice(_single_token(empty_report), "report") if stream else {"report": empty_report}
     
+    # Résumé structuré pour l'IA (digest compact, voir CoachContext)
+    version, digest = await coach_digest(db)
+
     prompt = [
         {"role": "system", "content": "You are a professional financial advisor. Analyze the user's spending and provide a structured, motivating report in English with emojis."},
-        {"role": "user", "content": f"Transactions:\n{summary}\nBudget Limit: {USER_CONFIG['monthly_budget']}€\n\nPlease provide a monthly summary and 3 tips."}
+        {"role": "user", "content": "Please provide a monthly summary and 3 tips."}
     ]
     
-    report = coach.get_financial_advice(prompt, 100, "Monthly Review")
-    return {"report": report}
+    # Same transactions + same budget = same report: served from the coach cache
+    cache_key = LLMCache.make_key("report", transactions=version, budget=USER_CONFIG["monthly_budget"])
+    cached = coach.cache.get(cache_key)
+    if cached is not None:
+        return stream_advice(_single_token(cached), "report") if stream else {"report": cached}
+    return await guarded_advice(
+        request, cache_key, "report",
+        lambda: coach.get_financial_advice_async(prompt, None, digest, cache_key=cache_key),
+        lambda: coach.stream_financial_advice(prompt, None, digest, cache_key=cache_key),
+        stream=stream
+    )
 
 # Calculate savings plan
 @router.post("/calculate-plan")
-async def calculate_plan(payload: dict = Body(...), db: Session = Depends(get_db)):
+async def calculate_plan(request: Request, payload: dict = Body(...), stream: bool = False, db: AsyncSession = Depends(get_async_db)):
     goal_name = payload.get("name")
     target_amount = float(payload.get("target"))
     
-    # On récupère les data pour l'IA
-    db_tx = db.query(Transaction).all()
-    tx_list = db_tx if db_tx else MOCK_TRANSACTIONS
-    analysis = SerenityEngine.analyze_finances(tx_list)
+    # On récupère les data pour l'IA (digest compact : dépenses du mois, catégories, tendances)
+    version, digest = await coach_digest(db)
     
     prompt = [
       {
@@ -407,7 +689,6 @@ async def calculate_plan(payload: dict = Body(...), db: Session = Depends(get_db
             "role": "user", 
             "content": f"""
                 The user wants to save {target_amount}€ for the project: '{goal_name}'.
-                Current monthly spending: {analysis['total_spent']}€.
                 
                 Please provide a comprehensive action plan including:
                 1. A quick analysis of their current financial situation.
@@ -420,11 +701,69 @@ async def calculate_plan(payload: dict = Body(...), db: Session = Depends(get_db
         }
     ]
     
-    plan_advice = coach.get_financial_advice(prompt, analysis["score"], "Général")
-    return {"plan": plan_advice} # C'est ce 'plan' que le JS attend
+    cache_key = LLMCache.make_key(
+        "plan",
+        transactions=version,
+        budget=USER_CONFIG["monthly_budget"], goal=goal_name, target=target_amount
+    )
+    cached = coach.cache.get(cache_key)
+    if cached is not None:
+        return stream_advice(_single_token(cached), "plan") if stream else {"plan": cached}
+    # C'est ce 'plan' que le JS attend
+    return await guarded_advice(
+        request, cache_key, "plan",
+        lambda: coach.get_financial_advice_async(prompt, None, digest, cache_key=cache_key),
+        lambda: coach.stream_financial_advice(prompt, None, digest, cache_key=cache_key),
+        stream=stream
+    )
+
+@router.get("/coach/cache-stats")
+async def coach_cache_stats():
+    """Hit rate of the coach answer cache (reports and savings plans), request coalescing and score cache counters"""
+    return {**coach.cache.stats(), "flights": llm_guard.stats(), "score": score_cache.stats()}
+
+# Prometheus scrape endpoint: request counts/latency per route, stage timers, DB statement timings
+@router.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Request profiles (X-Profile: 1 or ?profile=1 with the admin token, or sampled slow requests)
+@router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    profiles = await asyncio.to_thread(profile_store.list)
+    for profile in profiles:
+        profile["urls"] = [f"/admin/profiles/{filename}" for filename in profile["files"]]
+    return {"profiler_installed": profiler_available(), "profiles": profiles}
+
+@router.get("/admin/profiles/{filename}", dependencies=[Depends(require_admin)])
+async def download_profile(filename: str):
+    """HTML flame graph, or .speedscope.json to open in https://www.speedscope.app"""
+    path = profile_store.path(filename)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/html" if filename.endswith(".html") else "application/json")
+
+@router.get("/admin/db-pool", dependencies=[Depends(require_admin)])
+async def db_pool_stats():
+    """
+    Connection pools of this worker: live checkouts/overflow and checkout waits since start.
+    Worst case against the server: capacity x WEB_CONCURRENCY per engine (compare with max_connections).
+    """
+    pools = {"async": pool_status(async_engine), "sync": pool_status(engine)}
+    if replica.enabled:
+        pools.update({"read_async": pool_status(read_async_engine), "read_sync": pool_status(read_engine)})
+    per_worker = sum(p.get("capacity", 1) for p in pools.values())
+    return {
+        "pid": os.getpid(),
+        "workers": settings.WEB_CONCURRENCY,
+        "pools": pools,
+        "max_connections_per_worker": per_worker,
+        "max_connections_all_workers": per_worker * settings.WEB_CONCURRENCY,
+        "replica": replica.stats(),
+    }
 
 @router.post("/add-goal")
-async def add_goal(payload: dict = Body(...), db: Session = Depends(get_db)):
+async def add_goal(payload: dict = Body(...), db: AsyncSession = Depends(get_async_db)):
     try:
         new_goal = Goal(
             name=payload.get("name"),
@@ -433,50 +772,50 @@ async def add_goal(payload: dict = Body(...), db: Session = Depends(get_db)):
             color=payload.get("color", "#6366F1")
         )
         db.add(new_goal)
-        db.commit()
-        db.refresh(new_goal)
+        await db.commit()
+        await db.refresh(new_goal)
         return {"status": "success", "goal": {"name": new_goal.name, "target": new_goal.target}}
     except Exception:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Goal already exists or invalid data")
 
 @router.delete("/delete-goal/{goal_id}")
-async def delete_goal(goal_id: int, db: Session = Depends(get_db)):
+async def delete_goal(goal_id: int, db: AsyncSession = Depends(get_async_db)):
     # CORRECTION : Utilisation de Goal au lieu de models.Goal
-    goal = db.query(Goal).filter(Goal.id == goal_id).first()
+    goal = await db.scalar(select(Goal).where(Goal.id == goal_id))
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
-    db.delete(goal)
-    db.commit()
+    await db.delete(goal)
+    await db.commit()
     return {"status": "success"}
 
 # --- 3. ROUTES PAGES ---
 
 # ajout d'un route Add-saving-goal
 @router.post("/add-savings/{goal_id}")
-async def add_savings(goal_id: int, payload: dict = Body(...), db: Session = Depends(get_db)):
+async def add_savings(goal_id: int, payload: dict = Body(...), db: AsyncSession = Depends(get_async_db)):
     amount_to_add = float(payload.get("amount", 0))
-    goal = db.query(Goal).filter(Goal.id == goal_id).first()
+    goal = await db.scalar(select(Goal).where(Goal.id == goal_id))
     
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
     try:
         goal.current += amount_to_add
-        db.commit()
-        db.refresh(goal)
+        await db.commit()
+        await db.refresh(goal)
         return {"status": "success", "new_current": goal.current}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Error updating savings")
 
 
 
 # Route pour la page des objectifs
 @router.get("/goals", response_class=HTMLResponse)
-async def read_goals(request: Request, db: Session = Depends(get_db)):
+async def read_goals(request: Request, db: AsyncSession = Depends(get_read_db)):
     # CORRECTION : Utilisation de Goal au lieu de models.Goal
-    db_goals = db.query(Goal).all()
+    db_goals = (await db.scalars(select(Goal))).all()
     return templates.TemplateResponse("goals.html", {
         "request": request,
         "goals": db_goals 
@@ -485,84 +824,44 @@ async def read_goals(request: Request, db: Session = Depends(get_db)):
 # Route for analytics page
 
 @router.get("/analytics", response_class=HTMLResponse)
-async def read_analytics(request: Request, period: str = "week", db: Session = Depends(get_db)):
-    # Define the time limit based on period
-    days_to_count = 7 if period == "week" else 30
-    limit_date = datetime.now() - timedelta(days=days_to_count)
-    
-    # 1. retrieve transactions from DB within the period
-    db_tx = db.query(Transaction).filter(Transaction.date >= limit_date).all()
+async def read_analytics(
+    request: Request,
+    period: str = "week",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    # 1. Resolve the window: week, month, quarter, 12m (rolling) or custom (?start=&end=)
+    window = SpendingAnalytics.resolve_period(period, parse_date_param(start), parse_date_param(end))
+
+    # 2. Category totals + chart buckets computed by the database (GROUP BY)
+    summary = await db.run_sync(SpendingAnalytics.summarize, window)
     # Si la base est vide, on utilise les MOCK_TRANSACTIONS pour le visuel
-    tx_list = db_tx if db_tx else MOCK_TRANSACTIONS
-    
-    total_spent = sum(float(t.amount if hasattr(t, 'amount') else t['amount']) for t in tx_list)
-
-    # 2. calculate category totals
-    cat_totals = {}
-    for t in tx_list:
-        name = t.category if hasattr(t, 'category') else t['category']
-        amt = float(t.amount if hasattr(t, 'amount') else t['amount'])
-        cat_totals[name] = cat_totals.get(name, 0) + amt
-
-    # 3. Define icons for categories
-    icons = {
-        "Food": "fa-utensils", "Transport": "fa-car", "Housing": "fa-house",
-        "Shopping": "fa-bag-shopping", "Health": "fa-heart-pulse", 
-        "Entertainment": "fa-gamepad", "Bills": "fa-file-invoice-dollar",
-        "Fun": "fa-face-smile", "Subs": "fa-tv"
-    }
+    if summary is None:
+        summary = SpendingAnalytics.summarize_records(mock_frame(), window)
 
-    # 4. Préparation des insights (Top Categories)
-    category_insights = []
-    for name, amt in sorted(cat_totals.items(), key=lambda x: x[1], reverse=True):
-        percentage = int((amt / total_spent * 100)) if total_spent > 0 else 0
-        is_high = percentage > 30 # Alerte si > 30% des dépenses totales
-        
-        category_insights.append({
-            "name": name,
-            "amount": round(amt, 2),
-            "percentage": percentage,
-            "icon": icons.get(name, "fa-tag"),
-            "color": "#EF4444" if is_high else "#10B981", # Rouge si élevé, Vert sinon
-            "status": "High Spending" if is_high else "On track"
-        })
-
-    # 5. Logique des graphiques (Labels & Values)
-    if period == "week":
-        labels = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-        values = [0.0] * 7
-        for t in tx_list:
-            dt = t.date if hasattr(t, 'date') else datetime.now()
-            # dt.weekday() donne 0 pour Lundi, 6 pour Dimanche
-            values[dt.weekday()] += float(t.amount if hasattr(t, 'amount') else t['amount'])
-    else:
-        # Mode mois : on découpe en 4 semaines
-        labels = ["Week 1", "Week 2", "Week 3", "Week 4"]
-        values = [0.0] * 4
-        now = datetime.now()
-        for t in tx_list:
-            dt = t.date if hasattr(t, 'date') else now
-            day_of_month = dt.day
-            # Attribution à une semaine (1-7, 8-14, 15-21, 22+)
-            if day_of_month <= 7: values[0] += float(t.amount)
-            elif day_of_month <= 14: values[1] += float(t.amount)
-            elif day_of_month <= 21: values[2] += float(t.amount)
-            else: values[3] += float(t.amount)
-
-    # 6. Envoi au template
+    # 3. Envoi au template
     return templates.TemplateResponse("analytics.html", {
         "request": request,
-        "total_spent": round(total_spent, 2),
-        "labels": labels,
-        "values": values,
-        "period": period,
-        "category_insights": category_insights
+        "total_spent": summary["total_spent"],
+        "labels": summary["labels"],
+        "values": summary["values"],
+        "period": summary["period"],
+        "start": start,
+        "end": end,
+        "category_insights": summary["category_insights"]
     })
+# Monthly Serenity scores for the history chart (scored in one vectorized call)
+@router.get("/score-history")
+async def score_history(months: int = 12, db: AsyncSession = Depends(get_read_db)):
+    history = await db.run_sync(SerenityEngine.score_history, USER_CONFIG["monthly_budget"], max(1, min(months, 120)))
+    return {"status": "success", "history": history}
+
 @router.get("/coach", response_class=HTMLResponse)
-async def read_coach(request: Request, db: Session = Depends(get_db)):
-    current_user = db.query(User).order_by(User.id.desc()).first()
+async def read_coach(request: Request, db: AsyncSession = Depends(get_read_db)):
+    current_user = await db.scalar(select(User).order_by(User.id.desc()))
     user_display_name = current_user.username if current_user else "Guest"
-    analysis = SerenityEngine.analyze_finances(MOCK_TRANSACTIONS)
+    analysis = SerenityEngine.analyze_finances(mock_frame())
     return templates.TemplateResponse("coach.html", {
         "request": request, 
         "analysis": analysis,
@@ -570,24 +869,24 @@ async def read_coach(request: Request, db: Session = Depends(get_db)):
     })
 # route  delete card by id
 @router.delete("/delete-card/{card_id}")
-async def delete_card(card_id: int, db: Session = Depends(get_db)):
+async def delete_card(card_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        card = db.query(BankCard).filter(BankCard.id == card_id).first()
+        card = await db.scalar(select(BankCard).where(BankCard.id == card_id))
         if not card:
             raise HTTPException(status_code=404, detail="Card not found")
         
-        db.delete(card)
-        db.commit()
+        await db.delete(card)
+        await db.commit()
         return {"status": "success", "message": "Card deleted"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     
 
 
 #route for adding a transaction with card logic
 @router.post("/add-transaction")
-async def add_transaction(payload: dict = Body(...), db: Session = Depends(get_db)):
+async def add_transaction(payload: dict = Body(...), db: AsyncSession = Depends(get_async_db)):
     try:
         # 1. On crée la transaction normalement
         new_tx = Transaction(
@@ -597,12 +896,15 @@ async def add_transaction(payload: dict = Body(...), db: Session = Depends(get_d
             is_essential=payload.get("is_essential", False),
         )
         db.add(new_tx)
+        await db.flush()
+        await db.run_sync(SpendingRollup.record, new_tx)
+        await db.run_sync(TransactionVersion.bump)
 
         # 2. LOGIQUE DE LA CARTE : On vérifie si un card_id est envoyé
         card_id = payload.get("card_id")
         if card_id:
             # On cherche la carte dans la base
-            card = db.query(BankCard).filter(BankCard.id == int(card_id)).first()
+            card = await db.scalar(select(BankCard).where(BankCard.id == int(card_id)))
             if card:
                 # On soustrait le montant de la dépense du solde de la carte
                 # Note: Assure-toi d'avoir un champ 'balance' dans ton modèle BankCard
@@ -610,13 +912,15 @@ async def add_transaction(payload: dict = Body(...), db: Session = Depends(get_d
                     card.balance -= float(payload.get("amount"))
         
         # 3. On valide tout en une seule fois
-        db.commit()
-        db.refresh(new_tx)
+        await db.commit()
+        coach.cache.invalidate()
+        score_cache.record(float(new_tx.amount or 0))
+        await db.refresh(new_tx)
         
         return {"status": "success", "transaction": new_tx.merchant}
     
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=f"Error adding transaction: {str(e)}")
     
     #scan card
@@ -627,7 +931,7 @@ async def scan_card(file: UploadFile = File(...)):
         prompt = "Analyze this credit card image. Extract ONLY: Bank Name (bank_name), Last 4 digits (last_four), Holder name (holder), Expiration (expiry) as MM/YY. Return valid JSON."
 
         # Utilisation sécurisée du client AI
-        response = ai_client.models.generate_content(
+        response = gemini_client().models.generate_content(
             model="gemini-1.5-flash",
             contents=[
                 prompt,
@@ -643,29 +947,42 @@ async def scan_card(file: UploadFile = File(...)):
     
     # Route for spending analysis with Gemini AI
 @router.post("/analyze-spending")
-async def analyze_spending(db: Session = Depends(get_db)):
+async def analyze_spending(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
-    AI-powered anomaly detection to find unusual spending patterns.
+    Anomaly detection on recent spending: local statistics first (see AnomalyDetector),
+    Gemini is only asked to explain and advise when something was flagged.
     """
     try:
-        # 1. Fetch recent transactions for context
-        transactions = db.query(Transaction).order_by(Transaction.date.desc()).limit(20).all()
+        # 1. Fetch recent transactions and their history
+        transactions, history, non_essential = await db.run_sync(AnomalyDetector.load)
         
         if not transactions:
             return {"status": "info", "message": "Not enough data for analysis."}
 
-        # 2. Prepare the summary for Gemini
+        # 2. Local pre-filter: nothing unusual, no AI call
+        findings, local_analysis = AnomalyDetector.analyze(
+            transactions, history, USER_CONFIG["monthly_budget"], non_essential
+        )
+        ai_client = gemini_client()
+        if not findings or ai_client is None:
+            return {"status": "success", "analysis": local_analysis, "source": "local"}
+
+        # 3. Prepare the summary for Gemini, with what the local checks found
         summary = "\n".join([f"{t.merchant}: {t.amount}€ ({t.category})" for t in transactions])
+        flagged = "\n".join(f"- [{f['severity']}] {f['message']}" for f in findings)
         
         prompt = f"""
         Analyze these recent transactions for Saleh:
         {summary}
         
         Budget Limit: {USER_CONFIG['monthly_budget']}€
+
+        Our statistical checks flagged:
+        {flagged}
         
         Your task:
-        Identify any financial anomalies (e.g., unusual price spikes, suspicious merchants, 
-        or overspending in non-essential categories).
+        Confirm or dismiss these anomalies (e.g., unusual price spikes, suspicious merchants, 
+        or overspending in non-essential categories) and explain them to the user.
         
         Return ONLY a JSON object with:
         - 'has_anomaly' (boolean)
@@ -674,16 +991,37 @@ async def analyze_spending(db: Session = Depends(get_db)):
         - 'advice' (string in English)
         """
 
-        # 3. Call Gemini AI
-        response = ai_client.models.generate_content(
-            model="gemini-1.5-flash",
-            contents=[prompt]
+        # 4. Call Gemini AI (in a thread, shared by identical concurrent requests)
+        async def _call_gemini():
+            response = await asyncio.to_thread(
+                ai_client.models.generate_content,
+                model="gemini-1.5-flash",
+                contents=[prompt]
+            )
+            return response.text
+
+        # Same anomalies as last time (e.g. still in the recent window): same explanation, no new call
+        key = LLMCache.make_key(
+            "anomalies", findings=AnomalyDetector.signature(findings), budget=USER_CONFIG["monthly_budget"]
         )
-        
-        # 4. Parse and return the AI analysis
-        analysis = json.loads(response.text.strip().replace('```json', '').replace('```', ''))
-        return {"status": "success", "analysis": analysis}
+        cached = anomaly_answers.get(key)
+        if cached is not None:
+            return {"status": "success", "analysis": cached, "source": "ai"}
+        try:
+            text = await llm_guard.run(key, _caller_id(request), _call_gemini)
+            # 5. Parse and return the AI analysis
+            analysis = json.loads(text.strip().replace('```json', '').replace('```', ''))
+            anomaly_answers.put(key, analysis)
+        except LLMBusyError:
+            raise
+        except Exception as e:
+            # The local findings are still worth showing
+            logger.warning("Gemini anomaly analysis failed, answering with the local findings: %s", e)
+            return {"status": "success", "analysis": local_analysis, "source": "local"}
+        return {"status": "success", "analysis": analysis, "source": "ai"}
 
+    except LLMBusyError as e:
+        return _llm_busy(e)
     except Exception as e:
         return {"status": "error", "message": str(e)}
     
@@ -691,17 +1029,15 @@ async def analyze_spending(db: Session = Depends(get_db)):
     #route for goals prediction
 
 @router.get("/goal-prediction/{goal_id}")
-async def goal_prediction(goal_id: int, db: Session = Depends(get_db)):
+async def goal_prediction(goal_id: int, db: AsyncSession = Depends(get_read_db)):
     try:
         # 1. Retrieve the goal from the database
-        goal = db.query(Goal).filter(Goal.id == goal_id).first()
+        goal = await db.scalar(select(Goal).where(Goal.id == goal_id))
         if not goal:
             return {"status": "error", "prediction": "Goal not found"}
 
         # 2. Calculate monthly savings capacity
-        db_tx = db.query(Transaction).all()
-        # Assure-toi que SerenityEngine est bien importé
-        analysis = SerenityEngine.analyze_finances(db_tx, budget=USER_CONFIG["monthly_budget"])
+        analysis = await serenity_score(db)
         
         # Capacité d'épargne = Budget Limite - Dépenses Réelles
         monthly_savings_capacity = USER_CONFIG["monthly_budget"] - analysis['total_spent']
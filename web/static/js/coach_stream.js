@@ -0,0 +1,43 @@
+// Reads a coach endpoint in ?stream=true mode (server-sent events over fetch, works with POST).
+// onToken(text, fullTextSoFar) is called for every token; resolves with the final `done` payload,
+// rejects if the answer breaks off (`error` event) or the connection drops.
+async function streamCoach(url, options, onToken) {
+    const response = await fetch(url + (url.includes('?') ? '&' : '?') + 'stream=true', options);
+    if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let fullText = '';
+    let result = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let event = 'message', data = '';
+            for (const line of raw.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            if (!data) continue;
+            const payload = JSON.parse(data);
+            if (event === 'token') {
+                fullText += payload.text;
+                onToken(payload.text, fullText);
+            } else if (event === 'done') {
+                result = payload;
+            } else if (event === 'error') {
+                throw new Error(payload.message);
+            }
+        }
+    }
+    if (result === null) throw new Error('Stream ended early');
+    return result;
+}